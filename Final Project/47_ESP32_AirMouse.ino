@@ -9,15 +9,29 @@
 #define LEFTBUTTON 18
 #define RIGHTBUTTON 19
 #define SPEED 10
+// 1: also POST motion/click points to ingest_gateway.py over Wi-Fi.
+// 0 (default): serial output only, as before; esp_to_influx.py can log it.
+#define SEND_TO_GATEWAY 0
 
 // ====== WIFI CONFIG ======
 const char* WIFI_SSID     = "";
 const char* WIFI_PASSWORD = "";
 
-// ====== INFLUXDB CONFIG ======
-const char* INFLUX_HOST   = "192.168.0.108";  // update if needed
-const int   INFLUX_PORT   = 8086;
-const char* INFLUX_DB     = "air_mouse";
+// ====== INFLUXDB CONFIG (via ingest_gateway.py) ======
+// With SEND_TO_GATEWAY, samples are queued as line protocol and POSTed once
+// per BATCH_MS to the gateway, which speaks InfluxDB's /write and forwards
+// them in bulk. Timestamps are millis(); the gateway rebases them using
+// X-Device-Millis.
+#if SEND_TO_GATEWAY
+const char* INGEST_HOST     = "192.168.0.108";  // laptop running ingest_gateway.py
+const int   INGEST_PORT     = 8090;
+const char* INFLUX_DB       = "air_mouse";
+const char* DEVICE_NAME     = "airmouse1";
+const unsigned long BATCH_MS = 1000;
+const unsigned long MAX_BACKOFF_MS = 60000;   // flush interval cap while the gateway fails
+const size_t MAX_BATCH_BYTES = 8192;          // ~240 motion lines of ~34 bytes; oldest dropped beyond
+const size_t MAX_OFFLINE_BYTES = 2048;        // cap while the gateway is unreachable
+#endif
 
 // ====== TELEGRAM VIA LOCAL BRIDGE (Python on Mac) ======
 // ESP32 does NOT talk to Telegram directly now.
@@ -43,40 +57,66 @@ const float MAX_STEP = 7.0;  // max pixels per update
 
 long mpuDelayMillis;
 
-// ========== INFLUXDB SEND ==========
-void sendToInflux(const String& lineProtocol) {
-  if (WiFi.status() != WL_CONNECTED) {
-    Serial.println("WiFi not connected, skip Influx write");
-    return;
+#if SEND_TO_GATEWAY
+// Pending line protocol, one "measurement fields millis" line per sample
+String influxBatch;
+unsigned long lastFlush = 0;
+unsigned long flushInterval = BATCH_MS;       // doubles after each failed POST
+unsigned long droppedPoints = 0;
+HTTPClient ingestHttp;
+
+// ========== INFLUXDB BATCH ==========
+void queuePoint(const String& point) {
+  // Gateway failing: keep a short tail only, so the POST that finds it
+  // back up stays small
+  size_t cap = flushInterval > BATCH_MS ? MAX_OFFLINE_BYTES : MAX_BATCH_BYTES;
+  while (influxBatch.length() > 0 && influxBatch.length() + point.length() + 16 > cap) {
+    // drop the oldest line
+    int nl = influxBatch.indexOf('\n');
+    influxBatch.remove(0, nl < 0 ? influxBatch.length() : nl + 1);
+    droppedPoints++;
   }
+  influxBatch += point;
+  influxBatch += ' ';
+  influxBatch += String(millis());
+  influxBatch += '\n';
+}
 
-  HTTPClient http;
-  String url = String("http://") + INFLUX_HOST + ":" + String(INFLUX_PORT) +
-               "/write?db=" + INFLUX_DB;
-
-  Serial.print("POST to URL: ");
-  Serial.println(url);
-  Serial.print("Data: ");
-  Serial.println(lineProtocol);
-
-  http.begin(url);
-  http.addHeader("Content-Type", "text/plain");
-
-  int httpCode = http.POST(lineProtocol);
-  Serial.print("HTTP status: ");
-  Serial.println(httpCode);   // 204 = success in InfluxDB v1
+void flushInflux() {
+  lastFlush = millis();
+  if (influxBatch.length() == 0 || WiFi.status() != WL_CONNECTED) {
+    return;   // keep the batch, retry next time
+  }
 
-  if (httpCode <= 0) {
-    Serial.print("HTTP error: ");
-    Serial.println(http.errorToString(httpCode));
+  String url = String("http://") + INGEST_HOST + ":" + String(INGEST_PORT) +
+               "/write?db=" + INFLUX_DB + "&precision=ms&device=" + DEVICE_NAME;
+  ingestHttp.begin(url);               // same host: the connection is reused
+  ingestHttp.addHeader("Content-Type", "text/plain");
+  ingestHttp.addHeader("X-Device-Millis", String(millis()));
+
+  int httpCode = ingestHttp.POST(influxBatch);
+  if (httpCode == 204) {
+    influxBatch = "";
+    flushInterval = BATCH_MS;
+  } else if (httpCode == 400) {
+    Serial.print("Gateway rejected lines: ");
+    Serial.println(ingestHttp.getString());
+    influxBatch = "";                  // bad lines stay bad; the good ones were written
+    flushInterval = BATCH_MS;
   } else {
-    String payload = http.getString();
-    Serial.print("Response: ");
-    Serial.println(payload);
+    // Each failed POST can block loop() for the connect + read timeouts:
+    // back off exponentially instead of stalling the mouse every second
+    flushInterval = min(flushInterval * 2, MAX_BACKOFF_MS);
+    Serial.print("Gateway write failed: ");
+    Serial.print(httpCode > 0 ? String(httpCode) : ingestHttp.errorToString(httpCode));
+    Serial.print(", next try in ");
+    Serial.print(flushInterval);
+    Serial.print(" ms, points dropped so far: ");
+    Serial.println(droppedPoints);
   }
-
-  http.end();
+  ingestHttp.end();
 }
+#endif
 
 // ========== SIMPLE URL ENCODE (spaces -> %20) ==========
 String simpleUrlEncode(const String &text) {
@@ -181,6 +221,13 @@ void setup() {
   // ✅ Start BLE mouse ASAP
   bleMouse.begin();
 
+#if SEND_TO_GATEWAY
+  influxBatch.reserve(MAX_BATCH_BYTES);
+  ingestHttp.setReuse(true);
+  ingestHttp.setConnectTimeout(500);   // never stall the mouse for long
+  ingestHttp.setTimeout(500);
+#endif
+
   // ====== WIFI CONNECT ======
   WiFi.mode(WIFI_STA);  // station mode
   WiFi.begin(WIFI_SSID, WIFI_PASSWORD);
@@ -287,6 +334,9 @@ void loop() {
     Serial.print(dx, 3);
     Serial.print(" , dy: ");
     Serial.println(dy, 3);
+#if SEND_TO_GATEWAY
+    queuePoint("motion dx=" + String(dx, 3) + ",dy=" + String(dy, 3));
+#endif
 
 
     // 5) Move mouse (must be int8_t)
@@ -297,16 +347,29 @@ void loop() {
     // Buttons
     if (!digitalRead(RIGHTBUTTON)) {
       Serial.println("Right click");
+#if SEND_TO_GATEWAY
+      queuePoint("click,button=right value=1i");
+#endif
       bleMouse.click(MOUSE_RIGHT);
       delay(200);  // shorter delay so it feels more responsive
     }
 
     if (!digitalRead(LEFTBUTTON)) {
       Serial.println("Left click");
+#if SEND_TO_GATEWAY
+      queuePoint("click,button=left value=1i");
+#endif
       bleMouse.click(MOUSE_LEFT);
       delay(200);
     }
 
+#if SEND_TO_GATEWAY
+    // One request per BATCH_MS instead of one per sample (longer after failures)
+    if (millis() - lastFlush >= flushInterval) {
+      flushInflux();
+    }
+#endif
+
     // 6) Update rate – smaller = smoother, but don’t go crazy
     delay(15);   // ~60–70 updates per second
   }
@@ -0,0 +1,256 @@
+# bench_ingest.py - Throughput of the ingestion pipeline (ingest.py)
+#
+# Runs on a laptop (CPython, standard library only). Starts a local HTTP
+# server that answers InfluxDB's /write like the real one (204, gzip
+# accepted, optional --delay-ms per request, 503 while "down"), then feeds
+# a simulated fleet straight into the sources' handlers - Lab4-style JSON
+# over MQTT, the same rows over HTTP push, batched line protocol on the
+# gateway's /write, and air mouse serial lines:
+#     python bench_ingest.py [--devices 2000] [--messages 10] [--delay-ms 5]
+#
+# It compares one POST per point (what esp_to_influx.py and a per-message
+# Node-RED flow used to do) with the batched, pooled InfluxWriter, checks
+# that every point reached the server exactly once with its device tag,
+# and that points written during a database outage come back from the spool.
+# /metrics and the periodic [STATS] print must not reset each other's rates.
+
+import argparse
+import gzip
+import http.client
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import ingest  # noqa: E402
+from influx_writer import InfluxWriter  # noqa: E402
+
+
+class FakeInflux(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay_ms=0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.delay_ms = delay_ms
+        self.down = False
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.lines = []
+        self.connections = set()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d/write" % self.server_address[1]
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"          # keep-alive, like InfluxDB
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        if self.server.delay_ms:
+            time.sleep(self.server.delay_ms / 1000)
+        if self.server.down:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.lines.extend(body.decode().splitlines())
+            self.server.connections.add(self.client_address)
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def messages(devices, per_device, t0_ms=1735689600000):
+    for i in range(per_device):
+        for d in range(devices):
+            row = {"ts": t0_ms + i * 5000, "temperature": 20 + d % 10 + i / 100,
+                   "pressure": 1013.25 - i / 10, "altitude": 12.3}
+            yield "/aupp/esp32/dev%04d" % d, json.dumps([row]).encode()
+
+
+def per_point(url, n):
+    """Baseline: one request (and, with requests.post, one connection) per point."""
+    t0 = time.perf_counter()
+    for topic, payload in messages(n, 1):
+        row = json.loads(payload)[0]
+        lp = "bmp280,device=%s temperature=%s,pressure=%s,altitude=%s %d" % (
+            topic.rsplit("/", 1)[1], row["temperature"], row["pressure"], row["altitude"], row["ts"])
+        urllib.request.urlopen(urllib.request.Request(url + "?db=lab4&precision=ms", lp.encode(), method="POST"))
+    return time.perf_counter() - t0
+
+
+def pipeline(db, **kw):
+    writer = InfluxWriter(db.url, "lab4", batch_lines=5000, flush_ms=200, workers=2, log=lambda *a: None, **kw)
+    return ingest.Pipeline(writer, tags={"site": "aupp"}, log=lambda *a: None)
+
+
+def run_mqtt(args, gz):
+    db = FakeInflux(args.delay_ms)
+    pipe = pipeline(db, compress=gz)
+    src = pipe.add(ingest.MqttSource("localhost"))
+    n = args.devices * args.messages
+    t0 = time.perf_counter()
+    for topic, payload in messages(args.devices, args.messages):
+        src.handle(topic, payload)
+    t_in = time.perf_counter() - t0
+    pipe.writer.close()
+    dt = time.perf_counter() - t0
+    s = pipe.writer.stats()
+    print("mqtt%-15s: %6d points in %.2f s  -> %8.0f points/s  (%d requests on %d connections, "
+          "callback %.1f us/msg, write %s ms avg)"
+          % (" + gzip" if gz else "", n, dt, n / dt, db.requests, len(db.connections),
+             t_in * 1e6 / n, s["write_ms_avg"]))
+    assert len(db.lines) == n and len(set(db.lines)) == n, (len(db.lines), n)
+    assert s["dropped"] == 0 and s["errors"] == 0, s
+    assert pipe.stats()["sources"]["mqtt"]["devices"] == args.devices
+    assert db.lines[0].startswith("bmp280,device=dev0000,site=aupp temperature=20.0,"), db.lines[0]
+
+
+def run_http(args):
+    db = FakeInflux(args.delay_ms)
+    pipe = pipeline(db)
+    src = pipe.add(ingest.HttpSource(port=0, host="127.0.0.1"))
+    src.start()
+    while src.server is None:
+        time.sleep(0.01)
+    conn = http.client.HTTPConnection("127.0.0.1", src.server.server_address[1])
+    n = min(args.devices, 500) * args.messages
+    window = {}                     # the [STATS] print's rate window
+    pipe.stats(window)
+    t0 = time.perf_counter()
+    for topic, payload in messages(min(args.devices, 500), args.messages):
+        conn.request("POST", "/push/" + topic.rsplit("/", 1)[1], payload)
+        resp = conn.getresponse()
+        resp.read()
+        assert resp.status == 204, resp.status
+    conn.request("POST", "/push/bad", b"not json")
+    resp = conn.getresponse()
+    resp.read()
+    assert resp.status == 400
+    conn.request("GET", "/metrics")
+    metrics = json.loads(conn.getresponse().read())
+    conn.request("GET", "/metrics")
+    conn.getresponse().read()
+    periodic = pipe.stats(window)["sources"]["http"]
+    pipe.stop()
+    dt = time.perf_counter() - t0
+    print("http push          : %6d points in %.2f s  -> %8.0f points/s  (%d requests to the database)"
+          % (n, dt, n / dt, db.requests))
+    assert len(set(db.lines)) == n == len(db.lines)
+    assert metrics["sources"]["http"]["bad"] == 1, metrics
+    # both /metrics requests came after the pushes: they have not reset this
+    assert periodic["points_per_s"] > 0, periodic
+
+
+def run_gateway(args):
+    """Air mice batching one second (60 samples) per POST /write, half gzipped."""
+    db = FakeInflux(args.delay_ms)
+    pipe = pipeline(db)
+    src = pipe.add(ingest.HttpSource(port=0, host="127.0.0.1", db="air_mouse"))
+    src.start()
+    while src.server is None:
+        time.sleep(0.01)
+    devices = min(args.devices, 200)
+    conns = [http.client.HTTPConnection("127.0.0.1", src.server.server_address[1]) for _ in range(devices)]
+    t0 = time.perf_counter()
+    n = 0
+    for sec in range(args.messages):
+        for d, conn in enumerate(conns):
+            clock = 10000 + sec * 1000 + 1000
+            body = "\n".join("motion dx=%.3f,dy=0.226 %d" % (i / 100, clock - 1000 + i * 16)
+                              for i in range(60)).encode()
+            headers = {"X-Device-Millis": str(clock)}
+            if d % 2:
+                body = gzip.compress(body)
+                headers["Content-Encoding"] = "gzip"
+            conn.request("POST", "/write?db=air_mouse&precision=ms&device=mouse%03d" % d, body, headers)
+            resp = conn.getresponse()
+            resp.read()
+            assert resp.status == 204, (resp.status, resp.headers)
+            n += 60
+    conn = conns[0]
+    conn.request("POST", "/write?db=air_mouse&precision=ms&device=mouse000", b"motion dx=1 5\nnot line protocol\n")
+    resp = conn.getresponse()
+    assert resp.status == 400 and b"line 2" in resp.read()
+    conn.request("POST", "/write?db=other", b"motion dx=1")
+    resp = conn.getresponse()
+    resp.read()
+    assert resp.status == 404
+    src.max_backlog = -1
+    conn.request("POST", "/write?db=air_mouse", b"motion dx=1")
+    resp = conn.getresponse()
+    resp.read()
+    assert resp.status == 503 and resp.headers["Retry-After"]
+    pipe.stop()
+    dt = time.perf_counter() - t0
+    print("gateway /write     : %6d points in %.2f s  -> %8.0f points/s  (%d device requests, %d to the database)"
+          % (n, dt, n / dt, devices * args.messages, db.requests))
+    assert len(db.lines) == n + 1 and len(set(db.lines)) == n + 1, len(db.lines)
+    assert any(l.startswith("motion,device=mouse001,site=aupp dx=0.000,dy=0.226 ") for l in db.lines), db.lines[:2]
+    # rebased on the gateway clock: a batch spans its second ending now
+    ts = [int(l.rsplit(" ", 1)[1]) for l in db.lines[:60]]
+    assert ts[-1] - ts[0] == 59 * 16 and abs(ts[0] / 1000 - time.time()) < 60
+
+
+def run_serial_outage(args):
+    db = FakeInflux()
+    spool = os.path.join(tempfile.mkdtemp(prefix="ingest_"), "spool")
+    pipe = pipeline(db, retries=1, spool=spool)
+    src = pipe.add(ingest.SerialSource("/dev/null"))
+    lines = ["Motion -> dx: %.3f , dy: 0.226" % (i / 1000) for i in range(3000)] + ["Left click", "Boot msg"]
+    db.down = True
+    for line in lines[:2000]:
+        src.handle(line)
+    pipe.writer.flush()
+    spooled = pipe.writer.stats()["in_spool"]
+    db.down = False
+    for line in lines[2000:]:
+        src.handle(line)
+    pipe.writer.flush()
+    time.sleep(0.3)                 # replay rides on the next successful write
+    pipe.writer.flush()
+    s = pipe.writer.stats()
+    print("serial + outage    : %6d points, %d spooled while the database was down, %d replayed, %d in spool"
+          % (len(set(db.lines)), spooled, s["replayed"], s["in_spool"]))
+    assert spooled == 2000 and s["in_spool"] == 0
+    assert len(db.lines) == len(set(db.lines)) == 3001, len(db.lines)
+    assert any(l.startswith("click,button=left,device=esp32,site=aupp value=1i ") for l in db.lines)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--devices", type=int, default=2000)
+    ap.add_argument("--messages", type=int, default=10, help="messages per device")
+    ap.add_argument("--delay-ms", type=float, default=5, help="simulated database time per request")
+    ap.add_argument("--baseline", type=int, default=300, help="points for the one-POST-per-point run")
+    args = ap.parse_args()
+
+    db = FakeInflux(args.delay_ms)
+    dt = per_point(db.url, args.baseline)
+    print("one POST per point : %6d points in %.2f s  -> %8.0f points/s  (%d requests)"
+          % (args.baseline, dt, args.baseline / dt, db.requests))
+    run_mqtt(args, False)
+    run_mqtt(args, True)
+    run_http(args)
+    run_gateway(args)
+    run_serial_outage(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# bench_lineproto.py - lineproto.py against the old f-string formatting
+#
+# Runs on a laptop (CPython, standard library only):
+#     python bench_lineproto.py [--points 200000]
+#
+# Times four ways of turning air mouse samples into a write body:
+#   f-string     f"motion,device={device} dx={dx},dy={dy}" per point, as
+#                esp_to_influx.parse_and_send() used to, joined at the end
+#   format_line  lineproto.format_line() per point (generic, dict fields)
+#   Template     lineproto.Template("motion", ...).lines() over the list,
+#                with repr floats and with 3 fixed digits
+#   encode_batch lineproto.encode_batch() over the whole list
+# With repr floats a Template costs about what the f-string does (~1.0x:
+# repr() of the floats dominates both); with digits=3 it takes about half
+# the time and a third fewer bytes. It then checks which of them produce
+# valid, unambiguous lines for awkward inputs: a configured device name
+# with a space/comma, NaN from a glitching sensor, a whole-number reading
+# and a string field.
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import lineproto  # noqa: E402
+
+T0_MS = 1735689600000
+
+
+def fstring_line(device, dx, dy, ts):
+    return f"motion,device={device} dx={dx},dy={dy} {ts}"
+
+
+def timed(fn, n, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, body
+
+
+def bench(points):
+    samples = [(random.uniform(-7, 7), random.uniform(-7, 7), T0_MS + i * 16) for i in range(points)]
+    device = "esp32"
+    tmpl = lineproto.Template("motion", [("dx", float), ("dy", float)], tags={"device": device}, digits=3)
+    tmpl_repr = lineproto.Template("motion", [("dx", float), ("dy", float)], tags={"device": device})
+    tags = {"device": device}
+
+    runs = [
+        ("f-string", lambda: "\n".join([fstring_line(device, dx, dy, ts) for dx, dy, ts in samples]).encode()),
+        ("format_line", lambda: "\n".join([lineproto.format_line("motion", tags, {"dx": dx, "dy": dy}, ts)
+                                           for dx, dy, ts in samples]).encode()),
+        ("Template", lambda: "\n".join(tmpl_repr.lines(samples)).encode()),
+        ("Template 3dp", lambda: "\n".join(tmpl.lines(samples)).encode()),
+        ("encode_batch", lambda: lineproto.encode_batch(("motion", tags, {"dx": dx, "dy": dy}, ts)
+                                                        for dx, dy, ts in samples)),
+    ]
+    base = None
+    print("%-14s %10s %12s %10s" % ("path", "ns/point", "points/s", "bytes/pt"))
+    for name, fn in runs:
+        dt, body = timed(fn, points)
+        base = base or dt
+        print("%-14s %10.0f %12.0f %10.1f   (%.2fx f-string)"
+              % (name, dt / points * 1e9, points / dt, len(body) / points, dt / base))
+        # every line must parse
+        for line in body.decode().splitlines()[:1000]:
+            assert lineproto.is_valid(line), (name, line)
+
+
+def correctness():
+    cases = [
+        ("plain", "esp32", 0.195, 0.226),
+        ("space in device", "lab 2", 0.195, 0.226),
+        ("comma in device", "mouse,left", 0.195, 0.226),
+        ("NaN reading", "esp32", math.nan, 0.226),
+        ("whole reading", "esp32", 1.0, 0.0),
+    ]
+    tmpl_cache = {}
+    print("\n%-18s %-45s %-6s %s" % ("case", "f-string line", "valid", "lineproto line"))
+    for name, device, dx, dy in cases:
+        old = fstring_line(device, dx, dy, T0_MS)
+        tmpl = tmpl_cache.setdefault(device, lineproto.Template("motion", [("dx", float), ("dy", float)],
+                                                                tags={"device": device}))
+        new = tmpl.line(dx, dy, T0_MS)
+        old_ok = _round_trips(old, device)
+        assert lineproto.is_valid(new) and _round_trips(new, device), new
+        print("%-18s %-45s %-6s %s" % (name, old, "yes" if old_ok else "NO", new))
+    s = lineproto.format_line("note", {"device": "esp32"}, {"text": 'he said "hi"\\', "ok": True, "n": 3}, T0_MS)
+    assert lineproto.is_valid(s), s
+    print("%-18s %-45s %-6s %s" % ("string/bool/int", "-", "-", s))
+
+
+def _round_trips(line, device):
+    """Valid line protocol whose device tag reads back as `device`."""
+    m = lineproto.LINE_RE.match(line)
+    if m is None:
+        return False
+    tags = m.group(2)
+    # split on unescaped commas and equals, then unescape
+    parts = [p for p in _split(tags, ",") if p]
+    for p in parts:
+        k, v = _split(p, "=")
+        if k == "device":
+            return v.replace("\\,", ",").replace("\\=", "=").replace("\\ ", " ") == device
+    return False
+
+
+def _split(s, sep):
+    out, cur, esc = [], "", False
+    for c in s:
+        if esc:
+            cur += "\\" + c
+            esc = False
+        elif c == "\\":
+            esc = True
+        elif c == sep:
+            out.append(cur)
+            cur = ""
+        else:
+            cur += c
+    out.append(cur)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, default=200000)
+    args = ap.parse_args()
+    random.seed(1)
+    bench(args.points)
+    correctness()
+
+
+if __name__ == "__main__":
+    main()
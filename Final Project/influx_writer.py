@@ -0,0 +1,291 @@
+# influx_writer.py - Batched, pooled InfluxDB v1 writer for the bridge services
+#
+# Runs on a laptop/server (CPython, standard library only). Callers hand
+# over line-protocol lines with write(), which only appends to a list under
+# a lock, so an MQTT or serial callback never waits on the database. Lines
+# are cut into batches of batch_lines (or whatever has accumulated after
+# flush_ms) and posted by `workers` threads, each holding its own keep-alive
+# HTTP connection to /write.
+#
+#     writer = InfluxWriter("http://localhost:8086/write", "lab4")
+#     writer.write(["bmp280,device=group6 temperature=25.1 1735689615000"])
+#     print(writer.stats())
+#     writer.close()                       # flushes what is still pending
+#
+# Batches that fail with a connection error, 429 or 5xx are retried with
+# backoff; other 4xx responses mean bad points and are dropped (and
+# counted). When the database falls behind, the oldest queued batch is
+# dropped so memory stays bounded and recent data wins - or, with
+# spool="file", appended to that file instead and replayed a chunk at a time
+# once writes succeed again (also after a restart). Replay reads on from a
+# byte offset kept in "file.pos", so each chunk costs its own size, not the
+# spool's; the file is removed once it has been read to the end. Spool I/O
+# never happens under the queue lock: batches pushed out of a full queue
+# are handed to a worker, which appends them.
+
+import collections
+import gzip
+import http.client
+import os
+import threading
+import time
+import urllib.parse
+
+
+class InfluxWriter:
+    def __init__(self, url, db, precision="ms", batch_lines=5000, flush_ms=1000, workers=2,
+                 max_batches=200, retries=3, timeout=5, compress=False, spool=None, log=print):
+        u = urllib.parse.urlsplit(url)
+        self._conn_cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+        self._host = u.netloc
+        self._path = "%s?%s" % (u.path or "/write", urllib.parse.urlencode({"db": db, "precision": precision}))
+        self.batch_lines = batch_lines
+        self.flush_ms = flush_ms
+        self.max_batches = max_batches
+        self.retries = retries
+        self.timeout = timeout
+        self.compress = compress
+        self.spool = spool
+        self.log = log
+
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._pending = []
+        self._pending_since = None
+        self._queue = collections.deque()
+        self._overflow = []                  # batches pushed out of the full queue, for the spool
+        self._busy = 0
+        self._closing = False
+        self._t0 = time.monotonic()
+        # counters, read by stats()
+        self.lines_in = 0
+        self.points = 0
+        self.batches = 0
+        self.bytes = 0
+        self.errors = 0
+        self.retried = 0
+        self.dropped = 0
+        self.spooled = 0
+        self.replayed = 0
+        self._spool_lock = threading.Lock()
+        self._spool_n = 0
+        self._spool_pos = 0                  # bytes of the spool already replayed
+        if spool and os.path.exists(spool):
+            try:
+                with open(spool + ".pos") as f:
+                    self._spool_pos = int(f.read())
+            except (OSError, ValueError):
+                pass
+            with open(spool, "rb") as f:
+                if self._spool_pos > os.fstat(f.fileno()).st_size:
+                    self._spool_pos = 0
+                f.seek(self._spool_pos)
+                self._spool_n = sum(1 for _ in f)
+        self._write_s = 0.0
+        self._write_max = 0.0
+
+        self._threads = [threading.Thread(target=self._worker, name="influx-%d" % i, daemon=True)
+                         for i in range(workers)]
+        self._threads.append(threading.Thread(target=self._ticker, name="influx-flush", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    # ---- producer side ----
+    def write(self, lines):
+        """Queue line-protocol lines (str, without newlines); never blocks on I/O."""
+        if not lines:
+            return
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.extend(lines)
+            self.lines_in += len(lines)
+            while len(self._pending) >= self.batch_lines:
+                self._enqueue(self._pending[:self.batch_lines])
+                del self._pending[:self.batch_lines]
+
+    def backlog(self):
+        """Lines accepted but not yet written (approximate, lock-free)."""
+        return len(self._pending) + len(self._queue) * self.batch_lines
+
+    def flush(self, wait=True):
+        """Queue the partial batch; with wait, return once everything is written."""
+        with self._lock:
+            if self._pending:
+                self._enqueue(self._pending)
+                self._pending = []
+            while wait and (self._queue or self._overflow or self._busy):
+                self._ready.wait(0.1)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._closing = True
+            self._ready.notify_all()
+        for t in self._threads:
+            t.join(self.timeout)
+
+    def _enqueue(self, lines):
+        # caller holds the lock
+        if len(self._queue) >= self.max_batches:
+            lost = self._queue.popleft()
+            if self.spool:
+                self._overflow.append(lost)  # spooled by a worker, outside the lock
+            else:
+                self.dropped += len(lost)
+        self._queue.append(lines)
+        self._ready.notify()
+
+    def _ticker(self):
+        while not self._closing:
+            time.sleep(self.flush_ms / 4000)
+            with self._lock:
+                if self._pending and (time.monotonic() - self._pending_since) * 1000 >= self.flush_ms:
+                    self._enqueue(self._pending)
+                    self._pending = []
+
+    # ---- consumer side ----
+    def _worker(self):
+        conn = None
+        while True:
+            with self._lock:
+                while not self._queue and not self._overflow and not self._closing:
+                    self._ready.wait()
+                overflow, self._overflow = self._overflow, []
+                if not self._queue and not overflow:
+                    break
+                lines = self._queue.popleft() if self._queue else None
+                self._busy += 1
+            try:
+                for lost in overflow:
+                    self._lose(lost)
+                if lines is not None:
+                    body = ("\n".join(lines) + "\n").encode("utf-8")
+                    conn = self._post(conn, body, lines)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._ready.notify_all()
+        if conn is not None:
+            conn.close()
+
+    def _post(self, conn, body, lines):
+        n = len(lines)
+        headers = {"Content-Type": "text/plain; charset=utf-8"}
+        if self.compress:
+            body = gzip.compress(body, 5)
+            headers["Content-Encoding"] = "gzip"
+        delay = 0.5
+        for attempt in range(self.retries + 1):
+            t0 = time.monotonic()
+            try:
+                if conn is None:
+                    conn = self._conn_cls(self._host, timeout=self.timeout)
+                conn.request("POST", self._path, body, headers)
+                resp = conn.getresponse()
+                text = resp.read()
+                status = resp.status
+            except (OSError, http.client.HTTPException) as e:
+                if conn is not None:
+                    conn.close()
+                conn = None
+                status, text = None, str(e).encode()
+            dt = time.monotonic() - t0
+            if status is not None and status < 300:
+                with self._lock:
+                    self.points += n
+                    self.batches += 1
+                    self.bytes += len(body)
+                    self._write_s += dt
+                    self._write_max = max(self._write_max, dt)
+                if self._spool_n:
+                    self._replay()
+                return conn
+            if status is not None and status < 500 and status != 429:
+                self.log("[Influx] HTTP %d, dropping %d point(s): %s" % (status, n, text[:200].decode("utf-8", "replace").strip()))
+                with self._lock:
+                    self.errors += 1
+                    self.dropped += n
+                return conn
+            if attempt < self.retries:
+                with self._lock:
+                    self.retried += 1
+                time.sleep(delay)
+                delay *= 2
+            else:
+                self.log("[Influx ERROR] %s, %s %d point(s)" % (status or text.decode("utf-8", "replace"),
+                                                               "spooling" if self.spool else "dropping", n))
+        with self._lock:
+            self.errors += 1
+        self._lose(lines)
+        return conn
+
+    # ---- spool ----
+    def _lose(self, lines):
+        # called without the lock: appending to the spool is file I/O
+        if not self.spool:
+            with self._lock:
+                self.dropped += len(lines)
+            return
+        with self._spool_lock:
+            with open(self.spool, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self._spool_n += len(lines)
+        with self._lock:
+            self.spooled += len(lines)
+
+    def _replay(self):
+        """Requeue up to half a queue's worth of spooled lines."""
+        with self._lock:
+            room = (self.max_batches // 2 - len(self._queue)) * self.batch_lines
+        if room <= 0:
+            return
+        take = []
+        with self._spool_lock:
+            try:
+                with open(self.spool, "rb") as f:
+                    f.seek(self._spool_pos)
+                    while len(take) < room:
+                        line = f.readline()
+                        if not line:
+                            break
+                        take.append(line.decode("utf-8").rstrip("\n"))
+                    pos = f.tell()
+                    done = pos >= os.fstat(f.fileno()).st_size
+            except OSError:
+                pos, done = 0, True
+            if done:
+                for path in (self.spool, self.spool + ".pos"):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self._spool_pos = 0
+                self._spool_n = 0
+            else:
+                tmp = self.spool + ".pos.tmp"
+                with open(tmp, "w") as f:
+                    f.write(str(pos))
+                os.replace(tmp, self.spool + ".pos")
+                self._spool_pos = pos
+                self._spool_n -= len(take)
+        with self._lock:
+            for i in range(0, len(take), self.batch_lines):
+                self._enqueue(take[i:i + self.batch_lines])
+            self.replayed += len(take)
+
+    def stats(self):
+        with self._lock:
+            up = time.monotonic() - self._t0
+            return {
+                "points": self.points,
+                "points_per_s": round(self.points / up, 1) if up else 0.0,
+                "batches": self.batches,
+                "kb": self.bytes // 1024,
+                "pending": len(self._pending) + sum(len(b) for b in self._queue),
+                "errors": self.errors,
+                "retried": self.retried,
+                "dropped": self.dropped,
+                "in_spool": self._spool_n,
+                "replayed": self.replayed,
+                "write_ms_avg": round(self._write_s * 1000 / self.batches, 1) if self.batches else None,
+                "write_ms_max": round(self._write_max * 1000, 1) if self.batches else None,
+            }
@@ -0,0 +1,611 @@
+# ingest.py - Device -> InfluxDB ingestion core shared by every transport
+#
+# Runs on a laptop/server (CPython). Serial (esp_to_influx.py), MQTT
+# (mqtt_to_influx.py) and HTTP push all feed the same pipeline:
+#
+#     source -> parse -> Point(measurement, tags, fields, ts)
+#            -> enrich (device tag, static/per-device tags, missing ts)
+#            -> line protocol (lineproto.py) -> InfluxWriter (batching, pooling, retry, spool)
+#
+# Sources run in their own threads and only call Pipeline.submit(), so a
+# slow database never stalls a serial port or the MQTT network loop.
+#
+#     python ingest.py --config ingest.json
+#     python ingest.py --mqtt test.mosquitto.org --http 8090 --influx http://localhost:8086/write
+#
+# Config file (every key optional; command-line flags override it):
+#     {"influx":  {"url": "http://localhost:8086/write", "db": "lab4", "batch": 5000,
+#                  "flush_ms": 1000, "workers": 2, "gzip": false, "spool": "ingest.spool"},
+#      "tags":    {"site": "aupp"},
+#      "devices": {"group6": {"room": "lab-2"}},
+#      "digits":  null,                  (decimals for float fields, see lineproto.py)
+#      "stats_s": 10,
+#      "sources": [{"type": "mqtt", "broker": "test.mosquitto.org", "topics": ["/aupp/esp32/+"]},
+#                  {"type": "serial", "port": "/dev/ttyUSB0", "baud": 115200, "device": "esp32"},
+#                  {"type": "http", "port": 8090}]}
+#
+# Every source counts messages, points and rejects; Pipeline.stats() merges
+# them with the writer's counters and the HTTP source serves it on
+# GET /metrics. Rates cover the time since the same reader's previous call
+# (the [STATS] print and /metrics each keep their own window), or since
+# start for a one-off call.
+
+import argparse
+import collections
+import http.server
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "Lab4"))
+import frame_decoder  # noqa: E402  (binary frames, device_of)
+import lineproto  # noqa: E402
+from influx_writer import InfluxWriter  # noqa: E402
+
+# tags and fields: {name: value}; ts: Unix ms or None (filled in on submit)
+Point = collections.namedtuple("Point", "measurement tags fields ts")
+
+PARSE_ERRORS = (ValueError, TypeError, KeyError, AttributeError, struct.error)
+
+
+# timestamp precision -> (multiply, divide) to reach ms
+PRECISION_TO_MS = {"n": (1, 1000000), "ns": (1, 1000000), "u": (1, 1000), "us": (1, 1000),
+                   "ms": (1, 1), "s": (1000, 1), "m": (60000, 1), "h": (3600000, 1)}
+
+
+def rewrite_lines(body, extra_tags=None, precision="n", now_ms=None, clock_ms=None):
+    """Validate a line-protocol body and normalise it for the writer.
+
+    Each line gets the tags in extra_tags ({key: value}) that it does not
+    set itself, and its timestamp in ms. With clock_ms (the device's own
+    clock when it sent the batch) timestamps are on that clock and are
+    rebased onto now_ms, so devices without NTP can still stamp every
+    sample. Lines without a timestamp get now_ms.
+    Returns (lines, errors), errors being [(line number, reason)].
+    """
+    mul, div = PRECISION_TO_MS[precision]
+    extra = [(lineproto.escape_key(k), ",%s=%s" % (lineproto.escape_key(k), lineproto.escape_key(str(v))))
+             for k, v in sorted((extra_tags or {}).items())]
+    lines, errors = [], []
+    for n, line in enumerate(body.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        m = lineproto.LINE_RE.match(line)
+        if m is None:
+            errors.append((n, "unable to parse %r" % line[:80]))
+            continue
+        meas, tags, fields, ts = m.groups()
+        if ts is None:
+            ts = now_ms
+        else:
+            ts = int(ts) * mul // div
+            if clock_ms is not None:
+                ts = now_ms - (clock_ms - ts)
+        if extra:
+            own = lineproto.TAG_KEY_RE.findall(tags)
+            tags += "".join(t for k, t in extra if k not in own)
+        lines.append("%s%s %s %d" % (meas, tags, fields, ts))
+    return lines, errors
+
+
+# ---- parsers ----
+def parse_rows(payload, measurement="bmp280"):
+    """JSON from lib/sample_buffer.py: an array of {"ts": ms, field: value}
+    rows, a single object, or ThingsBoard {"ts", "values"} rows."""
+    # JSON numbers are floats, as Node-RED writes them: a reading that
+    # happens to be whole (21) must not turn the field into an integer
+    data = json.loads(payload, parse_int=float)
+    if isinstance(data, dict):
+        data = [data]
+    points = []
+    for row in data:
+        if "values" in row:                        # ThingsBoard telemetry
+            row = dict(row["values"], ts=row.get("ts"))
+        ts = row.pop("ts", None)
+        points.append(Point(measurement, {}, row, int(ts) if ts else None))
+    return points
+
+
+def parse_frame(payload, measurement="bmp280"):
+    """Binary frame from lib/frames.py."""
+    points = []
+    for row in frame_decoder.decode(payload):
+        ts = row.pop("ts")
+        points.append(Point(measurement, {}, row, ts))
+    return points
+
+
+_MOTION = re.compile(r"dx:\s*([-\d\.]+)\s*,\s*dy:\s*([-\d\.]+)")
+
+
+def parse_air_mouse(line):
+    """Serial output of 47_ESP32_AirMouse.ino; other lines yield []."""
+    if line.startswith("Motion -> dx:"):
+        m = _MOTION.search(line)
+        if not m:
+            raise ValueError("bad motion line")
+        return [Point("motion", {}, {"dx": float(m.group(1)), "dy": float(m.group(2))}, None)]
+    if line.startswith("Right click"):
+        return [Point("click", {"button": "right"}, {"value": 1}, None)]
+    if line.startswith("Left click"):
+        return [Point("click", {"button": "left"}, {"value": 1}, None)]
+    return []
+
+
+PARSERS = {"rows": parse_rows, "frame": parse_frame, "air_mouse": parse_air_mouse}
+
+
+# ---- pipeline ----
+class Pipeline:
+    """Enriches points from any source and hands them to the writer."""
+
+    def __init__(self, writer, tags=None, devices=None, digits=None, log=print):
+        self.writer = writer
+        self.digits = digits             # decimals for float fields (None: repr)
+        self.tags = dict(tags or {})
+        self.devices = devices or {}     # device -> extra tags
+        self.log = log
+        self.sources = []
+        self._series_cache = {}
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+
+    def add(self, source):
+        source.pipeline = self
+        self.sources.append(source)
+        return source
+
+    def submit(self, source, points, device=None):
+        """Called from source threads; returns the number of lines queued."""
+        now = int(time.time() * 1000)
+        lines = []
+        digits = self.digits
+        for p in points:
+            fields = lineproto.format_fields(p.fields, digits)
+            if fields:
+                lines.append("%s %s %d" % (self._series(p.measurement, device, p.tags), fields, p.ts or now))
+        with self._lock:
+            source.messages += 1
+            source.points += len(lines)
+            if device is not None:
+                source.devices.add(device)
+        self.writer.write(lines)
+        return len(lines)
+
+    def submit_lines(self, source, lines, device=None):
+        """Already formatted line protocol (see rewrite_lines())."""
+        with self._lock:
+            source.messages += 1
+            source.points += len(lines)
+            if device is not None:
+                source.devices.add(device)
+        self.writer.write(lines)
+        return len(lines)
+
+    def line_tags(self, device):
+        """Tags submit() would add for device, for sources passing raw lines."""
+        tags = dict(self.tags)
+        if device is not None:
+            tags["device"] = device
+        tags.update(self.devices.get(device) or {})
+        return tags
+
+    def _series(self, measurement, device, tags):
+        # a fleet has few distinct series: merge and escape their tags once
+        key = (measurement, device, tuple(tags.items()) if tags else ())
+        series = self._series_cache.get(key)
+        if series is None:
+            merged = self.line_tags(device)
+            merged.update(tags)
+            series = self._series_cache[key] = lineproto.series_key(measurement, merged)
+        return series
+
+    def reject(self, source, what, err):
+        with self._lock:
+            source.bad += 1
+        self.log("[BAD %s] %s: %s" % (source.name.upper(), what, err))
+
+    def start(self):
+        for s in self.sources:
+            s.start()
+
+    def stop(self):
+        for s in self.sources:
+            s.stop()
+        self.writer.close()
+
+    def stats(self, window=None):
+        """window: a dict the caller keeps between calls, so its rates cover
+        the time since its own previous call; None: since start."""
+        with self._lock:
+            srcs = {s.name: s.counters(window) for s in self.sources}
+        return {"uptime_s": int(time.monotonic() - self._t0), "sources": srcs, "writer": self.writer.stats()}
+
+
+class Source:
+    """Base class: a thread that turns device traffic into Pipeline.submit()."""
+
+    name = "source"
+
+    def __init__(self):
+        self.pipeline = None
+        self.messages = 0
+        self.points = 0
+        self.bad = 0
+        self.devices = set()
+        self._start = (time.monotonic(), 0, 0)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def run(self):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def counters(self, window=None):
+        # caller holds the pipeline lock; see Pipeline.stats() for window
+        now = time.monotonic()
+        if window is None:
+            t, m, p = self._start
+        else:
+            t, m, p = window.get(self.name, self._start)
+            window[self.name] = (now, self.messages, self.points)
+        dt = (now - t) or 1e-9
+        return {"messages": self.messages, "points": self.points, "bad": self.bad,
+                "devices": len(self.devices), "msg_per_s": round((self.messages - m) / dt, 1),
+                "points_per_s": round((self.points - p) / dt, 1)}
+
+
+class SerialSource(Source):
+    """One device on a serial port, one text line per message."""
+
+    name = "serial"
+
+    def __init__(self, port, baud=115200, parser=parse_air_mouse, device="esp32"):
+        super().__init__()
+        self.port = port
+        self.baud = baud
+        self.parser = parser
+        self.device = device
+        self._running = True
+
+    def handle(self, line):
+        line = line.strip()
+        if not line:
+            return 0
+        try:
+            points = self.parser(line)
+        except PARSE_ERRORS as e:
+            self.pipeline.reject(self, line, e)
+            return 0
+        if not points:
+            print(f"[SERIAL] {line}")
+            return 0
+        return self.pipeline.submit(self, points, self.device)
+
+    def run(self):
+        import serial
+        while self._running:
+            try:
+                print(f"Opening serial port {self.port} at {self.baud} baud...")
+                ser = serial.Serial(self.port, self.baud, timeout=1)
+                time.sleep(2)               # give the ESP32 a moment after reset
+                while self._running:
+                    raw = ser.readline()
+                    if raw:
+                        self.handle(raw.decode("utf-8", errors="ignore"))
+                ser.close()
+            except Exception as e:
+                print(f"[SERIAL ERROR] {e}")
+                time.sleep(1)
+
+    def stop(self):
+        self._running = False
+
+
+class MqttSource(Source):
+    """Device topics on a broker; <topic>/bin carries binary frames."""
+
+    name = "mqtt"
+
+    def __init__(self, broker, port=1883, topics=("/aupp/esp32/+", "/aupp/esp32/+/bin"),
+                 client_id="influx-bridge", measurement="bmp280"):
+        super().__init__()
+        self.broker = broker
+        self.port = port
+        self.topics = list(topics)
+        self.client_id = client_id
+        self.measurement = measurement
+        self.client = None
+
+    def handle(self, topic, payload):
+        try:
+            parse = parse_frame if topic.endswith("/bin") else parse_rows
+            points = parse(payload, self.measurement)
+        except PARSE_ERRORS as e:
+            self.pipeline.reject(self, topic, e)
+            return 0
+        return self.pipeline.submit(self, points, frame_decoder.device_of(topic))
+
+    def run(self):
+        import paho.mqtt.client as mqtt
+
+        def on_message(client, userdata, msg):
+            self.handle(msg.topic, msg.payload)
+
+        def on_connect(client, userdata, *rest):
+            client.subscribe([(t, 1) for t in self.topics])
+            print(f"Subscribed to {', '.join(self.topics)} on {self.broker}")
+
+        # persistent session: QoS 1 messages queue on the broker while we are down
+        try:
+            client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id, clean_session=False)
+        except AttributeError:  # paho-mqtt < 2.0
+            client = mqtt.Client(client_id=self.client_id, clean_session=False)
+        client.on_connect = on_connect
+        client.on_message = on_message
+        self.client = client
+        client.connect_async(self.broker, self.port, keepalive=30)
+        client.loop_forever(retry_first_connection=True)
+
+    def stop(self):
+        if self.client is not None:
+            self.client.disconnect()
+
+
+class HttpSource(Source):
+    """HTTP push from devices:
+    POST /write?db=&precision=&device=   InfluxDB v1 line protocol, batched,
+                                         optionally gzip (Content-Encoding);
+                                         X-Device-Millis rebases timestamps
+                                         taken on the device's millis() clock
+    POST /push/<device>                  JSON rows (the MQTT payload formats)
+    GET  /metrics                        Pipeline.stats()
+    Valid lines of a partly bad batch are kept (400 names the bad ones), as
+    InfluxDB does; while the writer is backed up, writes get 503 so devices
+    keep their data and retry."""
+
+    name = "http"
+
+    def __init__(self, port=8090, host="0.0.0.0", measurement="bmp280", db=None,
+                 max_body=1 << 20, max_backlog=500000):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.measurement = measurement
+        self.db = db                     # None: whatever the writer uses
+        self.max_body = max_body
+        self.max_backlog = max_backlog
+        self.rejected_lines = 0
+        self.throttled = 0
+        self.server = None
+        self.metrics_window = {}         # rates since the previous GET /metrics
+
+    def counters(self, window=None):
+        c = super().counters(window)
+        c["rejected_lines"] = self.rejected_lines
+        c["throttled"] = self.throttled
+        return c
+
+    def run(self):
+        self.server = http.server.ThreadingHTTPServer((self.host, self.port), _HttpHandler)
+        self.server.daemon_threads = True
+        self.server.source = self
+        print(f"HTTP ingest on http://{self.host}:{self.server.server_address[1]} (/write, /push/<device>, /metrics)")
+        self.server.serve_forever()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+
+
+class _HttpHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"          # devices may keep the connection open
+
+    def _reply(self, code, body=b"", ctype="text/plain"):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            src = self.server.source
+            self._reply(200, json.dumps(src.pipeline.stats(src.metrics_window)).encode(), "application/json")
+        else:
+            self._reply(404, b"not found\n")
+
+    def _body(self, src):
+        size = int(self.headers.get("Content-Length") or 0)
+        if size > src.max_body:
+            self.close_connection = True
+            self._reply(413, b"request too large\n")
+            return None
+        body = self.rfile.read(size)
+        if self.headers.get("Content-Encoding", "").lower() == "gzip":
+            d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                body = d.decompress(body, 8 * src.max_body)
+            except zlib.error as e:
+                self._reply(400, ("bad gzip body: %s\n" % e).encode())
+                return None
+            if d.unconsumed_tail:
+                self._reply(413, b"request too large\n")
+                return None
+        return body
+
+    def do_POST(self):
+        src = self.server.source
+        path, _, query = self.path.partition("?")
+        if path == "/write":
+            self._write(src, urllib.parse.parse_qs(query))
+            return
+        body = self._body(src)
+        if body is None:
+            return
+        if not path.startswith("/push/") or len(path) <= len("/push/"):
+            self._reply(404, b"not found\n")
+            return
+        device = path[len("/push/"):]
+        try:
+            points = parse_rows(body, src.measurement)
+        except PARSE_ERRORS as e:
+            src.pipeline.reject(src, device, e)
+            self._reply(400, ("bad payload: %s\n" % e).encode())
+            return
+        src.pipeline.submit(src, points, device)
+        self._reply(204)
+
+    def _write(self, src, q):
+        pipe = src.pipeline
+        body = self._body(src)           # read first: the connection is reused
+        if body is None:
+            return
+        db = q.get("db", [None])[0]
+        if src.db is not None and db != src.db:
+            self._reply(404, json.dumps({"error": "database not found: %s" % db}).encode() + b"\n",
+                        "application/json")
+            return
+        precision = q.get("precision", ["n"])[0]
+        if precision not in PRECISION_TO_MS:
+            self._reply(400, b'{"error":"invalid precision"}\n', "application/json")
+            return
+        if pipe.writer.backlog() > src.max_backlog:
+            with pipe._lock:
+                src.throttled += 1
+            self.send_response(503)
+            self.send_header("Retry-After", "5")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        device = q.get("device", [None])[0]
+        clock = self.headers.get("X-Device-Millis")
+        try:
+            lines, errors = rewrite_lines(body.decode("utf-8"), pipe.line_tags(device), precision,
+                                          int(time.time() * 1000), int(clock) if clock else None)
+        except (UnicodeDecodeError, ValueError) as e:
+            pipe.reject(src, device or self.client_address[0], e)
+            self._reply(400, json.dumps({"error": str(e)}).encode() + b"\n", "application/json")
+            return
+        if lines:
+            pipe.submit_lines(src, lines, device)
+        if errors:
+            with pipe._lock:
+                src.rejected_lines += len(errors)
+            pipe.reject(src, device or self.client_address[0], "%d bad line(s), first: line %d: %s"
+                        % (len(errors), errors[0][0], errors[0][1]))
+            msg = "partial write: line %d: %s (%d bad of %d)" % (errors[0][0], errors[0][1], len(errors),
+                                                                 len(errors) + len(lines))
+            self._reply(400, json.dumps({"error": msg}).encode() + b"\n", "application/json")
+            return
+        self._reply(204)
+
+    def log_message(self, *args):
+        pass
+
+
+# ---- service ----
+def build(config, log=print):
+    """Config dict (see the top of this file) -> Pipeline with its sources."""
+    ic = config.get("influx", {})
+    writer = InfluxWriter(ic.get("url", "http://localhost:8086/write"), ic.get("db", "lab4"),
+                          batch_lines=ic.get("batch", 5000), flush_ms=ic.get("flush_ms", 1000),
+                          workers=ic.get("workers", 2), compress=ic.get("gzip", False),
+                          spool=ic.get("spool"), log=log)
+    pipe = Pipeline(writer, config.get("tags"), config.get("devices"), config.get("digits"), log=log)
+    for sc in config.get("sources", []):
+        sc = dict(sc)
+        kind = sc.pop("type")
+        if kind == "serial" and "parser" in sc:
+            sc["parser"] = PARSERS[sc["parser"]]
+        pipe.add({"serial": SerialSource, "mqtt": MqttSource, "http": HttpSource}[kind](**sc))
+    return pipe
+
+
+def serve(pipe, stats_s=10):
+    """Run the sources until Ctrl-C, printing Pipeline.stats() periodically."""
+    pipe.start()
+    window = {}
+    try:
+        while True:
+            time.sleep(stats_s)
+            print("[STATS]", json.dumps(pipe.stats(window)))
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+    finally:
+        pipe.stop()
+        print("[STATS]", json.dumps(pipe.stats(window)))
+
+
+def _tag_arg(s):
+    k, sep, v = s.partition("=")
+    if not sep or not k:
+        raise argparse.ArgumentTypeError("expected key=value, got %r" % s)
+    return k, v
+
+
+def add_common_args(ap):
+    ap.add_argument("--influx", help="InfluxDB v1 write URL (default http://localhost:8086/write)")
+    ap.add_argument("--db")
+    ap.add_argument("--tag", action="append", type=_tag_arg, default=[], help="extra tag key=value on every point")
+    ap.add_argument("--batch", type=int, help="points per write")
+    ap.add_argument("--workers", type=int, help="parallel write connections")
+    ap.add_argument("--gzip", action="store_true", help="gzip request bodies")
+    ap.add_argument("--spool", help="file for points the database could not take (replayed later)")
+    ap.add_argument("--stats", type=float, help="seconds between throughput reports")
+
+
+def apply_common_args(config, args):
+    ic = config.setdefault("influx", {})
+    for key, val in (("url", args.influx), ("db", args.db), ("batch", args.batch),
+                     ("workers", args.workers), ("spool", args.spool)):
+        if val is not None:
+            ic[key] = val
+    if args.gzip:
+        ic["gzip"] = True
+    config.setdefault("tags", {}).update(dict(args.tag))
+    if args.stats:
+        config["stats_s"] = args.stats
+    return config
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--config", help="JSON config file")
+    ap.add_argument("--mqtt", metavar="BROKER", help="add an MQTT source")
+    ap.add_argument("--serial", metavar="PORT", help="add a serial source (air mouse output)")
+    ap.add_argument("--http", metavar="PORT", type=int, help="add an HTTP push source")
+    add_common_args(ap)
+    args = ap.parse_args()
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    sources = config.setdefault("sources", [])
+    if args.mqtt:
+        sources.append({"type": "mqtt", "broker": args.mqtt})
+    if args.serial:
+        sources.append({"type": "serial", "port": args.serial})
+    if args.http:
+        sources.append({"type": "http", "port": args.http})
+    if not sources:
+        ap.error("no sources: use --config, --mqtt, --serial or --http")
+    apply_common_args(config, args)
+    serve(build(config), config.get("stats_s", 10))
+
+
+if __name__ == "__main__":
+    main()
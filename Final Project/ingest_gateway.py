@@ -0,0 +1,42 @@
+# ingest_gateway.py - Local HTTP ingest gateway in front of InfluxDB
+#
+# Runs on a laptop/server (CPython) and speaks InfluxDB v1's write API, so
+# firmware only changes host and port: devices POST batches of line
+# protocol (optionally gzip) to /write, the gateway validates every line,
+# adds the device/site tags and forwards them through the shared pipeline
+# in ingest.py - a few pooled connections and large batches, whatever the
+# number of devices or how often they reconnect.
+#
+#     python ingest_gateway.py --db air_mouse --port 8090 --spool gateway.spool
+#
+#     POST /write?db=air_mouse&precision=ms&device=airmouse1
+#     X-Device-Millis: 123456            (optional: timestamps are millis())
+#     motion dx=0.195,dy=0.226 123001
+#     motion dx=0.210,dy=0.230 123016
+#
+# 204 when every line was taken, 400 naming the first bad line otherwise
+# (the good ones are still written), 503 with Retry-After while InfluxDB is
+# backed up. GET /metrics returns the pipeline counters as JSON.
+
+import argparse
+
+import ingest
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8090)
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--max-body", type=int, default=1 << 20, help="largest request body in bytes")
+    ingest.add_common_args(ap)
+    args = ap.parse_args()
+    config = {"influx": {"db": "air_mouse"},
+              "sources": [{"type": "http", "port": args.port, "host": args.host, "max_body": args.max_body}]}
+    ingest.apply_common_args(config, args)
+    # only accept writes for the database we forward to
+    config["sources"][0]["db"] = config["influx"]["db"]
+    ingest.serve(ingest.build(config), config.get("stats_s", 10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# lineproto.py - InfluxDB line protocol encoding for the host services
+#
+# Runs on a laptop/server (CPython). One place for the rules every writer
+# in this folder must follow:
+#   - measurement: escape "," and " "
+#   - tag keys/values and field keys: escape ",", "=" and " "
+#   - string field values: quoted, escape '"' and "\"
+#   - Python floats and Template float fields are written without the "i"
+#     suffix (optionally with a fixed number of digits), integers with it,
+#     booleans as true/false - so a whole reading can't flip a field's type
+#   - NaN/inf (which InfluxDB rejects) and None fields are left out
+# Newlines can't appear inside a line, so they become spaces in names and
+# "\n" in string values.
+#
+#     lineproto.format_line("bmp280", {"device": "lab 2"}, {"temperature": 21.0}, 1735689615000)
+#         -> 'bmp280,device=lab\ 2 temperature=21.0 1735689615000'
+#
+#     motion = lineproto.Template("motion", [("dx", float), ("dy", float)],
+#                                 tags={"device": "esp32"}, digits=3)
+#     motion.line(0.1954, -0.2, 1735689615000)
+#         -> 'motion,device=esp32 dx=0.195,dy=-0.200 1735689615000'
+#
+# A Template escapes its measurement and tags once and renders a point
+# with a single % format; encode_batch() turns a list of points into one
+# bytes body, escaping each distinct series only once.
+
+import functools
+import math
+import re
+
+_MEAS = str.maketrans({",": "\\,", " ": "\\ ", "\n": "\\ "})
+_KEY = str.maketrans({",": "\\,", "=": "\\=", " ": "\\ ", "\n": "\\ "})
+_STR = str.maketrans({'"': '\\"', "\\": "\\\\", "\n": "\\n"})
+_INF = math.inf
+
+
+@functools.lru_cache(maxsize=4096)
+def escape_measurement(s):
+    return s.translate(_MEAS)
+
+
+@functools.lru_cache(maxsize=4096)
+def escape_key(s):
+    """Tag key, tag value or field key."""
+    return s.translate(_KEY)
+
+
+def format_value(v, digits=None):
+    """Field value -> its line-protocol text, or None to leave it out."""
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, int):
+        return "%di" % v
+    if isinstance(v, float):
+        if not math.isfinite(v):
+            return None
+        return repr(v) if digits is None else "%.*f" % (digits, v)
+    if isinstance(v, str):
+        return '"%s"' % v.translate(_STR)
+    return None
+
+
+def series_key(measurement, tags):
+    """'measurement,tag=value,...' with tag keys sorted, as InfluxDB stores
+    them; empty tag values are left out (InfluxDB rejects them)."""
+    return escape_measurement(measurement) + "".join(
+        ",%s=%s" % (escape_key(k), escape_key(str(v))) for k, v in sorted(tags.items()) if v != "" and v is not None)
+
+
+def format_fields(fields, digits=None):
+    """{name: value} -> 'a=1.5,b=2i' ("" when no field is writable)."""
+    out = []
+    for k, v in fields.items():
+        f = format_value(v, digits)
+        if f is not None:
+            out.append("%s=%s" % (escape_key(k), f))
+    return ",".join(out)
+
+
+def format_line(measurement, tags, fields, ts=None, digits=None):
+    """One point -> one line (None without writable fields)."""
+    f = format_fields(fields, digits)
+    if not f:
+        return None
+    if ts is None:
+        return "%s %s" % (series_key(measurement, tags), f)
+    return "%s %s %d" % (series_key(measurement, tags), f, ts)
+
+
+class Template:
+    """A fixed measurement/tag set/field list rendered with one % format.
+
+    fields is [(name, type)] with type float, int, bool or str; line() takes
+    the values in that order followed by the timestamp. Float fields are
+    written with `digits` decimals, or as str() gives them when None (a
+    whole number without the "i" suffix is still a float to InfluxDB); a
+    point with a NaN/inf float is rendered without that field. Int fields
+    only take ints (TypeError otherwise: "%di" would truncate a float).
+    """
+
+    def __init__(self, measurement, fields, tags=None, digits=None):
+        self.names = [name for name, _ in fields]
+        self.types = [typ for _, typ in fields]
+        self.digits = digits
+        self.prefix = series_key(measurement, tags or {})
+        self._floats = [i for i, typ in enumerate(self.types) if typ is float]
+        self._ints = [i for i, typ in enumerate(self.types) if typ is int]
+        specs = []
+        for name, typ in fields:
+            if typ is float:
+                # str(21) is "21", which InfluxDB reads as a float too
+                spec = "%s" if digits is None else "%%.%df" % digits
+            elif typ is int:
+                spec = "%di"
+            elif typ in (bool, str):
+                spec = "%s"
+            else:
+                raise TypeError("unsupported field type %r for %s" % (typ, name))
+            specs.append("%s=%s" % (escape_key(name).replace("%", "%%"), spec))
+        self._fields = " " + ",".join(specs)
+        self._fmt = self._fields + " %d"
+        # numeric fields format straight from the values; bool/str fields
+        # go through _convert()
+        self._direct = all(t in (float, int) for t in self.types)
+
+    def _convert(self, values):
+        out = []
+        for typ, v in zip(self.types, values):
+            if typ is bool:
+                v = "true" if v else "false"
+            elif typ is str:
+                v = '"%s"' % str(v).translate(_STR)
+            out.append(v)
+        return out
+
+    def _finite(self, values):
+        # Checks the values, not the rendered text: a field or tag named
+        # "info" must not send every point down the slow path
+        for i in self._ints:
+            if not isinstance(values[i], int):
+                raise TypeError("int field %s got %r; round it first" % (self.names[i], values[i]))
+        for i in self._floats:
+            v = values[i]
+            if v != v or v == _INF or v == -_INF:
+                return False
+        return True
+
+    def line(self, *values):
+        """line(v1, v2, ..., ts) -> str; ts may be None (server time)."""
+        ts = values[-1]
+        if not self._finite(values):
+            return self._slow(values[:-1], ts)
+        if self._direct and ts is not None:
+            return self.prefix + self._fmt % values
+        raw = values[:-1]
+        values = raw if self._direct else self._convert(raw)
+        return self.prefix + (self._fields % tuple(values) if ts is None else self._fmt % (*values, ts))
+
+    def lines(self, rows):
+        """[(v1, v2, ..., ts), ...] -> [str]; every ts must be set."""
+        if not self._direct:
+            return [self.line(*row) for row in rows]
+        prefix, fmt, finite = self.prefix, self._fmt, self._finite
+        return [prefix + fmt % row if finite(row) else self._slow(row[:-1], row[-1]) for row in rows]
+
+    def _slow(self, raw, ts):
+        # rare: redo it the generic way, which drops non-finite fields
+        fields = {n: float(v) if t is float else v for n, t, v in zip(self.names, self.types, raw)}
+        return format_line_prefixed(self.prefix, fields, ts, self.digits)
+
+
+def format_line_prefixed(prefix, fields, ts=None, digits=None):
+    """Like format_line() for an already escaped series key."""
+    f = format_fields(fields, digits)
+    if not f:
+        return None
+    return "%s %s" % (prefix, f) if ts is None else "%s %s %d" % (prefix, f, ts)
+
+
+def encode_batch(points, digits=None):
+    """[(measurement, tags, fields, ts)] -> one newline-terminated bytes body.
+
+    Each distinct (measurement, tags) is escaped once per batch; points
+    without writable fields are skipped.
+    """
+    series = {}
+    out = []
+    for measurement, tags, fields, ts in points:
+        key = (measurement, tuple(tags.items()))
+        prefix = series.get(key)
+        if prefix is None:
+            prefix = series[key] = series_key(measurement, tags)
+        line = format_line_prefixed(prefix, fields, ts, digits)
+        if line is not None:
+            out.append(line)
+    if not out:
+        return b""
+    out.append("")
+    return "\n".join(out).encode("utf-8")
+
+
+# ---- parsing (what the HTTP gateway accepts) ----
+_NAME = r'(?:[^ ,=\\]|\\.)+'
+_VALUE = (r'(?:"(?:[^"\\]|\\.)*"|-?\d+[iu]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+          r'|[tT]|true|True|TRUE|[fF]|false|False|FALSE)')
+# groups: measurement, ",tag=value..." (may be empty), fields, timestamp or None
+LINE_RE = re.compile(r'((?:[^ ,\\]|\\.)+)((?:,%s=%s)*) (%s=%s(?:,%s=%s)*)(?: (-?\d+))?$'
+                     % (_NAME, _NAME, _NAME, _VALUE, _NAME, _VALUE))
+TAG_KEY_RE = re.compile(r',(%s)=' % _NAME)
+
+
+def is_valid(line):
+    return LINE_RE.match(line) is not None
@@ -0,0 +1,48 @@
+# mqtt_to_influx.py - MQTT -> InfluxDB bridge for the Lab4 device topics
+#
+# Runs on a laptop/server (CPython) in place of the Node-RED flow. Subscribes
+# to the device topics (a + wildcard covers a whole fleet), decodes every
+# payload the boards send and writes the samples to InfluxDB through the
+# shared pipeline in ingest.py, tagged with the device name taken from the
+# topic:
+#
+#     pip install paho-mqtt
+#     python mqtt_to_influx.py --influx http://localhost:8086/write --db lab4
+#     python mqtt_to_influx.py --topic /aupp/esp32/group6 --tag site=aupp --gzip
+#
+# Payloads understood (see Lab4/Readme.md):
+#   - JSON arrays of {"ts": ms, field: value, ...} rows from lib/sample_buffer.py
+#     (a single object, or ThingsBoard {"ts", "values"} rows, work too)
+#   - binary frames from lib/frames.py on <topic>/bin, via Lab4/frame_decoder.py
+#
+# The MQTT callback only parses and hands lines to the writer, so one
+# process keeps up with thousands of devices. Throughput (messages, points,
+# write latency, backlog) is printed every --stats seconds.
+
+import argparse
+
+import ingest
+
+DEFAULT_BROKER = "test.mosquitto.org"
+DEFAULT_TOPICS = ["/aupp/esp32/+", "/aupp/esp32/+/bin"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--broker", default=DEFAULT_BROKER)
+    ap.add_argument("--port", type=int, default=1883)
+    ap.add_argument("--topic", action="append", help="topic filter, repeatable (default: %s)" % " ".join(DEFAULT_TOPICS))
+    ap.add_argument("--client-id", default="influx-bridge", help="persistent session: QoS 1 messages queue while the bridge is down")
+    ap.add_argument("--measurement", default="bmp280")
+    ingest.add_common_args(ap)
+    args = ap.parse_args()
+    config = {"influx": {"db": "lab4"},
+              "sources": [{"type": "mqtt", "broker": args.broker, "port": args.port,
+                           "topics": args.topic or DEFAULT_TOPICS, "client_id": args.client_id,
+                           "measurement": args.measurement}]}
+    ingest.apply_common_args(config, args)
+    ingest.serve(ingest.build(config), config.get("stats_s", 10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bench_dashboard.py - Request latency of the LAB2 web dashboard
+#
+# Runs ESP32_Dashboard.py through the simulator in ../sim with a browser-like
+# request mix (the page's /data poll every 2 s plus button clicks) and
+# reports, per path, the device time from the request arriving to close():
+#     python bench_dashboard.py [--seconds 60] [script.py]
+#
+# Pass another script (e.g. an older copy of ESP32_Dashboard.py) to compare.
+# A second run sends three requests on one keep-alive connection, as a
+# browser does, and checks that all three are answered on it.
+
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from sim import Board, Runtime, devices  # noqa: E402
+
+CLICKS = ("/", "/led_on", "/show_both_sensors", "/led_off", "/lcd_text?msg=Hello%20LAB2", "/show_distance")
+
+
+def _request(board, path, at_ms):
+    conn = board.http_request(path, at_ms=at_ms)
+    conn["at_ms"] = at_ms
+    return conn
+
+
+def schedule(board, seconds, poll_ms=2000, start_ms=3000):
+    conns = []
+    t = start_ms
+    i = 0
+    while t < seconds * 1000 - 1000:
+        conns.append(_request(board, "/data", t))
+        if i % 3 == 0:
+            conns.append(_request(board, CLICKS[(i // 3) % len(CLICKS)], t + 700))
+        t += poll_ms
+        i += 1
+    return conns
+
+
+def run(script, seconds):
+    board = Board().add_defaults()
+    conns = schedule(board, seconds)
+    rt = Runtime(board, paths=[os.path.dirname(os.path.abspath(script))])
+    result = rt.run(script, seconds)
+    if result.error:
+        raise result.error
+    return board, [c for c in conns if "closed_ms" in c], getattr(result.namespace, "app", None)
+
+
+KEEPALIVE_PATHS = ("/data", "/data", "/")
+
+
+def keepalive(script):
+    """Three requests on one connection: (responses, requests on reused connections)."""
+    board = Board().add_defaults()
+    conn = board.http_request(KEEPALIVE_PATHS[0], at_ms=3000, then=KEEPALIVE_PATHS[1:])
+    rt = Runtime(board, paths=[os.path.dirname(os.path.abspath(script))])
+    result = rt.run(script, 5)
+    if result.error:
+        raise result.error
+    app = result.namespace.app
+    return conn.get("response", b"").count(b"HTTP/1.1 "), app.reused
+
+
+def report(board, conns, app=None):
+    per_path = {}
+    for conn in conns:
+        per_path.setdefault(conn["path"].split("?")[0], []).append(
+            (conn["closed_ms"] - conn["at_ms"], len(conn["response"])))
+    print("{:<22}{:>6}{:>10}{:>10}{:>12}".format("path", "n", "mean ms", "max ms", "bytes sent"))
+    for path, rows in sorted(per_path.items()):
+        lat = [ms for ms, _ in rows]
+        print("{:<22}{:>6}{:>10.1f}{:>10}{:>12}".format(
+            path, len(rows), sum(lat) / len(lat), max(lat), max(n for _, n in rows)))
+    dht = board.device(devices.Dht)
+    print("DHT measure() calls: %d in %.0f s" % (dht.reads, board.clock.now_us / 1e6))
+    if app is not None:
+        print("server: %d connections, %d requests, %d on kept-alive connections, %d errors"
+              % (app.connections, app.requests, app.reused, app.errors))
+    return per_path
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("script", nargs="?", default=os.path.join(HERE, "ESP32_Dashboard.py"))
+    ap.add_argument("--seconds", type=float, default=60)
+    args = ap.parse_args()
+    report(*run(args.script, args.seconds))
+    answered, reused = keepalive(args.script)
+    print("keep-alive: %d of %d requests answered on one connection, %d on the reused connection"
+          % (answered, len(KEEPALIVE_PATHS), reused))
+    assert answered == len(KEEPALIVE_PATHS) and reused == len(KEEPALIVE_PATHS) - 1
+
+
+if __name__ == "__main__":
+    main()
@@ -28,12 +28,14 @@ ENABLE = 0x04
 BACKLIGHT = 0x08
 
 class I2cLcd(LcdApi):
-    def __init__(self, i2c, i2c_addr, num_lines, num_columns):
+    def __init__(self, i2c, i2c_addr, num_lines, num_columns, batched=True):
         self.i2c = i2c
         self.i2c_addr = i2c_addr
         self.num_lines = num_lines
         self.num_columns = num_columns
         self.backlight = BACKLIGHT
+        # batched: putstr() sends the whole enable-strobe sequence in one I2C write
+        self.batch_writes = batched
         self.init_lcd()
         super().__init__(num_lines, num_columns)
 
@@ -50,6 +52,11 @@ class I2cLcd(LcdApi):
         self.hal_write(low | mode)
 
     def hal_write(self, data):
+        if self._batch is not None:
+            # PCF8574 latches each byte, so E high/low are just two bytes
+            self._batch.append(data | self.backlight | ENABLE)
+            self._batch.append(data | self.backlight)
+            return
         self.i2c.writeto(self.i2c_addr, bytearray([data | self.backlight | ENABLE]))
         time.sleep_us(500)
         self.i2c.writeto(self.i2c_addr, bytearray([data | self.backlight]))
@@ -61,6 +68,13 @@ class I2cLcd(LcdApi):
     def write_data(self, data):
         self.hal_write_byte(data, 1)
 
+    # LcdApi hooks
+    hal_write_command = write_cmd
+    hal_write_data = write_data
+
+    def hal_write_batch(self, buf):
+        self.i2c.writeto(self.i2c_addr, buf)
+
     def init_lcd(self):
         time.sleep_ms(20)
         self.hal_write_init_nibble(0x30)
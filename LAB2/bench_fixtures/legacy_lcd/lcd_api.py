@@ -21,6 +21,11 @@ LCD_SET_CGRAM   = 0x40
 LCD_SET_DDRAM   = 0x80
 
 class LcdApi:
+    # Drivers that set batch_writes queue every byte of putstr() into _batch
+    # and send it with one hal_write_batch() call.
+    batch_writes = False
+    _batch = None
+
     def __init__(self, num_lines, num_columns):
         self.num_lines = num_lines
         self.num_columns = num_columns
@@ -77,8 +82,19 @@ class LcdApi:
                 self.move_to(self.cursor_x, self.cursor_y)
 
     def putstr(self, string):
-        for c in string:
-            self.putchar(c)
+        if not self.batch_writes:
+            for c in string:
+                self.putchar(c)
+            return
+        self._batch = bytearray()
+        try:
+            for c in string:
+                self.putchar(c)
+            buf = self._batch
+        finally:
+            self._batch = None
+        if buf:
+            self.hal_write_batch(buf)
 
     # Must be implemented by subclass:
     def hal_write_command(self, cmd):  # pragma: no cover
@@ -86,3 +102,6 @@ class LcdApi:
 
     def hal_write_data(self, data):    # pragma: no cover
         raise NotImplementedError
+
+    def hal_write_batch(self, buf):    # pragma: no cover
+        raise NotImplementedError
@@ -0,0 +1,99 @@
+# lcd_framebuffer.py - Shadow framebuffer for HD44780 character LCDs (MicroPython)
+#
+# Wraps any driver with move_to(col, row) and putstr(text) (LAB2 LcdApi
+# drivers and the parking I2cLcd). Callers draw into a back buffer; flush()
+# compares it with what is already on the glass and only sends cursor moves
+# and characters for cells that changed. No clear() (a 2 ms command that
+# blanks the screen and causes flicker) is needed between updates.
+#
+# Usage:
+#     fb = LcdFramebuffer(lcd, 2, 16)
+#     fb.write(0, "Dist: %.1f cm" % d)
+#     fb.write(1, "Temp: %.1f C" % t)
+#     fb.flush()
+
+BLANK = 0x20
+
+
+class LcdFramebuffer:
+    def __init__(self, lcd, rows=2, cols=16, clear=True):
+        self.lcd = lcd
+        self.rows = rows
+        self.cols = cols
+        self.back = [bytearray(b" " * cols) for _ in range(rows)]
+        self.front = [bytearray(b" " * cols) for _ in range(rows)]
+        self._cursor = None   # (col, row) the LCD will write to next, if known
+        self._stale = not clear
+        self.cells_written = 0
+        self.moves = 0
+        if clear:
+            lcd.clear()
+            self._cursor = (0, 0)
+
+    # ---- drawing (back buffer only, no I2C) ----
+    def clear(self):
+        for row in self.back:
+            row[:] = b" " * self.cols
+
+    def write(self, row, text, col=0, pad=True):
+        """Put text at (col, row); pad=True blanks the rest of the row."""
+        if not 0 <= row < self.rows:
+            return
+        buf = self.back[row]
+        end = self.cols if pad else min(col + len(text), self.cols)
+        for i in range(col, end):
+            j = i - col
+            buf[i] = ord(text[j]) & 0xFF if j < len(text) else BLANK
+
+    def set_lines(self, *lines):
+        for r in range(self.rows):
+            self.write(r, lines[r] if r < len(lines) else "")
+
+    def text(self, row):
+        return _to_str(self.back[row], 0, self.cols)
+
+    def invalidate(self):
+        """Forget what is on screen (e.g. after another writer touched it)."""
+        self._stale = True
+        self._cursor = None
+
+    # ---- output ----
+    def flush(self):
+        """Send only the changed cells. Returns the number of cells written."""
+        written = 0
+        for r in range(self.rows):
+            back = self.back[r]
+            front = self.front[r]
+            if self._stale:
+                for i in range(self.cols):
+                    front[i] = back[i] ^ 0xFF   # differs from every cell
+            c = 0
+            while c < self.cols:
+                if back[c] == front[c]:
+                    c += 1
+                    continue
+                start = c
+                # extend the run; a single unchanged cell is cheaper to
+                # rewrite than a second cursor move
+                while c < self.cols and (back[c] != front[c] or
+                                         (c + 1 < self.cols and back[c + 1] != front[c + 1])):
+                    c += 1
+                if self._cursor != (start, r):
+                    self.lcd.move_to(start, r)
+                    self.moves += 1
+                self.lcd.putstr(_to_str(back, start, c))
+                front[start:c] = back[start:c]
+                written += c - start
+                self._cursor = (c, r) if c < self.cols else None
+        self._stale = False
+        self.cells_written += written
+        return written
+
+
+def _to_str(buf, start, end):
+    # HD44780 codes above 0x7F (e.g. 0xDF degree sign) are not valid UTF-8
+    chunk = bytes(buf[start:end])
+    try:
+        return chunk.decode()
+    except UnicodeError:
+        return "".join(chr(b) for b in chunk)
@@ -9,10 +9,12 @@ MASK_BL = 0x08  # backlight
 SHIFT_DATA = 4  # D4..D7 on P4..P7
 
 class I2cLcd(LcdApi):
-    def __init__(self, i2c, i2c_addr, num_lines, num_columns, backlight=True):
+    def __init__(self, i2c, i2c_addr, num_lines, num_columns, backlight=True, batched=True):
         self.i2c = i2c
         self.i2c_addr = i2c_addr
         self.backlight = MASK_BL if backlight else 0
+        # batched: putstr() sends the whole enable-strobe sequence in one I2C write
+        self.batch_writes = batched
         self._byte(0)  # ensure something sent
         # Init sequence for 4-bit
         self._write_init_nibble(0x30)
@@ -45,9 +47,21 @@ class I2cLcd(LcdApi):
         self._nibble(nibble)
         self._strobe()
 
+    def hal_write_batch(self, buf):
+        self._last = buf[-1]
+        self.i2c.writeto(self.i2c_addr, buf)
+
     def _write4(self, value, rs):
         high = (value & 0xF0)
         low  = ((value << 4) & 0xF0)
+        if self._batch is not None:
+            # PCF8574 latches each byte, so E high/low are just two bytes
+            ctl = (MASK_RS if rs else 0) | self.backlight
+            self._batch.append(high | ctl | MASK_E)
+            self._batch.append(high | ctl)
+            self._batch.append(low | ctl | MASK_E)
+            self._batch.append(low | ctl)
+            return
         self._nibble(high, rs)
         self._strobe()
         self._nibble(low, rs)
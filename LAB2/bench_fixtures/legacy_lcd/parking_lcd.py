@@ -0,0 +1,81 @@
+from time import sleep_ms
+# --- 4. LCD API ---
+class LcdApi:
+    def __init__(self):
+        self.num_lines = 2
+        self.num_columns = 16
+    def putchar(self, char): raise NotImplementedError
+    def clear(self): raise NotImplementedError
+    def move_to(self, col, row): raise NotImplementedError
+    def putstr(self, string):
+        for ch in string: self.putchar(ch)
+
+MASK_RS = 0x01
+MASK_RW = 0x02
+MASK_E  = 0x04
+SHIFT_BACKLIGHT = 3
+BACKLIGHT = 1 << SHIFT_BACKLIGHT
+
+class I2cLcd(LcdApi):
+    def __init__(self, i2c, addr, rows, cols, batched=True):
+        super().__init__()
+        self.i2c = i2c
+        self.addr = addr
+        self.num_lines = rows
+        self.num_columns = cols
+        self.backlight = BACKLIGHT
+        self.batched = batched  # one I2C write per string/command instead of per nibble
+        self._init_lcd()
+
+    def _write_byte(self, data):
+        self.i2c.writeto(self.addr, bytes([data | self.backlight]))
+    def _pulse(self, data):
+        self._write_byte(data | MASK_E)
+        sleep_ms(1)
+        self._write_byte(data & ~MASK_E)
+        sleep_ms(1)
+    def _write_nibble(self, nibble):
+        self._write_byte(nibble)
+        self._pulse(nibble)
+    def _encode(self, buf, i, val, rs):
+        # PCF8574 latches each byte: E high then E low per nibble
+        for nib in (val & 0xF0, (val << 4) & 0xF0):
+            b = nib | rs | self.backlight
+            buf[i] = b | MASK_E; buf[i+1] = b
+            i += 2
+        return i
+    def _cmd(self, cmd):
+        if self.batched:
+            buf = bytearray(4)
+            self._encode(buf, 0, cmd, 0)
+            self.i2c.writeto(self.addr, buf)
+            return
+        hi = cmd & 0xF0
+        lo = (cmd << 4) & 0xF0
+        self._write_nibble(hi)
+        self._write_nibble(lo)
+    def _init_lcd(self):
+        sleep_ms(50)
+        self._write_byte(0x30); self._pulse(0x30); sleep_ms(5)
+        self._pulse(0x30); sleep_ms(1); self._pulse(0x20); sleep_ms(1)
+        self._cmd(0x28); self._cmd(0x0C); self._cmd(0x01); sleep_ms(2); self._cmd(0x06)
+    def clear(self):
+        self._cmd(0x01); sleep_ms(2)
+    def move_to(self, col, row):
+        row_offsets = [0x00,0x40,0x14,0x54]
+        self._cmd(0x80 | (col + row_offsets[row]))
+    def putchar(self, char):
+        if self.batched: return self.putstr(char)
+        val = ord(char)
+        hi = val & 0xF0
+        lo = (val <<4)&0xF0
+        self._write_nibble(hi|MASK_RS)
+        self._write_nibble(lo|MASK_RS)
+    def putstr(self, string):
+        if not self.batched:
+            return super().putstr(string)
+        buf = bytearray(4 * len(string))
+        i = 0
+        for ch in string: i = self._encode(buf, i, ord(ch), MASK_RS)
+        if i: self.i2c.writeto(self.addr, buf)
+
@@ -0,0 +1,155 @@
+# bench_lcd.py - Device-time cost of driving the 16x2 I2C LCD
+#
+# Runs on a laptop through the simulator in ../sim, which models the I2C bus
+# at 400 kHz, the drivers' sleeps and the HD44780's execution times on a
+# virtual clock:
+#     python bench_lcd.py
+#
+# Compares lib/hd44780.py against the three drivers it replaced
+# (LAB2/i2c_lcd.py, LAB2/machine_i2c_lcd.py and the inline I2cLcd of
+# Mini Project/car_parking_project.py), kept in bench_fixtures/legacy_lcd.
+# Every driver is checked against the decoded panel contents (wrong output
+# is not ranked), and the unified driver must never write while the
+# controller is still busy.
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+from sim import Board, Runtime, devices  # noqa: E402
+
+STRINGS = ("FREE:3/3", "Dist: 123.4 cm", "0123456789ABCDEF", "Temp: 25.1 C    Hum: 40.0 %")
+LEGACY_DIR = os.path.join(HERE, "bench_fixtures", "legacy_lcd")
+BELL = (0x04, 0x0E, 0x0E, 0x0E, 0x1F, 0x00, 0x04, 0x00)
+# one busy-flag poll in _read_busy(): write E high, read D7, write E low
+# plus the low-nibble strobe
+TX_PER_BF_POLL = 3
+
+
+def drivers(legacy):
+    """(name, module, batched) for every driver; unified last."""
+    out = []
+    if legacy:
+        for name, mod in (("LAB2/i2c_lcd", "i2c_lcd"), ("LAB2/machine_i2c_lcd", "machine_i2c_lcd"),
+                          ("parking I2cLcd", "parking_lcd")):
+            out.append((name + " per-nibble", mod, False))
+            out.append((name + " batched", mod, True))
+    out.append(("lib/hd44780", "hd44780", True))
+    return out
+
+
+def setup(module, batched, legacy, **kw):
+    board = Board()
+    panel = board.add(devices.Pcf8574Lcd(0x27))
+    # legacy dir first so its lcd_framebuffer/lcd_api shadow nothing in lib/
+    rt = Runtime(board, paths=[legacy] if legacy and module != "hd44780" else [HERE])
+    machine = rt.import_module("machine")
+    mod = rt.import_module(module)
+    lcd = mod.I2cLcd(machine.I2C(0, freq=400000), 0x27, 2, 16, batched=batched, **kw)
+    fbmod = mod if module == "hd44780" else rt.import_module("lcd_framebuffer")
+    panel.violations = 0
+    return board, panel, lcd, fbmod
+
+
+def cost(board, panel, fn):
+    t0, tx0 = board.clock.now_us, panel.transactions
+    fn()
+    return board.clock.now_us - t0, panel.transactions - tx0
+
+
+# --- workloads ---
+def bench_putstr(module, batched, legacy, text):
+    board, panel, lcd, _ = setup(module, batched, legacy)
+    lcd.move_to(0, 0)
+    us, tx = cost(board, panel, lambda: lcd.putstr(text))
+    shown = "".join(panel.lines())[:len(text)]
+    return us, tx, panel.violations, shown == text
+
+
+def bench_redraw(module, batched, legacy, **kw):
+    """The LAB2 pattern before the framebuffer: clear() then both lines, 10 times."""
+    board, panel, lcd, _ = setup(module, batched, legacy, **kw)
+
+    def run():
+        for i in range(10):
+            lcd.clear()
+            lcd.putstr("Dist: %5.1f cm" % (100 + i))
+            lcd.move_to(0, 1)
+            lcd.putstr("Temp: 25.%d C" % i)
+    us, tx = cost(board, panel, run)
+    return us, tx, panel.violations, panel.lines() == ["Dist: 109.0 cm  ", "Temp: 25.9 C    "]
+
+
+def bench_frames(module, batched, legacy):
+    """Framebuffer updates where one digit changes per frame, 10 frames."""
+    board, panel, lcd, fbmod = setup(module, batched, legacy)
+    fb = fbmod.LcdFramebuffer(lcd, 2, 16)
+    fb.write(1, "IP:192.168.1.42")
+    fb.flush()
+
+    def run():
+        for i in range(10):
+            fb.write(0, "FREE:%d/3 D:%d" % (i % 4, 100 + i))
+            fb.flush()
+    us, tx = cost(board, panel, run)
+    return us, tx, panel.violations, panel.lines() == ["FREE:1/3 D:109  ", "IP:192.168.1.42 "]
+
+
+def bench_cgram(legacy):
+    """custom_char() with the same bitmap twice: the second one is free."""
+    board, panel, lcd, _ = setup("hd44780", True, legacy)
+    lcd.move_to(0, 0)   # let the clear() from init finish first
+    first = cost(board, panel, lambda: lcd.custom_char(0, BELL))
+    again = cost(board, panel, lambda: lcd.custom_char(0, BELL))
+    glyphs = [bytes([i] * 8) for i in range(10)]
+    for g in glyphs:
+        lcd.glyph(g)
+    assert bytes(panel.cgram[0:8]) == glyphs[8] and bytes(panel.cgram[8:16]) == glyphs[9]
+    return first, again
+
+
+def row(name, us, tx, bad, ok, best):
+    note = "" if ok else "  WRONG OUTPUT"
+    if bad:
+        note += "  BUSY VIOLATIONS: %d" % bad
+    print("  {:<34}{:>10.2f} ms{:>6} tx{:>8.1f}x{}".format(name, us / 1000, tx, us / best, note))
+
+
+def compare(title, results):
+    """Drivers that show the wrong text are listed but not ranked."""
+    print(title)
+    best = min(us for _, us, _, _, ok in results if ok)
+    for r in results:
+        row(*r, best)
+    name, us, _, bad, ok = results[-1]
+    assert name == "lib/hd44780" and ok and us <= best and not bad, "lib/hd44780 lost: " + title
+
+
+def main():
+    legacy = LEGACY_DIR if os.path.isdir(LEGACY_DIR) else None
+    if legacy is None:
+        print("[BENCH] %s not found; timing lib/hd44780 only" % LEGACY_DIR)
+    drv = drivers(legacy)
+    for text in STRINGS:
+        compare("putstr(%r)" % text, [(n,) + bench_putstr(m, b, legacy, text) for n, m, b in drv])
+    compare("clear() + 2 lines, x10", [(n,) + bench_redraw(m, b, legacy) for n, m, b in drv])
+    compare("LcdFramebuffer, 1-2 cells change, x10 frames",
+            [(n,) + bench_frames(m, b, legacy) for n, m, b in drv if b])
+    _, tx_timed, _, _ = bench_redraw("hd44780", True, legacy)
+    us, tx, bad, ok = bench_redraw("hd44780", True, legacy, busy_flag=True)
+    assert ok and not bad
+    # the same writes as the timed run; every extra transaction is polling
+    print("clear() + 2 lines, x10 with busy_flag=True: %.2f ms, %d BF polls"
+          % (us / 1000, (tx - tx_timed) // TX_PER_BF_POLL))
+    (us1, tx1), (us2, tx2) = bench_cgram(legacy)
+    print("custom_char(): first %.2f ms / %d tx, cached %.2f ms / %d tx" % (us1 / 1000, tx1, us2 / 1000, tx2))
+    if legacy:
+        print("[BENCH] lib/hd44780 at least as fast as every legacy driver in every workload, no busy violations")
+    else:
+        print("[BENCH] lib/hd44780 correct in every workload, no busy violations")
+
+
+if __name__ == "__main__":
+    main()
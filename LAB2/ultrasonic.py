@@ -1,19 +1,11 @@
-from machine import Pin, time_pulse_us
-from time import sleep, sleep_us
+from machine import Pin
+from time import sleep_ms
+from hcsr04 import HCSR04  # lib/hcsr04.py
 
-TRIG = Pin(27, Pin.OUT)
-ECHO = Pin(26, Pin.IN)  
-
-def distance_cm():
-    TRIG.off(); sleep_us(2)
-    TRIG.on();  sleep_us(10)
-    TRIG.off()
-    t = time_pulse_us(ECHO, 1, 30000)  # timeout 30ms
-    if t < 0:
-        return None
-    return (t * 0.0343) / 2.0
+sonar = HCSR04(Pin(27, Pin.OUT), Pin(26, Pin.IN))
 
 while True:
-    d = distance_cm()
-    print("No echo" if d is None else f"{d:.1f} cm")
-    sleep(0.2)
\ No newline at end of file
+    sonar.update()
+    d, conf = sonar.read()
+    print("No echo" if d is None else f"{d:.1f} cm (conf {conf:.0%})")
+    sleep_ms(200)
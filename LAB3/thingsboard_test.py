@@ -1,125 +1,92 @@
-import struct, math, time, network, json
-from machine import Pin, I2C
-from umqtt.simple import MQTTClient
-
-# BMP280 Class
-class BMP280:
-    def __init__(self, i2c, addr=0x76):
-        self.i2c = i2c
-        self.addr = addr
-        chip_id = self.i2c.readfrom_mem(self.addr, 0xD0, 1)[0]
-        if chip_id != 0x58:
-            raise RuntimeError("Not a BMP280, ID=%#x" % chip_id)
-        self._load_calibration()
-        self.i2c.writeto_mem(self.addr, 0xF4, b'\x27')
-        self.i2c.writeto_mem(self.addr, 0xF5, b'\xA0')
-
-    def _load_calibration(self):
-        buf = self.i2c.readfrom_mem(self.addr, 0x88, 24)
-        (self.T1, self.T2, self.T3,
-         self.P1, self.P2, self.P3, self.P4, self.P5,
-         self.P6, self.P7, self.P8, self.P9) = struct.unpack("<HhhHhhhhhhhh", buf)
-        self.t_fine = 0
-
-    def _read_raw(self):
-        d = self.i2c.readfrom_mem(self.addr, 0xF7, 6)
-        adc_p = (d[0] << 12) | (d[1] << 4) | (d[2] >> 4)
-        adc_t = (d[3] << 12) | (d[4] << 4) | (d[5] >> 4)
-        return adc_t, adc_p
-
-    def _comp_temp(self, adc_t):
-        var1 = (((adc_t >> 3) - (self.T1 << 1)) * self.T2) >> 11
-        var2 = (((((adc_t >> 4) - self.T1) * ((adc_t >> 4) - self.T1)) >> 12) * self.T3) >> 14
-        self.t_fine = var1 + var2
-        T = (self.t_fine * 5 + 128) >> 8
-        return T / 100.0
-
-    def _comp_press(self, adc_p):
-        var1 = self.t_fine - 128000
-        var2 = var1 * var1 * self.P6
-        var2 = var2 + ((var1 * self.P5) << 17)
-        var2 = var2 + (self.P4 << 35)
-        var1 = ((var1 * var1 * self.P3) >> 8) + ((var1 * self.P2) << 12)
-        var1 = (((1 << 47) + var1) * self.P1) >> 33
-        if var1 == 0:
-            return 0
-        p = 1048576 - adc_p
-        p = (((p << 31) - var2) * 3125) // var1
-        var1 = (self.P9 * (p >> 13) * (p >> 13)) >> 25
-        var2 = (self.P8 * p) >> 19
-        p = ((p + var1 + var2) >> 8) + (self.P7 << 4)
-        return p / 256.0
-
-    @property
-    def temperature(self):
-        adc_t, _ = self._read_raw()
-        return self._comp_temp(adc_t)
-
-    @property
-    def pressure(self):
-        adc_t, adc_p = self._read_raw()
-        self._comp_temp(adc_t)
-        return self._comp_press(adc_p)
-
-    @property
-    def altitude(self):
-        p = self.pressure
-        return 44330 * (1 - (p / 101325) ** (1 / 5.255))
-
-# Wi-Fi Configuration
-SSID = "Robotic WIFI"
-PASS = "rbtWIFI@2025"
-
-# ThingsBoard Configuration
-TB_HOST = "mqtt.thingsboard.cloud"
-TB_PORT = 1883
-TB_TOKEN = b"PgXDa1Wh6zIvwwmcgWpQ"
-TOPIC = b"v1/devices/me/telemetry"
-
-# Initialize I2C and BMP280
-i2c = I2C(0, scl=Pin(22), sda=Pin(21))
-bmp = BMP280(i2c, addr=0x76)
-
-# Connect to Wi-Fi
-print("Connecting to Wi-Fi...")
-w = network.WLAN(network.STA_IF)
-w.active(True)
-if not w.isconnected():
-    w.connect(SSID, PASS)
-    t = time.ticks_ms()
-    while not w.isconnected():
-        if time.ticks_diff(time.ticks_ms(), t) > 15000:
-            raise RuntimeError("Wi-Fi timeout")
-        time.sleep(0.2)
-print("Wi-Fi connected:", w.ifconfig())
-
-# Connect to MQTT
-print("Connecting to ThingsBoard...")
-c = MQTTClient(b"esp32-bmp280", TB_HOST, port=TB_PORT, user=TB_TOKEN, password=b"", keepalive=30, ssl=False)
-c.connect()
-print("Connected to ThingsBoard")
-
-# Main Loop
-while True:
-    try:
-        # Read sensor data
-        temp = round(bmp.temperature, 2)
-        pressure = round(bmp.pressure / 100, 2)  # Convert to hPa
-        altitude = round(bmp.altitude, 2)
-        
-        # Create JSON payload
-        payload = json.dumps({
-            "temperature": temp,
-            "pressure": pressure,
-            "altitude": altitude
-        }).encode("utf-8")
-        
-        # Publish to ThingsBoard
-        print(f"Publishing: Temp={temp}°C, Pressure={pressure}hPa, Altitude={altitude}m")
-        c.publish(TOPIC, payload)
-        
-        # Wait before next reading
-        time.sleep(5)
-    except Exception as e:
-        print("Error:", e)
-        time.sleep(5)
+import time, network
+from machine import Pin, I2C
+from umqtt.simple import MQTTClient
+from bmp280 import BMP280  # lib/bmp280.py
+from sample_buffer import SampleBuffer, thingsboard_batch  # lib/sample_buffer.py
+from deadband import ReportPolicy  # lib/deadband.py
+from mqtt_session import MqttSession  # lib/mqtt_session.py
+
+# Wi-Fi Configuration
+SSID = "Robotic WIFI"
+PASS = "rbtWIFI@2025"
+
+# ThingsBoard Configuration
+TB_HOST = "mqtt.thingsboard.cloud"
+TB_PORT = 1883
+TB_TOKEN = b"PgXDa1Wh6zIvwwmcgWpQ"
+TOPIC = b"v1/devices/me/telemetry"
+
+# Samples are buffered and sent as ThingsBoard [{"ts", "values"}] batches,
+# so readings taken while the broker is unreachable are sent late, not lost
+SAMPLE_MS = 5000
+BATCH = 20
+buf = SampleBuffer(120, path="spool.jsonl")
+
+# Report by exception: send a field only when it moved past its deadband,
+# and everything at least every 5 minutes
+policy = ReportPolicy({"temperature": 0.2, "pressure": 0.2, "altitude": 2.0},
+                      heartbeat_ms=300000, rates={"pressure": 0.02})
+
+# Initialize I2C and BMP280
+i2c = I2C(0, scl=Pin(22), sda=Pin(21))
+bmp = BMP280(i2c, addr=0x76, profile="low_power")  # sleeps between samples
+
+# Connect to Wi-Fi
+print("Connecting to Wi-Fi...")
+w = network.WLAN(network.STA_IF)
+w.active(True)
+if not w.isconnected():
+    w.connect(SSID, PASS)
+    t = time.ticks_ms()
+    while not w.isconnected():
+        if time.ticks_diff(time.ticks_ms(), t) > 15000:
+            raise RuntimeError("Wi-Fi timeout")
+        time.sleep(0.2)
+print("Wi-Fi connected:", w.ifconfig())
+
+# Set the RTC for the sample timestamps
+try:
+    import ntptime
+    ntptime.settime()
+except Exception as e:
+    print("NTP failed:", e)
+
+# MQTT session: reconnects Wi-Fi and ThingsBoard with backoff, keeps the
+# link alive with pings and resends QoS 1 batches until acknowledged
+print("Connecting to ThingsBoard...")
+c = MQTTClient(b"esp32-bmp280", TB_HOST, port=TB_PORT, user=TB_TOKEN, password=b"", keepalive=30, ssl=False)
+mqtt = MqttSession(c, w, SSID, PASS, window=4)
+next_sample = time.ticks_ms()
+
+# Main Loop
+while True:
+    now = time.ticks_ms()
+    if time.ticks_diff(now, next_sample) >= 0:
+        next_sample = time.ticks_add(next_sample, SAMPLE_MS)
+        try:
+            # Read sensor data (one conversion, one burst read)
+            temp, pressure, altitude = bmp.measure()
+            temp = round(temp, 2)
+            pressure = round(pressure / 100, 2)  # Convert to hPa
+            altitude = round(altitude, 2)
+            changed = policy.filter({"temperature": temp, "pressure": pressure, "altitude": altitude})
+            if changed:
+                buf.append(changed)
+            print(f"Sampled: Temp={temp}°C, Pressure={pressure}hPa, Altitude={altitude}m")
+        except Exception as e:
+            print("Error:", e)
+
+    mqtt.poll()
+
+    # Publish to ThingsBoard, oldest samples first
+    if len(buf) and mqtt.can_publish(1):
+        batch = buf.peek(BATCH)
+        if mqtt.publish(TOPIC, thingsboard_batch(batch), 1):
+            buf.pop(len(batch))
+            print(f"Publishing: {len(batch)} sample(s), {len(buf)} buffered, {policy.stats()['saved_pct']}% fields suppressed")
+            continue
+
+    # Wait before next reading (waking up for acks and pings)
+    wait = min(time.ticks_diff(next_sample, time.ticks_ms()), 50)
+    if wait > 0:
+        time.sleep_ms(wait)
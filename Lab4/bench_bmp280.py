@@ -0,0 +1,190 @@
+# bench_bmp280.py - BMP280 compensation math and profile costs
+#
+# Runs on a laptop (CPython), not on the ESP32:
+#     python bench_bmp280.py [--samples 200000]
+#
+# 1. Checks lib/bmp280.py's integer compensation against the worked
+#    example in the Bosch datasheet (section 3.12) and, bit for bit, against
+#    the per-sample BMP280 methods Lab4/LAB3 used before, then times both.
+# 2. If NumPy is installed, checks bmp280_numpy.py bit for bit against the
+#    scalar compensation (one shared and per-sample calibrations, edge raw
+#    values, an unusable calibration) and times it on 1M+ samples.
+# 3. Runs every profile on the simulated sensor in ../sim and reports the
+#    conversion time, output rate and device/I2C cost of one reading.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from sim import Board, Runtime, devices  # noqa: E402
+
+_bmp280 = Runtime(paths=[HERE]).import_module("bmp280")
+comp_temp = _bmp280.comp_temp
+comp_press = _bmp280.comp_press
+
+# datasheet 3.12: calibration, raw values and expected results
+DATASHEET_CAL = (27504, 26435, -1000, 36477, -10685, 3024, 2855, 140, -7, 15500, -14600, 6000)
+DATASHEET_RAW = (519888, 415148)
+DATASHEET_OUT = (2508, 128422, 100653.27)  # 0.01 C, t_fine, Pa (floating-point example)
+
+
+class LegacyComp:
+    """The compensation methods of the old in-file BMP280 class, kept here
+    only for comparison."""
+    def __init__(self, cal):
+        (self.T1, self.T2, self.T3,
+         self.P1, self.P2, self.P3, self.P4, self.P5,
+         self.P6, self.P7, self.P8, self.P9) = cal
+        self.t_fine = 0
+
+    def _comp_temp(self, adc_t):
+        var1 = (((adc_t >> 3) - (self.T1 << 1)) * self.T2) >> 11
+        var2 = (((((adc_t >> 4) - self.T1) * ((adc_t >> 4) - self.T1)) >> 12) * self.T3) >> 14
+        self.t_fine = var1 + var2
+        T = (self.t_fine * 5 + 128) >> 8
+        return T / 100.0
+
+    def _comp_press(self, adc_p):
+        var1 = self.t_fine - 128000
+        var2 = var1 * var1 * self.P6
+        var2 = var2 + ((var1 * self.P5) << 17)
+        var2 = var2 + (self.P4 << 35)
+        var1 = ((var1 * var1 * self.P3) >> 8) + ((var1 * self.P2) << 12)
+        var1 = (((1 << 47) + var1) * self.P1) >> 33
+        if var1 == 0:
+            return 0
+        p = 1048576 - adc_p
+        p = (((p << 31) - var2) * 3125) // var1
+        var1 = (self.P9 * (p >> 13) * (p >> 13)) >> 25
+        var2 = (self.P8 * p) >> 19
+        p = ((p + var1 + var2) >> 8) + (self.P7 << 4)
+        return p / 256.0
+
+
+def raw_samples(n, seed=1):
+    rnd = random.Random(seed)
+    # roughly -40..85 C and 300..1100 hPa for the datasheet calibration
+    return [(rnd.randint(380000, 620000), rnd.randint(150000, 600000)) for _ in range(n)]
+
+
+def check_datasheet():
+    t, t_fine = comp_temp(DATASHEET_CAL, DATASHEET_RAW[0])
+    p = comp_press(DATASHEET_CAL, DATASHEET_RAW[1], t_fine)
+    # the integer path rounds down slightly against the float example
+    assert (t, t_fine) == DATASHEET_OUT[:2] and abs(p / 256 - DATASHEET_OUT[2]) < 0.05, (t, t_fine, p)
+    print("datasheet example: %.2f C, %.2f Pa - OK" % (t / 100, p / 256))
+
+
+def bench_math(samples):
+    legacy = LegacyComp(DATASHEET_CAL)
+    t0 = time.perf_counter()
+    old = [(legacy._comp_temp(a_t), legacy._comp_press(a_p)) for a_t, a_p in samples]
+    t_old = time.perf_counter() - t0
+
+    cal = DATASHEET_CAL
+    t0 = time.perf_counter()
+    new = []
+    for a_t, a_p in samples:
+        t, t_fine = comp_temp(cal, a_t)
+        new.append((t / 100, comp_press(cal, a_p, t_fine) / 256))
+    t_new = time.perf_counter() - t0
+
+    bad = sum(1 for a, b in zip(old, new) if a != b)
+    assert not bad, "%d samples differ from the legacy compensation" % bad
+    n = len(samples)
+    print("compensation of %d raw samples (bit-exact with legacy):" % n)
+    print("  legacy methods  %8.0f samples/s" % (n / t_old))
+    print("  bmp280 module   %8.0f samples/s  (%.2fx)" % (n / t_new, t_old / t_new))
+
+
+def perturbed_cals(n, seed=2):
+    """n calibrations within +-5% of the datasheet one (uint16 T1/P1)."""
+    rnd = random.Random(seed)
+    return [tuple(int(v * rnd.uniform(0.95, 1.05)) for v in DATASHEET_CAL) for _ in range(n)]
+
+
+def bench_numpy(samples, repeat=20):
+    try:
+        import numpy as np
+    except ImportError:
+        print("numpy not installed - skipping bmp280_numpy.py")
+        return
+    sys.path.insert(0, HERE)
+    import bmp280_numpy
+
+    # edge raw values, plus an all-zero P1 (pressure must come out as 0)
+    samples = samples + [(a_t, a_p) for a_t in (380000, 519888, 620000) for a_p in (0, 1, (1 << 20) - 1)]
+    cals = perturbed_cals(len(samples))
+    cals[-1] = DATASHEET_CAL[:3] + (0,) + DATASHEET_CAL[4:]
+    adc_t = np.array([a for a, _ in samples], dtype=np.int64)
+    adc_p = np.array([a for _, a in samples], dtype=np.int64)
+    for label, cal_arg, cal_rows in (("shared calibration", DATASHEET_CAL, [DATASHEET_CAL] * len(samples)),
+                                     ("per-sample calibration", np.array(cals), cals)):
+        t_v, f_v, p_v = bmp280_numpy.compensate(cal_arg, adc_t, adc_p)
+        ref = []
+        for cal, (a_t, a_p) in zip(cal_rows, samples):
+            t, t_fine = comp_temp(cal, a_t)
+            ref.append((t, t_fine, comp_press(cal, a_p, t_fine)))
+        bad = sum(1 for r, v in zip(ref, zip(t_v.tolist(), f_v.tolist(), p_v.tolist())) if r != v)
+        assert not bad, "%s: %d samples differ from the scalar compensation" % (label, bad)
+        print("bmp280_numpy, %s: %d samples bit-exact with scalar" % (label, len(samples)))
+
+    reps = -(-1000000 // len(samples))
+    big_t = np.tile(adc_t, reps)
+    big_p = np.tile(adc_p, reps)
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        t_v, _, p_v = bmp280_numpy.compensate(DATASHEET_CAL, big_t, big_p)
+        bmp280_numpy.to_physical(t_v, p_v)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    print("  bmp280_numpy    %8.0f samples/s  (%d samples per call, best of %d)"
+          % (len(big_t) / best, len(big_t), repeat))
+
+
+def bench_profiles(readings=20):
+    print("{:<15}{:>8}{:>10}{:>12}{:>10}{:>10}".format(
+        "profile", "t_meas", "rate Hz", "ms/reading", "i2c/rd", "busy/rd"))
+    for name in _bmp280.PROFILES:
+        board = Board().add_defaults()
+        rt = Runtime(board)
+        bmp_mod = rt.import_module("bmp280")
+        machine = rt.import_module("machine")
+        bmp = bmp_mod.BMP280(machine.I2C(0, scl=machine.Pin(22), sda=machine.Pin(21)), profile=name)
+        dev = board.device(devices.Bmp280)
+        utime = rt.import_module("utime")
+        tx0, busy0, t0 = dev.transactions, dev.busy_reads, board.clock.now_us
+        spent = 0
+        for _ in range(readings):
+            s = board.clock.now_us
+            t, p, _ = bmp.measure()
+            spent += board.clock.now_us - s
+            assert abs(t - 25.0) < 0.01 and abs(p - 101325) < 1, (name, t, p)
+            utime.sleep_ms(37)   # the caller's own work between readings
+        rate = bmp.rate_hz()
+        print("{:<15}{:>6.1f}ms{:>10}{:>12.2f}{:>10.1f}{:>10.1f}".format(
+            name, bmp.t_meas_us / 1000, "%.1f" % rate if rate else "on demand",
+            spent / 1000 / readings, (dev.transactions - tx0) / readings,
+            (dev.busy_reads - busy0) / readings))
+        assert board.clock.now_us > t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--samples", type=int, default=200000)
+    args = ap.parse_args()
+    check_datasheet()
+    samples = raw_samples(args.samples)
+    bench_math(samples)
+    bench_numpy(samples)
+    print()
+    bench_profiles()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# bench_deadband.py - Report-by-exception savings and heartbeats
+#
+# Runs on a laptop (CPython), not on the ESP32:
+#     python bench_deadband.py [--minutes 120]
+#
+# Feeds lib/deadband.py one sample every 5 s (SAMPLE_MS in Lab4_IoT.py) with
+# Lab4's deadbands, rates and heartbeat, for a few patterns, and reports
+# how many fields were sent and the longest silence of each field. No
+# field may go quiet for longer than the heartbeat plus one sample - also
+# when another field of the same sample changes every time.
+
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from sim import Runtime  # noqa: E402
+
+ReportPolicy = Runtime(paths=[HERE]).import_module("deadband").ReportPolicy
+
+SAMPLE_MS = 5000
+DEADBANDS = {"temperature": 0.2, "pressure": 0.2, "altitude": 2.0}   # as in Lab4_IoT.py
+RATES = {"pressure": 0.02}
+HEARTBEAT_MS = 300000
+
+PATTERNS = (
+    # name, (t_s) -> sample
+    ("steady room", lambda t: {"temperature": 25.0, "pressure": 1013.25, "altitude": 0.0}),
+    ("slow temperature ramp", lambda t: {"temperature": 20.0 + t / 600, "pressure": 1013.25, "altitude": 0.0}),
+    # pressure moves past its deadband on every sample, the rest stay flat
+    ("one field always changing", lambda t: {"temperature": 25.0, "pressure": 1013.25 + (t // 5 % 2),
+                                             "altitude": 0.0}),
+)
+
+
+def run(sample, minutes):
+    policy = ReportPolicy(DEADBANDS, HEARTBEAT_MS, RATES)
+    last_sent = {}
+    longest = dict.fromkeys(DEADBANDS, 0)
+    for now in range(0, minutes * 60000, SAMPLE_MS):
+        out = policy.filter(sample(now // 1000), now_ms=now) or {}
+        for k in DEADBANDS:
+            if k in out:
+                last_sent[k] = now
+            longest[k] = max(longest[k], now - last_sent[k])
+    return policy.stats(), longest
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--minutes", type=int, default=120)
+    args = ap.parse_args()
+
+    print("%-26s %8s %8s %10s %7s  %s" % ("pattern", "samples", "reports", "heartbeats", "saved", "longest silence (s)"))
+    for name, sample in PATTERNS:
+        stats, longest = run(sample, args.minutes)
+        print("%-26s %8d %8d %10d %6.1f%%  %s" % (
+            name, stats["samples"], stats["reports"], stats["heartbeats"], stats["saved_pct"],
+            ", ".join("%s %d" % (k, ms // 1000) for k, ms in longest.items())))
+        assert max(longest.values()) <= HEARTBEAT_MS + SAMPLE_MS, (name, longest)
+    print("\nok: every field sent at least every %d s" % (HEARTBEAT_MS // 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bench_mqtt.py - Lab4 uplink under broker outages
+#
+# Runs Lab4_IoT.py through the simulator in ../sim, whose in-memory broker
+# answers QoS 1 publishes and pings over the client socket, and replays a
+# few outage patterns:
+#     python bench_mqtt.py [--seconds 900]
+#
+# For each one it reports what reached the broker (samples, duplicates,
+# lost), publishes, reconnects, pings and the PUBACK latency seen by
+# lib/mqtt_session.py. The sensor ramps fast enough that report by
+# exception sends every sample, so "lost" must be 0 everywhere.
+#
+# The idle scenarios hold the temperature still, so report by exception
+# leaves the link quiet and the keepalive has to carry it: PINGREQ after
+# half the keepalive, and a drop and reconnect when a broker that has gone
+# silent (the TCP connection up, nothing answered) sends no PINGRESP.
+
+import argparse
+import ast
+import json
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from sim import Board, Runtime, devices  # noqa: E402
+
+SCRIPT = os.path.join(HERE, "Lab4_IoT.py")
+SETTLE_MS = 30000            # samples newer than this may still be buffered
+
+SCENARIOS = (
+    ("no outage", []),
+    ("60 s outage", [(20000, 80000)]),
+    ("lost PUBACK", [(25610, 40000)]),          # drops inside one round trip
+    ("flapping", [(t, t + 4000) for t in range(30000, 150000, 15000)]),
+    ("10 min outage", [(20000, 620000)]),
+)
+
+# name, silent windows; constant temperature
+IDLE_SCENARIOS = (
+    ("idle", []),
+    ("no PINGRESP", [(100000, 160000)]),
+)
+
+
+def run(outages, seconds, silent=(), temperature=lambda t: 20.0 + 0.1 * t):
+    board = Board().add_defaults()
+    board.broker.outages = list(outages)
+    board.broker.silent = list(silent)
+    board.device(devices.Bmp280).temperature = temperature
+    rt = Runtime(board, paths=[HERE], fs_root=tempfile.mkdtemp(prefix="lab4_"))
+    result = rt.run(SCRIPT, seconds)
+    if result.error:
+        raise result.error
+    stamps = [row["ts"] for p in board.broker.publishes for row in json.loads(p[3])]
+    # every sample taken up to the final drain window must have arrived
+    settled = [t for t, line in board.log if line.startswith("Temp:") and t < seconds * 1000 - SETTLE_MS]
+    stats = [line for _, line in board.log if line.startswith("MQTT:")]
+    return {
+        "samples": len(set(stamps)),
+        "dups": len(stamps) - len(set(stamps)),
+        "lost": max(0, len(settled) - len(set(stamps))),
+        "publishes": len(board.broker.publishes),
+        "connects": board.broker.connects,
+        "pings": board.broker.pings,
+        "no_pingresp": sum("no PINGRESP" in line for _, line in board.log),
+        "stats": ast.literal_eval(stats[-1][len("MQTT: "):]) if stats else {},
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=900)
+    args = ap.parse_args()
+    row = "{:<16}{:>9}{:>6}{:>6}{:>11}{:>10}{:>7}{:>14}"
+    print(row.format("scenario", "samples", "dups", "lost", "publishes", "connects", "pings", "ack avg/max"))
+    for name, outages in SCENARIOS:
+        r = run(outages, args.seconds)
+        s = r["stats"]
+        print(row.format(name, r["samples"], r["dups"], r["lost"], r["publishes"], r["connects"],
+                         r["pings"], "%s/%s ms" % (s.get("ack_ms_avg"), s.get("ack_ms_max"))))
+        assert r["lost"] == 0, name
+    for name, silent in IDLE_SCENARIOS:
+        r = run([], args.seconds, silent, temperature=lambda t: 25.0)
+        s = r["stats"]
+        print(row.format(name, r["samples"], r["dups"], "-", r["publishes"], r["connects"],
+                         r["pings"], "%s/%s ms" % (s.get("ack_ms_avg"), s.get("ack_ms_max"))))
+        assert r["pings"] > 0, name
+        if silent:
+            # dropped once for the missing PINGRESP, then back after the silence
+            assert r["no_pingresp"] >= 1 and r["connects"] >= 2 and s.get("connected"), (name, r)
+        else:
+            assert r["no_pingresp"] == 0 and r["connects"] == 1, (name, r)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bmp280_numpy.py - Vectorized BMP280 compensation for raw samples (host side)
+#
+# Runs on a laptop/server (CPython + NumPy), not on the ESP32. Devices can
+# send raw adc_t/adc_p values plus their 12 calibration words, and history
+# can be reprocessed in bulk, with the same integer math as
+# lib/bmp280.py's comp_temp()/comp_press(), bit for bit:
+#
+#     import numpy as np
+#     from bmp280_numpy import compensate, to_physical
+#     t_centi, t_fine, p_q8 = compensate(cal, adc_t, adc_p)   # int64 arrays
+#     temp_c, press_pa = to_physical(t_centi, p_q8)           # float64 arrays
+#
+# cal is one calibration (12 values, as unpacked from register 0x88) for
+# all samples, or an (N, 12) array with one calibration per sample, so a
+# mixed multi-device batch needs no grouping.
+#
+# Bosch's reference pressure code is 64-bit. Two products in it can exceed
+# int64 (Python's ints never overflow), so they are split into halves that
+# fit; everything else is the reference sequence on int64 arrays, whose
+# >>, // and % round like Python's. Inputs are assumed physically sensible
+# (20-bit raw values, temperatures within the sensor's -40..85 C range).
+
+import numpy as np
+
+CAL_FIELDS = ("T1", "T2", "T3", "P1", "P2", "P3", "P4", "P5", "P6", "P7", "P8", "P9")
+
+
+def _cal(cal):
+    c = np.asarray(cal, dtype=np.int64)
+    if c.shape[-1] != 12:
+        raise ValueError("calibration needs 12 values (T1..T3, P1..P9), got shape %s" % (c.shape,))
+    return [c[..., i] for i in range(12)]
+
+
+def comp_temp(cal, adc_t):
+    """Raw temperatures -> (temperature in 0.01 C, t_fine), int64 arrays."""
+    T1, T2, T3 = _cal(cal)[:3]
+    adc_t = np.asarray(adc_t, dtype=np.int64)
+    var1 = (((adc_t >> 3) - (T1 << 1)) * T2) >> 11
+    d = (adc_t >> 4) - T1
+    var2 = (((d * d) >> 12) * T3) >> 14
+    t_fine = var1 + var2
+    return (t_fine * 5 + 128) >> 8, t_fine
+
+
+def comp_press(cal, adc_p, t_fine):
+    """Raw pressures -> pressure in Pa as Q24.8 (int64; 0 where the
+    calibration is unusable)."""
+    _, _, _, P1, P2, P3, P4, P5, P6, P7, P8, P9 = _cal(cal)
+    adc_p = np.asarray(adc_p, dtype=np.int64)
+    var1 = t_fine - 128000
+    var2 = var1 * var1 * P6
+    var2 = var2 + ((var1 * P5) << 17)
+    var2 = var2 + (P4 << 35)
+    var1 = ((var1 * var1 * P3) >> 8) + ((var1 * P2) << 12)
+    # (((1 << 47) + var1) * P1) >> 33, with x split at bit 17
+    x = (1 << 47) + var1
+    var1 = ((x >> 17) * P1 + (((x & 0x1FFFF) * P1) >> 17)) >> 16
+    bad = var1 == 0
+    div = np.where(bad, 1, var1)
+    p = 1048576 - adc_p
+    # (a * 3125) // div as q * 3125 + (r * 3125) // div, a = q * div + r
+    a = (p << 31) - var2
+    q, r = np.divmod(a, div)
+    p = q * 3125 + (r * 3125) // div
+    var1 = (P9 * (p >> 13) * (p >> 13)) >> 25
+    var2 = (P8 * p) >> 19
+    p = ((p + var1 + var2) >> 8) + (P7 << 4)
+    return np.where(bad, 0, p)
+
+
+def compensate(cal, adc_t, adc_p):
+    """(temperature in 0.01 C, t_fine, pressure in Pa Q24.8) for arrays of
+    raw samples."""
+    t, t_fine = comp_temp(cal, adc_t)
+    return t, t_fine, comp_press(cal, adc_p, t_fine)
+
+
+def to_physical(t_centi, p_q8):
+    """Integer results -> (temperature C, pressure Pa) as float64, equal to
+    the driver's t / 100 and p / 256."""
+    return np.asarray(t_centi) / 100, np.asarray(p_q8) / 256
+
+
+def altitude(press_pa, sea_level=101325):
+    """Barometric altitude in m for pressures in Pa."""
+    return 44330 * (1 - (np.asarray(press_pa) / sea_level) ** (1 / 5.255))
@@ -0,0 +1,159 @@
+# frame_decoder.py - Turns binary BMP280 frames back into JSON / line protocol
+#
+# Runs on a laptop/server (CPython), next to Node-RED and InfluxDB. With
+# PAYLOAD = "binary" or "raw" in Lab4_IoT.py the board publishes packed
+# frames (lib/frames.py) on <topic>/bin; this service subscribes to them and
+#   - republishes each frame as the JSON array Node-RED already understands
+#     on <topic> (--republish), and/or
+#   - writes the samples to InfluxDB as line protocol (--influx).
+#
+#     pip install paho-mqtt requests numpy   # numpy only for raw frames
+#     python frame_decoder.py --republish
+#     python frame_decoder.py --influx http://localhost:8086/write --db lab4
+#
+# Raw frames carry ADC counts plus the sensor's calibration and are
+# compensated here with bmp280_numpy.py, bit-exact with the board's driver.
+
+import argparse
+import json
+import os
+import struct
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "lib"))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "Final Project"))
+import frames  # noqa: E402  (lib/frames.py: shared frame layout)
+import lineproto  # noqa: E402  (Final Project/lineproto.py: escaping rules)
+
+# frame version -> scaled record layout
+SCALED = {1: frames.SCALED_V1, frames.VERSION: frames.SCALED}
+
+DEFAULT_BROKER = "test.mosquitto.org"
+DEFAULT_TOPIC = "/aupp/esp32/+/bin"
+
+
+class FrameError(ValueError):
+    pass
+
+
+def decode(frame):
+    """Frame bytes -> [{"ts": ms, field: value, ...}] in the same units as
+    the JSON payload (C, hPa, m; raw frames also keep adc_t/adc_p)."""
+    frame = bytes(frame)
+    if len(frame) < frames.HEADER_SIZE:
+        raise FrameError("short frame (%d bytes)" % len(frame))
+    version, kind, count, base = struct.unpack_from(frames.HEADER, frame, 0)
+    if version not in SCALED:
+        raise FrameError("unsupported frame version %d" % version)
+    off = frames.HEADER_SIZE
+    if kind == frames.KIND_SCALED:
+        size = struct.calcsize(SCALED[version])
+    elif kind == frames.KIND_RAW:
+        size = frames.RAW_SIZE
+        off += frames.CAL_SIZE
+    else:
+        raise FrameError("unknown frame kind %d" % kind)
+    if len(frame) != off + count * size:
+        raise FrameError("length %d does not match %d samples" % (len(frame), count))
+
+    rows = []
+    if kind == frames.KIND_SCALED:
+        for dt, mask, *ints in struct.iter_unpack(SCALED[version], frame[off:]):
+            row = {"ts": (base + dt) * 1000}
+            for i, (name, scale) in enumerate(frames.FIELDS):
+                if mask & (1 << i):
+                    row[name] = ints[i] / scale
+            rows.append(row)
+        return rows
+
+    import numpy as np
+    import bmp280_numpy
+    cal = struct.unpack_from(frames.CAL, frame, frames.HEADER_SIZE)
+    recs = np.frombuffer(frame, dtype=np.dtype([("dt", "<u2"), ("adc_t", "<u4"), ("adc_p", "<u4")]),
+                         count=count, offset=off)
+    t, _, p = bmp280_numpy.compensate(cal, recs["adc_t"], recs["adc_p"])
+    temp_c, press_pa = bmp280_numpy.to_physical(t, p)
+    alt = bmp280_numpy.altitude(press_pa)
+    for i in range(count):
+        rows.append({
+            "ts": (base + int(recs["dt"][i])) * 1000,
+            "temperature": round(float(temp_c[i]), 2),
+            "pressure": round(float(press_pa[i]) / 100, 2),
+            "altitude": round(float(alt[i]), 2),
+            "adc_t": int(recs["adc_t"][i]),
+            "adc_p": int(recs["adc_p"][i]),
+        })
+    return rows
+
+
+def to_line_protocol(rows, device, measurement="bmp280"):
+    """Rows -> InfluxDB line protocol body, one point per row (ms precision)."""
+    tags = {"device": device}
+    return lineproto.encode_batch(
+        [(measurement, tags, {k: v for k, v in row.items() if k != "ts"}, row["ts"]) for row in rows])
+
+
+def device_of(topic):
+    """'/aupp/esp32/group6/bin' -> 'group6'."""
+    parts = topic.rstrip("/").split("/")
+    return parts[-2] if parts[-1] == "bin" and len(parts) > 1 else parts[-1]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--broker", default=DEFAULT_BROKER)
+    ap.add_argument("--port", type=int, default=1883)
+    ap.add_argument("--topic", default=DEFAULT_TOPIC, help="frame topic (may use + wildcards)")
+    ap.add_argument("--republish", action="store_true", help="publish JSON arrays on the topic without /bin")
+    ap.add_argument("--influx", help="InfluxDB v1 write URL, e.g. http://localhost:8086/write")
+    ap.add_argument("--db", default="lab4")
+    args = ap.parse_args()
+
+    import paho.mqtt.client as mqtt
+    session = None
+    if args.influx:
+        import requests
+        session = requests.Session()
+    stats = {"frames": 0, "samples": 0, "bytes": 0, "errors": 0}
+
+    def on_message(client, userdata, msg):
+        try:
+            rows = decode(msg.payload)
+        except (FrameError, struct.error) as e:
+            stats["errors"] += 1
+            print(f"[FRAME ERROR] {msg.topic}: {e}")
+            return
+        stats["frames"] += 1
+        stats["samples"] += len(rows)
+        stats["bytes"] += len(msg.payload)
+        if args.republish:
+            client.publish(msg.topic[:-len("/bin")], json.dumps(rows))
+        if session is not None:
+            lp = to_line_protocol(rows, device_of(msg.topic))
+            try:
+                resp = session.post(args.influx, params={"db": args.db, "precision": "ms"},
+                                    data=lp, timeout=2)
+                if resp.status_code >= 300:
+                    print(f"[Influx] HTTP {resp.status_code}: {resp.text.strip()}")
+            except Exception as e:
+                print(f"[Influx ERROR] {e}")
+        print(f"[FRAME] {msg.topic}: {len(rows)} sample(s) in {len(msg.payload)} bytes "
+              f"(total {stats['frames']} frames, {stats['samples']} samples, {stats['errors']} errors)")
+
+    def on_connect(client, userdata, *rest):
+        client.subscribe(args.topic)
+        print(f"Subscribed to {args.topic} on {args.broker}")
+
+    try:
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    except AttributeError:  # paho-mqtt < 2.0
+        client = mqtt.Client()
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(args.broker, args.port, keepalive=30)
+    client.loop_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# test_bmp280_numpy.py - bmp280_numpy.py against lib/bmp280.py's scalar compensation
+#
+# Runs on a laptop (CPython + NumPy; skipped without NumPy):
+#     python -m unittest test_bmp280_numpy       (or: python -m pytest Lab4)
+#
+# The vectorized compensation must match comp_temp()/comp_press() bit for
+# bit on the datasheet calibration, on per-sample calibrations and on the
+# edges of the raw ranges, including a calibration that makes pressure 0.
+
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from bench_bmp280 import (DATASHEET_CAL, DATASHEET_RAW, comp_press, comp_temp,  # noqa: E402
+                          perturbed_cals, raw_samples)
+
+try:
+    import numpy as np
+    import bmp280_numpy
+except ImportError:
+    np = None
+
+# adc_t from ~-40 C to ~85 C with the datasheet calibration; adc_p over
+# the whole 20-bit range, both ends included
+EDGE_T = (380000, 519888, 620000)
+EDGE_P = (0, 1, 415148, (1 << 20) - 2, (1 << 20) - 1)
+
+
+def scalar(cal, adc_t, adc_p):
+    t, t_fine = comp_temp(cal, adc_t)
+    return t, t_fine, comp_press(cal, adc_p, t_fine)
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class CompensateTest(unittest.TestCase):
+    def check(self, cals, samples):
+        """cals: one calibration or one per sample."""
+        per_sample = isinstance(cals, list)
+        adc_t = np.array([a for a, _ in samples], dtype=np.int64)
+        adc_p = np.array([a for _, a in samples], dtype=np.int64)
+        got = bmp280_numpy.compensate(np.array(cals) if per_sample else cals, adc_t, adc_p)
+        got = list(zip(*(a.tolist() for a in got)))
+        for i, (a_t, a_p) in enumerate(samples):
+            cal = cals[i] if per_sample else cals
+            self.assertEqual(got[i], scalar(cal, a_t, a_p), "adc_t=%d adc_p=%d cal=%s" % (a_t, a_p, cal))
+
+    def test_datasheet_example(self):
+        self.check(DATASHEET_CAL, [DATASHEET_RAW])
+
+    def test_edge_raw_values(self):
+        self.check(DATASHEET_CAL, [(a_t, a_p) for a_t in EDGE_T for a_p in EDGE_P])
+
+    def test_random_samples(self):
+        self.check(DATASHEET_CAL, raw_samples(5000))
+
+    def test_per_sample_calibrations(self):
+        samples = raw_samples(2000, seed=3) + [(a_t, a_p) for a_t in EDGE_T for a_p in EDGE_P]
+        self.check(perturbed_cals(len(samples)), samples)
+
+    def test_unusable_calibration(self):
+        # P1 = 0 makes the divisor 0: the scalar code returns 0, and so must
+        # every element, without a division error for the others
+        zero_p1 = DATASHEET_CAL[:3] + (0,) + DATASHEET_CAL[4:]
+        samples = [(a_t, a_p) for a_t in EDGE_T for a_p in EDGE_P]
+        self.check([zero_p1 if i % 2 else DATASHEET_CAL for i in range(len(samples))], samples)
+
+    def test_to_physical(self):
+        t, _, p = scalar(DATASHEET_CAL, *DATASHEET_RAW)
+        temp_c, press_pa = bmp280_numpy.to_physical(np.array([t]), np.array([p]))
+        self.assertEqual((temp_c[0], press_pa[0]), (t / 100, p / 256))
+
+
+if __name__ == "__main__":
+    unittest.main()
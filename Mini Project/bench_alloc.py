@@ -0,0 +1,164 @@
+# bench_alloc.py - Checks that a quiet pass of the parking main loop allocates nothing
+#
+# Runs on a laptop (CPython) through the simulator in ../sim:
+#     python bench_alloc.py [--ticks 250]
+#
+# Runs car_parking_project.py on the virtual board into a quiet steady
+# state - a car parked in S1 a few seconds ago (still flashing on the
+# dashboard), nobody at the gate, no HTTP request waiting - then calls the
+# script's own loop_once() for a few hundred more passes: servo, sonar,
+# gate checks, IR edges, WebServer.poll (select.poll), telemetry, the
+# profiler sections, P_LOOP.add and poll_print. sim/alloc.py counts the
+# heap objects the device code creates in each pass, the way MicroPython
+# would allocate them (so no CPython int boxing and nothing the fake
+# modules do); every pass must create none, with the profiler off (the
+# default) and on.
+#
+# The same passes are then run with each pre-rework step patched back in
+# (the accept() timeout, read() with its float tuple, expire_recent's list
+# of names), to show the check catches them.
+#
+# This stands in for "gc.mem_alloc() stays flat across ticks": on CPython
+# the simulator's gc.mem_alloc() is a tracemalloc estimate that includes
+# the fake modules and boxed ints, so it moves on passes that allocate
+# nothing on the board (see the Readme and sim/alloc.py).
+
+import os
+import sys
+import types
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from sim import Board, Runtime, devices  # noqa: E402
+from sim.alloc import AllocCounter  # noqa: E402
+
+SETTLE_S = 8        # car parked at 3 s, gate idle, first sonar window full
+SLEEP_US = 50000    # the main loop's time.sleep(0.05), outside the count
+MAX_TICKS = 300     # ~45 s of passes: the car stays recent, no telemetry interval closes
+
+
+def quiet_board():
+    """A board in steady state after SETTLE_S; returns (runtime, namespace)."""
+    board = Board(wifi_delay_ms=0)
+    board.add(devices.Pcf8574Lcd(0x27))
+    board.add(devices.Ultrasonic(trig=27, echo=26, distance_cm=100.0))
+    board.add(devices.IrSensor(5, [(3000, True)]))
+    for pin in (19, 17):
+        board.add(devices.IrSensor(pin))
+    rt = Runtime(board, paths=[HERE])
+    result = rt.run(os.path.join(HERE, "car_parking_project.py"), seconds=SETTLE_S)
+    if result.error is not None:
+        raise result.error
+    ns = result.namespace
+    assert ns.parking.slots[0].occupied and ns.parking.recently_occupied
+    board.clock.deadline_us = None   # drive the passes by hand from here
+    return rt, ns
+
+
+def passes(rt, ns, ticks, extra_files=()):
+    """Allocations per pass of ns.loop_once() and the sites that made them."""
+    counter = AllocCounter(rt.device_files | set(extra_files))
+    clock = rt.board.clock
+    per_pass = []
+    for _ in range(ticks):
+        per_pass.append(counter.count(ns.loop_once))
+        clock.advance(SLEEP_US)
+    # still the same quiet state: nothing happened during the passes
+    assert ns.parking.recently_occupied and not ns.gate_is_operating
+    assert len(rt.board.log) == len(set(rt.board.log)) and not rt.board.http_responses
+    return per_pass, counter.sites
+
+
+# --- the pre-rework steps, patched into a running board ---
+def legacy_web_poll(self, parking):
+    # accept() with a 0.1 s socket timeout: an idle tick raises OSError
+    try:
+        cl, addr = self.sock.accept()
+    except:
+        return
+    cl.close()
+
+
+def legacy_expire_recent(self, now):
+    if not self.recently_occupied:
+        return
+    to_remove = []
+    for slot_name, ts in self.recently_occupied.items():
+        if self_ticks_diff(now, ts) > 60000:
+            to_remove.append(slot_name)
+    for slot_name in to_remove:
+        del self.recently_occupied[slot_name]
+
+
+def legacy_detected(sonar, ns):
+    distance, confidence = sonar.read()
+    return distance is not None and distance <= ns.ULTRASONIC_DETECT_CM \
+        and confidence >= ns.ULTRASONIC_MIN_CONFIDENCE
+
+
+self_ticks_diff = None
+
+
+def profiler_on(rt, ns):
+    perf = rt.import_module("perf")
+    ns.prof = perf.Profiler(track_mem=True)
+    for var, name in (("P_LOOP", "loop"), ("P_SERVO", "update_servo"), ("P_SONAR", "read_ultrasonic"),
+                      ("P_IR", "process_ir_states"), ("P_WEB", "WebServer.poll"),
+                      ("P_LCD", "update_lcd_display"), ("P_TELEMETRY", "telemetry")):
+        setattr(ns, var, ns.prof.section(name))
+    # the not-yet-due path of poll_print() on every pass; printing the
+    # table itself formats strings, like any console output
+    ns.PERF_PRINT_MS = 3600000
+
+
+def old_accept(rt, ns):
+    ns.WebServer.poll = legacy_web_poll
+
+
+def old_expire(rt, ns):
+    global self_ticks_diff
+    self_ticks_diff = rt.import_module("utime").ticks_diff
+    ns.parking.expire_recent = types.MethodType(legacy_expire_recent, ns.parking)
+
+
+def old_read(rt, ns):
+    sonar = ns.sonar
+    sonar.detected = lambda: legacy_detected(sonar, ns)
+
+
+CASES = [
+    # name, patch, must be allocation-free
+    ("quiet pass", None, True),
+    ("quiet pass, profiler on", profiler_on, True),
+    ("old accept() timeout", old_accept, False),
+    ("old read() tuple", old_read, False),
+    ("old expire_recent", old_expire, False),
+]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ticks", type=int, default=250)
+    args = ap.parse_args()
+    if not 0 < args.ticks <= MAX_TICKS:
+        ap.error("--ticks: 1..%d, the parked car must stay recent" % MAX_TICKS)
+
+    print("%-26s %8s %10s %6s  %s" % ("loop_once()", "passes", "allocs/pass", "max", "where"))
+    failed = []
+    for name, patch, must_be_free in CASES:
+        rt, ns = quiet_board()
+        if patch:
+            patch(rt, ns)
+        per_pass, sites = passes(rt, ns, args.ticks, [os.path.abspath(__file__)])
+        avg = sum(per_pass) / len(per_pass)
+        where = ", ".join("%s x%d" % kv for kv in sorted(sites.items(), key=lambda kv: -kv[1])[:3])
+        print("%-26s %8d %10.2f %6d  %s" % (name, len(per_pass), avg, max(per_pass), where or "-"))
+        if must_be_free and max(per_pass) or not must_be_free and min(per_pass) == 0:
+            failed.append(name)
+    assert not failed, failed
+    print("\nok: no allocation in any quiet pass; every old step allocates on every pass")
+
+
+if __name__ == "__main__":
+    main()
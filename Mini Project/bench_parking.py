@@ -0,0 +1,90 @@
+# bench_parking.py - Host-side benchmark for ParkingManager scaling
+#
+# Runs on a laptop (CPython), not on the ESP32:
+#     python bench_parking.py
+#
+# Measures the per-tick cost of the control path the main loop runs
+# (entry check, LCD summary, one arrival or departure) for 3..500 slots,
+# next to the list-based approach the project used before
+# (min(next_ids), next_ids.sort(), any()/sum() over every slot).
+
+import os
+import sys
+import time
+import random
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from sim import Runtime  # noqa: E402  (fake utime etc., see sim/)
+
+_parking = Runtime(paths=[HERE]).import_module("parking")
+ParkingManager = _parking.ParkingManager
+default_slot_config = _parking.default_slot_config
+
+SLOT_COUNTS = (3, 10, 50, 100, 250, 500)
+TICKS = 20000
+
+
+class LegacyIds:
+    """The previous allocator/counters, kept here only for comparison."""
+    def __init__(self, n):
+        self.occupied = [False] * n
+        self.next_ids = list(range(1, n + 1))
+
+    def tick(self, idx):
+        free = sum(1 for o in self.occupied if not o)
+        available = any(not o for o in self.occupied)
+        if self.occupied[idx]:
+            self.occupied[idx] = False
+            self.next_ids.append(idx + 1); self.next_ids.sort()
+        elif available:
+            self.next_ids.remove(min(self.next_ids))
+            self.occupied[idx] = True
+        return free
+
+
+def bench_manager(n, order):
+    pm = ParkingManager(default_slot_config([None] * n))
+    t0 = time.perf_counter()
+    for idx in order:
+        pm.has_available_slot()
+        pm.get_summary()
+        if pm.slots[idx].occupied:
+            pm.mark_free(idx)
+        else:
+            pm.mark_occupied(idx)
+    return (time.perf_counter() - t0) / len(order) * 1e6
+
+
+def bench_legacy(n, order):
+    legacy = LegacyIds(n)
+    t0 = time.perf_counter()
+    for idx in order:
+        legacy.tick(idx)
+    return (time.perf_counter() - t0) / len(order) * 1e6
+
+
+def bench_ir_scan(n, ticks=2000):
+    pm = ParkingManager(default_slot_config([None] * n))
+    raw = [False] * n
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        pm.process_ir_states(raw)
+    return (time.perf_counter() - t0) / ticks * 1e6
+
+
+def main():
+    rnd = random.Random(1)
+    print("{:>6} {:>14} {:>14} {:>14}".format("slots", "manager us", "legacy us", "ir scan us"))
+    for n in SLOT_COUNTS:
+        order = [rnd.randrange(n) for _ in range(TICKS)]
+        new = bench_manager(n, order)
+        old = bench_legacy(n, order)
+        scan = bench_ir_scan(n)
+        print("{:>6} {:>14.2f} {:>14.2f} {:>14.2f}".format(n, new, old, scan))
+    print("\nmanager/legacy: has_available_slot + summary + one arrival/departure per tick")
+    print("ir scan: one process_ir_states() over all slots (polling, grows with slot count)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+# bench_scenarios.py - Scenario-driven benchmark suite for the parking controller
+#
+# Runs on a laptop (CPython) through the simulator in ../sim:
+#     python bench_scenarios.py                          # all scenarios, default sizes
+#     python bench_scenarios.py --slots 3,100 --ticks 1000 --scenarios churn
+#     python bench_scenarios.py --compare bench_results/<previous>.json
+#
+# Each scenario is a synthetic IR trace (one list of slot changes per 50 ms
+# tick) replayed through:
+#   poll    ParkingManager.process_ir_states (polling every slot)
+#   irq     IrSlotMonitor.update (edges pushed into its ring buffer)
+#   status  ParkingManager.get_status
+#   render  render_dashboard_html(get_status())
+#   loop    the whole car_parking_project.py main loop on the virtual board
+# and reports per-tick latency percentiles, transient allocation per tick
+# (tracemalloc peak) and throughput in IR events/sec. Results are written
+# to bench_results/ as JSON so runs can be compared.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from sim import Board, Runtime, devices  # noqa: E402
+
+TICK_MS = 50
+LOOP_TICK_MS = 150          # main loop: 50 ms sleep + 100 ms accept timeout
+IR_PIN_BASE = 100           # virtual GPIOs for generated slot layouts
+SCENARIOS = ("rush_hour", "churn", "flapping")
+RESULTS_DIR = os.path.join(HERE, "bench_results")
+
+
+# --- TRACES ---
+def make_trace(kind, n, ticks, seed=1):
+    """Returns a list (one entry per tick) of [(slot, blocked), ...] changes."""
+    rnd = random.Random(seed)
+    blocked = [False] * n
+    trace = [[] for _ in range(ticks)]
+    returning = {}  # tick -> [slot] for flaps that bounce back
+
+    def flip(t, i, state):
+        if blocked[i] != state:
+            blocked[i] = state
+            trace[t].append((i, state))
+
+    if kind == "churn":
+        for i in range(n):
+            flip(0, i, True)
+    for t in range(1, ticks):
+        if kind == "rush_hour":
+            # lot fills over the first 60% of the trace, few leave
+            arrivals = n / (0.6 * ticks)
+            departures = arrivals / 10
+        elif kind == "churn":
+            arrivals = departures = max(n / 50.0, 0.2)
+        else:  # flapping: light traffic plus noisy sensors
+            arrivals = departures = max(n / 200.0, 0.05)
+            for _ in range(max(n // 10, 1)):
+                i = rnd.randrange(n)
+                flip(t, i, not blocked[i])
+                back = t + rnd.randint(1, 3)  # shorter than the debounce window
+                if back < ticks:
+                    returning.setdefault(back, []).append(i)
+            for i in returning.pop(t, ()):
+                flip(t, i, not blocked[i])
+        for _ in range(_count(rnd, arrivals)):
+            free = rnd.randrange(n)
+            if not blocked[free]:
+                flip(t, free, True)
+        for _ in range(_count(rnd, departures)):
+            taken = rnd.randrange(n)
+            if blocked[taken]:
+                flip(t, taken, False)
+    return trace
+
+
+def _count(rnd, rate):
+    whole = int(rate)
+    return whole + (1 if rnd.random() < rate - whole else 0)
+
+
+# --- HELPERS ---
+class _LevelPin:
+    """Stands in for a machine.Pin when IrSlotMonitor resyncs."""
+    def __init__(self):
+        self.level = 1
+
+    def value(self):
+        return self.level
+
+
+def _layout(n):
+    return [{"name": "S{}".format(i + 1), "pin": IR_PIN_BASE + i,
+             "zone": "ABCD"[i * 4 // n], "level": i * 4 // n} for i in range(n)]
+
+
+def _percentiles(samples_us):
+    if not samples_us:
+        return {}
+    s = sorted(samples_us)
+
+    def pick(p):
+        return round(s[min(int(len(s) * p), len(s) - 1)], 2)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(s[-1], 2),
+            "mean": round(sum(s) / len(s), 2)}
+
+
+def _summarize(latencies, events, wall_s, alloc):
+    r = _percentiles(latencies)
+    r["ticks"] = len(latencies)
+    r["events"] = events
+    r["events_per_s"] = round(events / wall_s) if wall_s else None
+    r["alloc_bytes_per_tick"] = alloc
+    return r
+
+
+def _measure(setup, trace, alloc_ticks):
+    """
+    setup() returns (prepare, timed): prepare(t) applies tick t's trace
+    untimed, timed(t) is the code under test. Timing and allocation are
+    measured in separate passes on fresh instances, since tracemalloc
+    skews timings.
+    """
+    prepare, timed = setup()
+    latencies = []
+    for t in range(len(trace)):
+        prepare(t)
+        t0 = time.perf_counter()
+        timed(t)
+        latencies.append((time.perf_counter() - t0) * 1e6)
+
+    prepare, timed = setup()
+    alloc_ticks = min(alloc_ticks, len(trace))
+    for t in range(len(trace) - alloc_ticks):
+        prepare(t)
+        timed(t)
+    tracemalloc.start()
+    total = 0
+    try:
+        for t in range(len(trace) - alloc_ticks, len(trace)):
+            prepare(t)
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            timed(t)
+            total += tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    events = sum(len(x) for x in trace)
+    return _summarize(latencies, events, sum(latencies) / 1e6, round(total / max(alloc_ticks, 1)))
+
+
+# --- COMPONENT BENCHES ---
+class Device:
+    """One simulated device with a ParkingManager of ``n`` slots."""
+    def __init__(self, n):
+        self.rt = Runtime(paths=[HERE])
+        self.clock = self.rt.board.clock
+        self.utime = self.rt.import_module("utime")
+        self.ir_sensing = self.rt.import_module("ir_sensing")
+        self.dashboard = self.rt.import_module("dashboard")
+        self.pm = self.rt.import_module("parking").ParkingManager(_layout(n))
+        self.states = [False] * n
+
+    def poll_tick(self, changes):
+        for i, b in changes:
+            self.states[i] = b
+        self.clock.advance(TICK_MS * 1000)
+
+
+def bench_poll(n, trace, alloc_ticks):
+    def setup():
+        d = Device(n)
+        return (lambda t: d.poll_tick(trace[t]),
+                lambda t: d.pm.process_ir_states(d.states))
+    return _measure(setup, trace, alloc_ticks)
+
+
+def bench_irq(n, trace, alloc_ticks):
+    def setup():
+        d = Device(n)
+        pins = [_LevelPin() for _ in range(n)]
+        monitor = d.ir_sensing.IrSlotMonitor(d.pm, pins, ring_size=1024)
+        monitor.resync()
+
+        def prepare(t):
+            now = d.utime.ticks_us()
+            for i, b in trace[t]:
+                pins[i].level = 0 if b else 1
+                monitor.ring.push(i, pins[i].level, now)
+            d.clock.advance(TICK_MS * 1000)
+        return prepare, lambda t: monitor.update()
+    return _measure(setup, trace, alloc_ticks)
+
+
+def bench_status(n, trace, alloc_ticks, render=False):
+    def setup():
+        d = Device(n)
+        render_fn = d.dashboard.render_dashboard_html
+
+        def prepare(t):
+            d.poll_tick(trace[t])
+            d.pm.process_ir_states(d.states)
+
+        def timed(t):
+            status = d.pm.get_status()
+            if render:
+                render_fn(status)
+        return prepare, timed
+    return _measure(setup, trace, alloc_ticks)
+
+
+# --- MAIN LOOP BENCH ---
+def bench_loop(n, trace):
+    """Runs car_parking_project.py on the virtual board and times each loop tick."""
+    board = Board(wifi_delay_ms=0)
+    board.add(devices.Pcf8574Lcd(0x27))
+    board.add(devices.Ultrasonic(trig=27, echo=26, distance_cm=100.0))
+    timelines = [[] for _ in range(n)]
+    start_ms = 3000  # after WiFi/LCD init
+    for t, changes in enumerate(trace):
+        for i, b in changes:
+            timelines[i].append((start_ms + t * LOOP_TICK_MS, b))
+    for i in range(n):
+        board.add(devices.IrSensor(IR_PIN_BASE + i, timelines[i]))
+    with tempfile.TemporaryDirectory() as fs:
+        with open(os.path.join(fs, "slots.json"), "w") as f:
+            json.dump({"slots": _layout(n)}, f)
+        rt = Runtime(board, paths=[HERE], fs_root=fs)
+        utime = rt.import_module("time")
+        marks = []
+        real_sleep = utime.sleep
+
+        def sleep(seconds):
+            marks.append((time.perf_counter(), board.now_ms))
+            real_sleep(seconds)
+        utime.sleep = sleep
+        seconds = (start_ms + len(trace) * LOOP_TICK_MS) / 1000.0
+        result = rt.run(os.path.join(HERE, "car_parking_project.py"), seconds=seconds)
+    if result.error is not None:
+        raise result.error
+    latencies = []
+    for (w0, v0), (w1, v1) in zip(marks, marks[1:]):
+        if v0 >= start_ms:
+            latencies.append((w1 - w0) * 1e6)
+    events = sum(len(x) for x in trace)
+    r = _summarize(latencies, events, sum(latencies) / 1e6, None)
+    r["speedup"] = round(result.speedup)
+    return r
+
+
+# --- REPORTING ---
+def run_suite(slot_counts, scenarios, ticks, alloc_ticks, loop):
+    results = []
+    for kind in scenarios:
+        for n in slot_counts:
+            trace = make_trace(kind, n, ticks)
+            row = {"scenario": kind, "slots": n}
+            row["poll"] = bench_poll(n, trace, alloc_ticks)
+            row["irq"] = bench_irq(n, trace, alloc_ticks)
+            row["status"] = bench_status(n, trace, alloc_ticks)
+            row["render"] = bench_status(n, trace[:max(ticks // 10, 10)], min(alloc_ticks, 10), render=True)
+            if loop:
+                row["loop"] = bench_loop(n, trace[:max(ticks // 4, 20)])
+            results.append(row)
+            print_row(row)
+    return results
+
+
+def print_row(row, previous=None):
+    print("\n{} / {} slots".format(row["scenario"], row["slots"]))
+    print("  {:<8}{:>9}{:>9}{:>9}{:>10}{:>12}{:>12}".format(
+        "", "p50 us", "p95 us", "p99 us", "max us", "events/s", "alloc B/t"))
+    for name in ("poll", "irq", "status", "render", "loop"):
+        r = row.get(name)
+        if not r:
+            continue
+        line = "  {:<8}{:>9}{:>9}{:>9}{:>10}{:>12}{:>12}".format(
+            name, r["p50"], r["p95"], r["p99"], r["max"],
+            r["events_per_s"] if r["events_per_s"] is not None else "-",
+            r["alloc_bytes_per_tick"] if r["alloc_bytes_per_tick"] is not None else "-")
+        if previous and previous.get(name):
+            old = previous[name]["p99"]
+            if old:
+                line += "   p99 {:+.0%} vs previous".format(r["p99"] / old - 1)
+        print(line)
+
+
+def compare(results, path):
+    with open(path) as f:
+        prev = {(r["scenario"], r["slots"]): r for r in json.load(f)["results"]}
+    print("\n=== compared with {} ===".format(path))
+    for row in results:
+        print_row(row, prev.get((row["scenario"], row["slots"])))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parking controller scenario benchmarks")
+    ap.add_argument("--slots", default="3,50,200,500")
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--ticks", type=int, default=2000)
+    ap.add_argument("--alloc-ticks", type=int, default=200)
+    ap.add_argument("--no-loop", action="store_true", help="skip the full main-loop run")
+    ap.add_argument("--out", help="result file (default bench_results/<timestamp>.json)")
+    ap.add_argument("--compare", help="previous result file to diff against")
+    args = ap.parse_args()
+
+    slot_counts = [int(x) for x in args.slots.split(",")]
+    scenarios = [x for x in args.scenarios.split(",") if x]
+    results = run_suite(slot_counts, scenarios, args.ticks, args.alloc_ticks, not args.no_loop)
+
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+                   "ticks": args.ticks, "results": results}, f, indent=1)
+    print("\nsaved", out)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
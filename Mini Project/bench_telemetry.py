@@ -0,0 +1,136 @@
+# bench_telemetry.py - Checks parking_telemetry.py on the virtual board
+#
+# Runs on a laptop (CPython) through the simulator in ../sim:
+#     python bench_telemetry.py [--minutes 30] [--cars 40]
+#
+# Replays random arrivals/departures through car_parking_project.py with
+# the ingest gateway answering, then down for a few minutes, then back.
+# Checks that the line protocol the board sent adds up to the tickets it
+# closed (entries, exits, revenue, dwell), that nothing was lost over the
+# outage, that there is one request per interval rather than one per
+# event, and that no request was made while the gate was moving or a car
+# was waiting in front of the entrance sonar.
+
+import os
+import sys
+import random
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from sim import Board, Runtime, devices  # noqa: E402
+
+IR_PINS = (5, 19, 17)
+START_MS = 3000
+# (from_s, to_s) a car waits at the entrance: longer than an interval, so a
+# send falls due while it is there; it goes in when a slot is free
+ENTRANCE_S = ((150, 250), (630, 730), (1230, 1330))
+SONAR_LAG_MS = 1000     # the sonar window needs a few pings to see the car
+
+
+def make_timelines(cars, minutes, rnd):
+    """[(t_ms, blocked)] per slot: stays of 1-10 min with gaps in between."""
+    timelines = []
+    end = minutes * 60000 - 30000
+    for _ in IR_PINS:
+        t = START_MS + rnd.randint(1000, 60000)
+        tl = []
+        while len(tl) < 2 * cars // len(IR_PINS):
+            stay = rnd.randint(60000, 600000)
+            if t + stay > end:
+                break
+            tl += [(t, True), (t + stay, False)]
+            t += stay + rnd.randint(5000, 120000)
+        timelines.append(tl)
+    return timelines
+
+
+def parse(body):
+    out = []
+    for line in body.splitlines():
+        head, fields, ts = line.split(" ")
+        vals = {}
+        for kv in fields.split(","):
+            k, v = kv.split("=")
+            vals[k] = int(v[:-1]) if v.endswith("i") else float(v)
+        out.append((head, vals, int(ts)))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--minutes", type=int, default=30)
+    ap.add_argument("--cars", type=int, default=40)
+    ap.add_argument("--outage", default="8,14", help="gateway down between these minutes")
+    args = ap.parse_args()
+    down_from, down_to = (int(x) * 60000 for x in args.outage.split(","))
+
+    board = Board(wifi_delay_ms=0)
+    board.add(devices.Pcf8574Lcd(0x27))
+    board.add(devices.Ultrasonic(trig=27, echo=26, distance_cm=lambda t: (
+        8.0 if any(a <= t < b for a, b in ENTRANCE_S) else 100.0)))
+    timelines = make_timelines(args.cars, args.minutes, random.Random(1))
+    for pin, tl in zip(IR_PINS, timelines):
+        board.add(devices.IrSensor(pin, tl))
+
+    def responder(req):
+        if down_from <= req["t_ms"] < down_to:
+            raise OSError(113, "ECONNABORTED")
+        return 204, ""
+    board.http_responder = responder
+
+    rt = Runtime(board, paths=[HERE])
+    result = rt.run(os.path.join(HERE, "car_parking_project.py"), seconds=args.minutes * 60 + 5)
+    if result.error is not None:
+        raise result.error
+
+    telemetry = result.namespace.telemetry
+    posts = [r for r in board.http_out if ":8090/write" in r["url"]]
+    delivered = [r for r in posts if r.get("status") == 204]
+    points = [p for r in delivered for p in parse(r["data"])]
+    rows = [v for head, v, _ in points if head == "parking"]
+
+    # gate movements from the console, to check no request overlapped one
+    gate, opened = [], None
+    for t, text in board.log:
+        if text.startswith("Gate opening"):
+            opened = t
+        elif text.startswith("Gate closed") and opened is not None:
+            gate.append((opened, t))
+            opened = None
+    during_gate = [r for r in posts if any(a <= r["t_ms"] <= b for a, b in gate)]
+    waiting = [(a * 1000 + SONAR_LAG_MS, b * 1000) for a, b in ENTRANCE_S if b <= args.minutes * 60]
+    during_car = [r for r in posts if any(a <= r["t_ms"] <= b for a, b in waiting)]
+
+    entries = sum(v["entries"] for v in rows)
+    exits = sum(v["exits"] for v in rows)
+    revenue = sum(v["revenue"] for v in rows)
+    opened_total = sum(1 for tl in timelines for _, b in tl if b)
+    print("virtual minutes   : %d (%.0fx real time)" % (args.minutes, result.speedup))
+    print("tickets           : %d opened, %d closed, revenue %.2f on the board"
+          % (opened_total, telemetry.exits + exits, telemetry.revenue_total_cents / 100))
+    print("intervals         : %d rows delivered, %d parking_zone rows" % (len(rows), len(points) - len(rows)))
+    print("requests          : %d to the gateway (%d failed during the outage), %d events"
+          % (len(posts), len(posts) - len(delivered), entries + exits))
+    print("during gate moves : %d requests (%d gate cycles)" % (len(during_gate), len(gate)))
+    print("car at entrance   : %d requests (%d waits)" % (len(during_car), len(waiting)))
+    print("telemetry stats   :", telemetry.stats())
+
+    # intervals closed after the last delivery are still pending on the board
+    assert entries + telemetry.entries == opened_total, (entries, telemetry.entries, opened_total)
+    assert abs(revenue + (telemetry.revenue_cents - telemetry.revenue_total_cents) / 100) < 1e-6
+    assert telemetry.dropped == 0 and telemetry.failed > 0
+    assert len(rows) >= args.minutes - 2 and len(delivered) < len(rows)
+    assert not during_gate and gate
+    assert not during_car and waiting
+    assert all(0.0 <= v["occupancy_avg"] <= 1.0 and v["occupied_peak"] <= v["total"] for v in rows)
+    assert [ts for _, _, ts in points] == sorted(ts for _, _, ts in points)
+    for v in rows:
+        if v["exits"]:
+            assert 1 <= v["dwell_avg_min"] <= 10, v
+    assert abs(rows[-1]["revenue_total"] - revenue) < 0.01 * len(rows)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,21 @@
 
 import utime
 import time
-import math
 import urequests
 import network
 import socket
-from machine import Pin, PWM, I2C, time_pulse_us
-from time import sleep_ms
+import select
+import json
+import micropython
+import gc
+from machine import Pin, PWM, I2C
+from parking import ParkingManager, load_slot_config, default_slot_config, EXIT
+from ir_sensing import IrSlotMonitor
+from parking_telemetry import ParkingTelemetry
+from dashboard import render_dashboard_html, format_ms_to_datetime
+from hcsr04 import HCSR04  # lib/hcsr04.py
+from hd44780 import I2cLcd, LcdFramebuffer  # lib/hd44780.py
+from perf import Profiler  # lib/perf.py
 
 # --- 1. CONFIGURATION ---
 WIFI_SSID = "Robotic WIFI"
@@ -26,17 +35,30 @@ I2C_SCL = 22
 I2C_SDA = 21
 I2C_FREQ = 400000
 
-NUM_SLOTS = 3
+SLOTS_FILE = "slots.json"  # Slot layout (name/pin/zone/level); falls back to PIN_IR_S*
 ENTRY_DEBOUNCE_MS = 300
 EXIT_GRACE_MS = 1000
 ULTRASONIC_DETECT_CM = 10
 ULTRASONIC_COOLDOWN_MS = 5000  # Prevent multiple triggers (5 seconds)
+ULTRASONIC_MIN_CONFIDENCE = 0.6  # Share of recent pings that must agree
 FEE_PER_MIN = 0.5
 WEBSERVER_PORT = 80
 DASHBOARD_REFRESH = 3
+STATIC_DIR = "static"
 GATE_OPEN_TIME_MS = 3000
 SERVO_STEP = 50
 
+# Occupancy/revenue batches for Grafana, sent to Final Project/ingest_gateway.py
+# (run it with --db parking); None keeps the counters on the device only
+TELEMETRY_URL = "http://192.168.0.108:8090/write?db=parking&precision=ms&device=parking1"
+TELEMETRY_INTERVAL_MS = 60000
+
+# Loop profiling (debugging only): per-section timings on the console and at
+# /debug/perf. Off, every section is a shared no-op.
+PERF_ENABLED = False
+PERF_TRACK_MEM = False  # gc.mem_free() around each section; walks the heap, skews the timings
+PERF_PRINT_MS = 30000  # console table period, 0 = only on /debug/perf
+
 PIN_LED_GATE = 21
 PIN_LED_FULL = 22
 
@@ -59,13 +81,6 @@ def connect_wifi():
 # --- 3. TELEGRAM API ---
 TELEGRAM_API_URL = "https://api.telegram.org/bot{}/sendMessage"
 
-def format_ms_to_datetime(ms_since_boot):
-    now_sec = utime.time()
-    elapsed_ms = utime.ticks_ms()
-    time_event_sec = now_sec - (elapsed_ms - ms_since_boot) // 1000
-    t = utime.localtime(time_event_sec)
-    return "{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(*t[:6])
-
 def send_message(text):
     try:
         url = TELEGRAM_API_URL.format(TELEGRAM_BOT_TOKEN)
@@ -88,285 +103,89 @@ def send_receipt_from_ticket(ticket):
     send_message(message)
 
 # --- 4. LCD API ---
-class LcdApi:
-    def __init__(self):
-        self.num_lines = 2
-        self.num_columns = 16
-    def putchar(self, char): raise NotImplementedError
-    def clear(self): raise NotImplementedError
-    def move_to(self, col, row): raise NotImplementedError
-    def putstr(self, string):
-        for ch in string: self.putchar(ch)
-
-MASK_RS = 0x01
-MASK_RW = 0x02
-MASK_E  = 0x04
-SHIFT_BACKLIGHT = 3
-BACKLIGHT = 1 << SHIFT_BACKLIGHT
-
-class I2cLcd(LcdApi):
-    def __init__(self, i2c, addr, rows, cols):
-        super().__init__()
-        self.i2c = i2c
-        self.addr = addr
-        self.num_lines = rows
-        self.num_columns = cols
-        self.backlight = BACKLIGHT
-        self._init_lcd()
-
-    def _write_byte(self, data):
-        self.i2c.writeto(self.addr, bytes([data | self.backlight]))
-    def _pulse(self, data):
-        self._write_byte(data | MASK_E)
-        sleep_ms(1)
-        self._write_byte(data & ~MASK_E)
-        sleep_ms(1)
-    def _write_nibble(self, nibble):
-        self._write_byte(nibble)
-        self._pulse(nibble)
-    def _cmd(self, cmd):
-        hi = cmd & 0xF0
-        lo = (cmd << 4) & 0xF0
-        self._write_nibble(hi)
-        self._write_nibble(lo)
-    def _init_lcd(self):
-        sleep_ms(50)
-        self._write_byte(0x30); self._pulse(0x30); sleep_ms(5)
-        self._pulse(0x30); sleep_ms(1); self._pulse(0x20); sleep_ms(1)
-        self._cmd(0x28); self._cmd(0x0C); self._cmd(0x01); sleep_ms(2); self._cmd(0x06)
-    def clear(self):
-        self._cmd(0x01); sleep_ms(2)
-    def move_to(self, col, row):
-        row_offsets = [0x00,0x40,0x14,0x54]
-        self._cmd(0x80 | (col + row_offsets[row]))
-    def putchar(self, char):
-        val = ord(char)
-        hi = val & 0xF0
-        lo = (val <<4)&0xF0
-        self._write_nibble(hi|MASK_RS)
-        self._write_nibble(lo|MASK_RS)
+# I2cLcd and LcdFramebuffer live in lib/hd44780.py
 
 # --- 5. PARKING LOGIC ---
-class Slot:
-    def __init__(self,name):
-        self.name = name
-        self.occupied = False
-        self.assigned_id = None
-        self.time_in_ms = None
-        self.ir_state_ms = utime.ticks_ms()
-
-class Ticket:
-    def __init__(self,id_,slot_name,time_in_ms):
-        self.id = id_
-        self.slot = slot_name
-        self.time_in_ms = time_in_ms
-        self.time_out_ms = None
-        self.duration_min = None
-        self.fee = None
-    def close(self,time_out_ms):
-        self.time_out_ms = time_out_ms
-        duration_min = max(math.ceil(utime.ticks_diff(self.time_out_ms,self.time_in_ms)/60000),0)
-        self.duration_min = duration_min
-        self.fee = duration_min*FEE_PER_MIN
-
-class ParkingManager:
-    def __init__(self):
-        self.slots = [Slot(f"S{i+1}") for i in range(NUM_SLOTS)]
-        self.open_tickets = {}
-        self.closed_tickets = []
-        self.next_ids = list(range(1,NUM_SLOTS+1))
-        self.recently_occupied = {}
-        self.pending_entry = False  # Flag for car waiting to enter
-
-    def assign_lowest_id(self):
-        return min(self.next_ids) if self.next_ids else None
-
-    def has_available_slot(self):
-        """Check if there's at least one free slot"""
-        return any(not s.occupied for s in self.slots)
-
-    def mark_occupied(self, idx):
-        s = self.slots[idx]
-        if s.occupied: return None
-        assigned = self.assign_lowest_id()
-        if assigned is None: return None
-        self.next_ids.remove(assigned)
-        s.assigned_id = assigned; s.occupied=True; s.time_in_ms=utime.ticks_ms()
-        t = Ticket(assigned, s.name, s.time_in_ms)
-        self.open_tickets[assigned] = t
-        self.recently_occupied[s.name] = utime.ticks_ms()
-        print("Assigned ID", assigned, "to", s.name)
-        return assigned
-
-    def mark_free(self, idx):
-        s = self.slots[idx]
-        if not s.occupied: return None
-        assigned = s.assigned_id
-        t = self.open_tickets.pop(assigned, None)
-        if t:
-            t.close(utime.ticks_ms())
-            self.closed_tickets.insert(0, t)
-            send_receipt_from_ticket(t)
-        s.occupied=False; s.assigned_id=None; s.time_in_ms=None
-        if assigned not in self.next_ids:
-            self.next_ids.append(assigned); self.next_ids.sort()
-        print("Ticket closed ID", assigned, "slot", s.name)
-        return t
-
-    def process_ir_states(self, ir_states):
-        """
-        Monitor IR sensors for vehicles in slots.
-        Returns (changed, exit_detected)
-        - changed: True if slot status changed
-        - exit_detected: True if car left slot (should open gate for exit)
-        """
-        changed = False
-        exit_detected = False
-        now = utime.ticks_ms()
-        
-        for i, raw_state in enumerate(ir_states):
-            s = self.slots[i]
-            was_occupied = s.occupied
-            is_blocked = s.ir_state_ms > 0
-            elapsed = utime.ticks_diff(now, abs(s.ir_state_ms))
-            
-            # Update state timestamp when IR state changes
-            if raw_state != is_blocked:
-                s.ir_state_ms = now if raw_state else -now
-            
-            # ENTRY: IR blocked on empty slot (car parking)
-            if raw_state and not s.occupied and elapsed >= ENTRY_DEBOUNCE_MS:
-                self.mark_occupied(i)
-                changed = True
-                s.ir_state_ms = now
-                print(f"Car parked in {s.name}")
-            
-            # EXIT: IR unblocked on occupied slot (car leaving)
-            elif not raw_state and s.occupied and elapsed >= EXIT_GRACE_MS:
-                self.mark_free(i)
-                changed = True
-                exit_detected = True  # Trigger gate opening
-                s.ir_state_ms = -now
-                print(f"Car leaving {s.name}")
-
-        # Cleanup recently_occupied older than 60s
-        to_remove = []
-        for slot_name, ts in self.recently_occupied.items():
-            if utime.ticks_diff(now, ts) > 60000:
-                to_remove.append(slot_name)
-        for slot_name in to_remove:
-            del self.recently_occupied[slot_name]
-        
-        return changed, exit_detected
-
-    def get_status(self):
-        total=len(self.slots)
-        free=sum(1 for s in self.slots if not s.occupied)
-        occupied=total-free
-        slots_info=[]
-        now=utime.ticks_ms()
-        for s in self.slots:
-            elapsed_min=None
-            if s.occupied and s.time_in_ms:
-                elapsed_min=utime.ticks_diff(now,s.time_in_ms)/60000.0
-            slots_info.append({"name":s.name,"occupied":s.occupied,"id":s.assigned_id,"elapsed_min":elapsed_min})
-        return {
-            "total":total,
-            "free":free,
-            "occupied":occupied,
-            "slots":slots_info,
-            "open_tickets":list(self.open_tickets.values()),
-            "recent_closed":self.closed_tickets[:10],
-            "recently_occupied": self.recently_occupied
-        }
+# Slot, Ticket and ParkingManager live in parking.py
+SLOT_CONFIG = load_slot_config(SLOTS_FILE) or default_slot_config([PIN_IR_S1, PIN_IR_S2, PIN_IR_S3])
+
+prof=Profiler(track_mem=PERF_TRACK_MEM,enabled=PERF_ENABLED)
+P_LOOP=prof.section("loop")
+P_SERVO=prof.section("update_servo")
+P_SONAR=prof.section("read_ultrasonic")
+P_IR=prof.section("process_ir_states")
+P_WEB=prof.section("WebServer.poll")
+P_LCD=prof.section("update_lcd_display")
+P_TELEMETRY=prof.section("telemetry")
 
 # --- 6. WEBSERVER ---
-def render_dashboard_html(status):
-    slots_html=""
-    for s in status["slots"]:
-        elapsed="-"
-        if s["occupied"] and s["elapsed_min"]: elapsed="{:.1f} min".format(s["elapsed_min"])
-        if s["occupied"]:
-            if s["name"] in status.get('recently_occupied', {}):
-                row_class="flash"
-            else:
-                row_class="occupied"
-        else:
-            row_class="free"
-        slots_html+=f"<tr class='{row_class}'><td>{s['name']}</td><td>{'Occupied' if s['occupied'] else 'Free'}</td><td>{s['id'] or '-'}</td><td>{elapsed}</td></tr>"
-
-    departures_html=""
-    for t in status["recent_closed"]:
-        departures_html += f"<tr style='background:#eeeeff'><td>{t.id}</td><td>{t.slot}</td><td>{format_ms_to_datetime(t.time_out_ms)}</td><td>{t.fee:.2f}</td></tr>"
-
-    html=f"""
-<html>
-<head>
-<title>Smart Parking Dashboard</title>
-<meta http-equiv="refresh" content="{DASHBOARD_REFRESH}">
-<style>
-body {{ font-family: Arial,sans-serif; margin:20px; background:#f0f0f8; color:#222; }}
-.card {{ border:1px solid #ccc; padding:10px; margin-bottom:15px; border-radius:8px; background:#fff; }}
-h2 {{ color:#3333aa; }}
-table {{ width:100%; border-collapse: collapse; }}
-th,td {{ padding:8px; border-bottom:1px solid #ccc; text-align:left; }}
-th {{ background:#3333aa; color:#fff; }}
-tr.free {{ background:#ddffdd; }}
-tr.occupied {{ background:#ffdddd; }}
-tr.flash {{ animation: flash-bg 1s ease-in-out infinite; background:#ffaaaa; }}
-@keyframes flash-bg {{0%{{background:#ffaaaa;}}50%{{background:#ff5555;}}100%{{background:#ffaaaa;}}}}
-</style>
-</head>
-<body>
-<h2>Smart Parking Dashboard</h2>
-<div class="card">
-<b>Total Slots:</b> {status['total']} &nbsp; <b>Free:</b> {status['free']} &nbsp; <b>Occupied:</b> {status['occupied']}
-</div>
-<div class="card">
-<h3>Current Slots Status</h3>
-<table>
-<tr><th>Slot</th><th>Status</th><th>ID</th><th>Elapsed</th></tr>
-{slots_html}
-</table>
-</div>
-<div class="card">
-<h3>Recent Departures</h3>
-<table>
-<tr><th>Ticket ID</th><th>Slot</th><th>Exit Time</th><th>Fee ($)</th></tr>
-{departures_html}
-</table>
-</div>
-</body>
-</html>
-"""
-    return html
-
+# render_dashboard_html lives in dashboard.py; the stylesheet is prebuilt
+# into static/ by build_assets.py and streamed gzipped from flash
 class WebServer:
-    def __init__(self, port=WEBSERVER_PORT):
+    def __init__(self, port=WEBSERVER_PORT, static_dir=STATIC_DIR):
         self.addr=socket.getaddrinfo("0.0.0.0",port)[0][-1]
         self.sock=socket.socket()
         self.sock.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEADDR,1)
         self.sock.bind(self.addr)
         self.sock.listen(1)
         self.sock.settimeout(0.1)
+        # Waiting in ipoll() instead of accept() means an idle tick doesn't
+        # raise (and allocate) an OSError; ipoll also reuses its result
+        self.poller=select.poll()
+        self.poller.register(self.sock,select.POLLIN)
+        self.static_dir=static_dir
+        self.buf=bytearray(512)  # reused for every static response
+        try:
+            with open(static_dir+"/manifest.json") as f: self.assets=json.load(f)
+        except Exception as e:
+            print("No static assets:",e); self.assets={}
         print("Web server listening on port",port)
+    def send_static(self,cl,req,asset):
+        etag=asset["etag"]
+        if b"If-None-Match: "+etag.encode() in req:
+            cl.send(b"HTTP/1.0 304 Not Modified\r\nETag: "+etag.encode()+b"\r\n\r\n")
+            return
+        with open(self.static_dir+"/"+asset["file"],"rb") as f:
+            cl.send(f"HTTP/1.0 200 OK\r\nContent-Type: {asset['type']}\r\nContent-Encoding: gzip\r\n"
+                    f"Content-Length: {asset['gz']}\r\nCache-Control: max-age=86400\r\nETag: {etag}\r\n\r\n")
+            mv=memoryview(self.buf)
+            while True:
+                n=f.readinto(self.buf)
+                if not n: break
+                cl.send(mv[:n])
+    def send_perf(self,cl,path):
+        if "reset" in path: prof.reset()
+        cl.send(b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\nCache-Control: no-store\r\n\r\n")
+        cl.send(json.dumps({"enabled":prof.enabled,"sections":prof.report(),"mem_free":gc.mem_free(),
+                            "uptime_ms":utime.ticks_ms()}).encode())
     def poll(self,parking):
+        ready=False
+        for _ in self.poller.ipoll(100): ready=True
+        if not ready: return
         try:
             cl,addr=self.sock.accept()
         except: return
         try:
-            cl.recv(1024)
-            html=render_dashboard_html(parking.get_status())
+            req=cl.recv(1024)
+            parts=req.split(b" ",2)
+            path=parts[1].decode() if len(parts)>2 else "/"
+            if path.startswith("/debug/perf"):
+                self.send_perf(cl,path)
+                return
+            asset=self.assets.get(path.lstrip("/"))
+            if asset:
+                self.send_static(cl,req,asset)
+                return
+            html=render_dashboard_html(parking.get_status(),DASHBOARD_REFRESH)
             cl.send(b"HTTP/1.0 200 OK\r\nContent-Type: text/html\r\n\r\n")
             cl.send(html.encode())
         finally:
             cl.close()
 
 # --- 7. HARDWARE SETUP ---
-TRIG=Pin(PIN_ULTRASONIC_TRIG,Pin.OUT)
-ECHO=Pin(PIN_ULTRASONIC_ECHO,Pin.IN)
+sonar=HCSR04(Pin(PIN_ULTRASONIC_TRIG,Pin.OUT),Pin(PIN_ULTRASONIC_ECHO,Pin.IN))
 SERVO_PIN=Pin(PIN_SERVO,Pin.OUT)
-IR_PINS=[Pin(PIN_IR_S1,Pin.IN),Pin(PIN_IR_S2,Pin.IN),Pin(PIN_IR_S3,Pin.IN)]
+IR_PINS=[Pin(c["pin"],Pin.IN) for c in SLOT_CONFIG]
 LED_GATE=Pin(PIN_LED_GATE,Pin.OUT)
 LED_FULL=Pin(PIN_LED_FULL,Pin.OUT)
 servo=PWM(SERVO_PIN,freq=50)
@@ -378,13 +197,13 @@ last_ultrasonic_trigger=0
 gate_is_operating=False  # Flag to prevent retriggering during gate operation
 
 def servo_write(angle):
-    min_us=500; max_us=2500
-    pulse_us=min_us+(angle/180)*(max_us-min_us)
-    duty=int((pulse_us/20000)*1023)
-    servo.duty(duty)
+    # 500..2500 us pulse in a 20 ms period, as a 10-bit duty (integer maths)
+    pulse_us=500+angle*2000//180
+    servo.duty(pulse_us*1023//20000)
 
 def update_servo():
     global servo_angle,target_angle,servo_last_update
+    if servo_angle==target_angle: return  # at rest: nothing to write
     now=utime.ticks_ms()
     if utime.ticks_diff(now,servo_last_update)>=20:
         if servo_angle<target_angle:
@@ -415,24 +234,18 @@ def close_gate():
         last_ultrasonic_trigger = utime.ticks_ms()  # Start cooldown
         print("Gate closed")
 
-def read_ultrasonic():
-    TRIG.value(0)
-    time.sleep_us(2)
-    TRIG.value(1)
-    time.sleep_us(10)
-    TRIG.value(0)
-    dur=time_pulse_us(ECHO,1,30000)
-    return dur/58.3 if dur>=0 else 999
+def update_lcd_display(parking,fb):
+    if not fb: return
+    with P_LCD:
+        _update_lcd(parking,fb)
 
-def update_lcd_display(parking,lcd_):
-    if not lcd_: return
-    status=parking.get_status()
-    free=status["free"]
-    lcd_.clear()
+def _update_lcd(parking,fb):
+    free=parking.free_count
     if free==0:
-        lcd_.putstr("PARKING FULL"); LED_FULL.value(1)
+        fb.write(0,"PARKING FULL"); LED_FULL.value(1)
     else:
-        lcd_.putstr(f"FREE:{free}/{status['total']}"); LED_FULL.value(0)
+        fb.write(0,"FREE:%d/%d"%(free,len(parking.slots))); LED_FULL.value(0)
+    fb.flush()
 
 # --- INITIALIZATION ---
 try: IP_ADDRESS=connect_wifi()
@@ -443,51 +256,78 @@ try:
     i2c=I2C(0,scl=Pin(I2C_SCL),sda=Pin(I2C_SDA),freq=I2C_FREQ)
     dev=i2c.scan()
     if not dev: raise Exception("No LCD found")
-    lcd=I2cLcd(i2c,dev[0],2,16)
-    lcd.clear()
-    lcd.putstr(f"IP:{IP_ADDRESS or 'N/A'}")
+    lcd=LcdFramebuffer(I2cLcd(i2c,dev[0],2,16),2,16)
+    lcd.write(1,f"IP:{IP_ADDRESS or 'N/A'}")
+    lcd.flush()
 except: print("LCD init failed")
 
-parking=ParkingManager()
+parking=ParkingManager(SLOT_CONFIG,on_ticket_closed=send_receipt_from_ticket,
+                       entry_debounce_ms=ENTRY_DEBOUNCE_MS,exit_grace_ms=EXIT_GRACE_MS,
+                       fee_per_min=FEE_PER_MIN)
+telemetry=ParkingTelemetry(TELEMETRY_URL if IP_ADDRESS else None,TELEMETRY_INTERVAL_MS).attach(parking)
 webserver=WebServer()
+micropython.alloc_emergency_exception_buf(100)
+ir_monitor=IrSlotMonitor(parking,IR_PINS)
+ir_monitor.attach()
+sonar.set_detect(ULTRASONIC_DETECT_CM,ULTRASONIC_MIN_CONFIDENCE)
 servo_write(0)
 LED_GATE.value(0); LED_FULL.value(0)
 update_lcd_display(parking,lcd)
 
 # --- MAIN LOOP ---
-print("System ready. Entry: Ultrasonic | Exit: IR sensors")
-
-while True:
+def loop_once():
+    # One pass of the main loop. A function rather than inline code: locals
+    # are faster than globals on MicroPython, and bench_alloc.py can drive
+    # a single pass on the virtual board
     now = utime.ticks_ms()
-    update_servo()
+    loop_start = utime.ticks_us()
+    with P_SERVO:
+        update_servo()
+    with P_SONAR:
+        sonar.update()
     
     # Auto-close gate after timeout (gate opens -> waits -> closes naturally)
     if gate_close_time and utime.ticks_diff(now, gate_close_time) >= 0:
         close_gate()
     
     # ENTRY DETECTION: Ultrasonic sensor detects car approaching
+    # same test as read() <= ULTRASONIC_DETECT_CM at ULTRASONIC_MIN_CONFIDENCE, without floats
+    car_at_entrance = sonar.detected()
     # Only trigger if: gate is not operating AND cooldown period has passed
     if not gate_is_operating and utime.ticks_diff(now, last_ultrasonic_trigger) >= ULTRASONIC_COOLDOWN_MS:
-        distance = read_ultrasonic()
-        if distance <= ULTRASONIC_DETECT_CM:
+        if car_at_entrance:
             if parking.has_available_slot():
-                print(f"ENTRY: Car detected at {distance:.1f}cm - Opening gate")
+                print("ENTRY: Car detected - Opening gate")
                 open_gate()  # Gate will open, then close automatically after timeout
                 update_lcd_display(parking, lcd)
             else:
                 print("ENTRY DENIED: Parking full")
     
-    # EXIT DETECTION: IR sensors detect car leaving slot
-    raw_ir = [pin.value() == 0 for pin in IR_PINS]
-    changed, exit_detected = parking.process_ir_states(raw_ir)
+    # EXIT DETECTION: IR edges (captured by IRQ) detect car leaving slot
+    with P_IR:
+        ir_flags = ir_monitor.update()  # CHANGED | EXIT bits, 0 on a quiet tick
     
-    if changed:
+    if ir_flags:
         update_lcd_display(parking, lcd)
     
     # Open gate when car exits (only if gate is not already operating)
-    if exit_detected and not gate_is_operating:
+    if ir_flags & EXIT and not gate_is_operating:
         print("EXIT: Opening gate for departing car")
         open_gate()  # Gate will open, then close automatically after timeout
     
-    webserver.poll(parking)
+    with P_WEB:
+        webserver.poll(parking)
+    # Counters are updated by the ticket hooks; the batch only goes out
+    # while the gate is closed and nobody is at the entrance, so a slow
+    # gateway can't hold up a car
+    with P_TELEMETRY:
+        telemetry.poll(idle=not gate_is_operating and not car_at_entrance)
+    P_LOOP.add(utime.ticks_diff(utime.ticks_us(), loop_start))
+    if PERF_PRINT_MS and not gate_is_operating:
+        prof.poll_print(PERF_PRINT_MS)
+
+print("System ready. Entry: Ultrasonic | Exit: IR sensors")
+
+while True:
+    loop_once()
     time.sleep(0.05)
@@ -0,0 +1,69 @@
+# dashboard.py - HTML dashboard for the ESP32 Smart Parking System
+#
+# Separate from car_parking_project.py so it can be benchmarked on the host.
+# The stylesheet is www/dashboard.css, served gzipped from static/ (see
+# build_assets.py) and cached by the browser across the meta refreshes.
+
+import utime
+
+
+def format_ms_to_datetime(ms_since_boot):
+    now_sec = utime.time()
+    elapsed_ms = utime.ticks_ms()
+    time_event_sec = now_sec - (elapsed_ms - ms_since_boot) // 1000
+    t = utime.localtime(time_event_sec)
+    return "{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(*t[:6])
+
+
+def render_dashboard_html(status, refresh=3):
+    slots_html=""
+    for s in status["slots"]:
+        elapsed="-"
+        if s["occupied"] and s["elapsed_ms"]: elapsed="{:.1f} min".format(s["elapsed_ms"]/60000)
+        if s["occupied"]:
+            if s["name"] in status.get('recently_occupied', {}):
+                row_class="flash"
+            else:
+                row_class="occupied"
+        else:
+            row_class="free"
+        slots_html+=f"<tr class='{row_class}'><td>{s['name']}</td><td>{'Occupied' if s['occupied'] else 'Free'}</td><td>{s['id'] or '-'}</td><td>{elapsed}</td></tr>"
+
+    departures_html=""
+    for t in status["recent_closed"]:
+        departures_html += f"<tr style='background:#eeeeff'><td>{t.id}</td><td>{t.slot}</td><td>{format_ms_to_datetime(t.time_out_ms)}</td><td>{t.fee:.2f}</td></tr>"
+
+    zones_html=""
+    if len(status["zones"])>1:
+        zones_html="<br>"+" &nbsp; ".join(f"<b>Zone {z}:</b> {v['free']}/{v['total']} free" for z,v in status["zones"].items())
+
+    html=f"""
+<html>
+<head>
+<title>Smart Parking Dashboard</title>
+<meta http-equiv="refresh" content="{refresh}">
+<link rel="stylesheet" href="/dashboard.css">
+</head>
+<body>
+<h2>Smart Parking Dashboard</h2>
+<div class="card">
+<b>Total Slots:</b> {status['total']} &nbsp; <b>Free:</b> {status['free']} &nbsp; <b>Occupied:</b> {status['occupied']}
+{zones_html}</div>
+<div class="card">
+<h3>Current Slots Status</h3>
+<table>
+<tr><th>Slot</th><th>Status</th><th>ID</th><th>Elapsed</th></tr>
+{slots_html}
+</table>
+</div>
+<div class="card">
+<h3>Recent Departures</h3>
+<table>
+<tr><th>Ticket ID</th><th>Slot</th><th>Exit Time</th><th>Fee ($)</th></tr>
+{departures_html}
+</table>
+</div>
+</body>
+</html>
+"""
+    return html
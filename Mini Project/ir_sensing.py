@@ -0,0 +1,160 @@
+# ir_sensing.py - Interrupt-driven IR slot sensing for the Smart Parking System
+#
+# Each IR pin fires an IRQ on both edges. The handler only stores
+# (slot, level, ticks_us) into a preallocated ring buffer; the main loop
+# drains it and runs a per-slot debounce state machine over the slots that
+# actually changed. Entry/exit times come from the edge timestamp, not from
+# when the loop happened to look, and short transitions are not missed.
+# The loop side works in preallocated arrays and allocates nothing on a
+# tick without a committed change.
+
+import utime
+from array import array
+from parking import CHANGED, EXIT
+
+IR_ACTIVE_LEVEL = 0  # IR modules pull low when a car blocks the beam
+
+
+class EdgeRing:
+    """
+    Single-producer (IRQ) / single-consumer (main loop) ring buffer.
+    The IRQ side only writes `head`, the loop side only writes `tail`,
+    so no locking is needed. Size must be a power of two.
+    """
+    def __init__(self, size=64):
+        self.mask = size - 1
+        self.slot = array("H", [0] * size)
+        self.level = array("B", [0] * size)
+        self.ticks = array("L", [0] * size)
+        self.head = 0
+        self.tail = 0
+        self.overflow = False
+
+    def push(self, slot, level, ticks):
+        # Called from IRQ context: no allocation, no exceptions
+        h = self.head
+        nxt = (h + 1) & self.mask
+        if nxt == self.tail:
+            self.overflow = True
+            return
+        self.slot[h] = slot
+        self.level[h] = level
+        self.ticks[h] = ticks
+        self.head = nxt
+
+    def __len__(self):
+        return (self.head - self.tail) & self.mask
+
+
+class IrSlotMonitor:
+    """
+    Feeds IR edges into a ParkingManager.
+    update() returns CHANGED | EXIT bits like process_ir_states().
+    """
+    def __init__(self, parking, pins, ring_size=64, active_level=IR_ACTIVE_LEVEL):
+        self.parking = parking
+        self.pins = pins
+        self.active_level = active_level
+        self.ring = EdgeRing(ring_size)
+        n = len(pins)
+        self.blocked = bytearray(n)            # last seen raw state per slot
+        self.edge_us = array("L", [0] * n)     # ticks_us of that state's edge
+        self.pending = array("H", [0] * n)     # slots whose raw state != committed state
+        self.n_pending = 0
+        self._in_pending = bytearray(n)
+        self._handlers = []
+
+    # ---- IRQ side ----
+    def attach(self, hard=False):
+        """Register edge IRQs on every pin and seed the current levels."""
+        from machine import Pin
+        trigger = Pin.IRQ_RISING | Pin.IRQ_FALLING
+        for i, pin in enumerate(self.pins):
+            handler = self._make_handler(i)
+            self._handlers.append(handler)  # keep a reference for the IRQ
+            pin.irq(trigger=trigger, handler=handler, hard=hard)
+        self.resync()
+
+    def detach(self):
+        for pin in self.pins:
+            pin.irq(handler=None)
+        self._handlers = []
+
+    def _make_handler(self, i):
+        push = self.ring.push
+        ticks_us = utime.ticks_us
+
+        def handler(pin):
+            push(i, pin.value(), ticks_us())
+        return handler
+
+    def resync(self):
+        """Read every pin once; used at start-up and after a ring overflow."""
+        now = utime.ticks_us()
+        for i, pin in enumerate(self.pins):
+            self._edge(i, pin.value(), now)
+        self.ring.overflow = False
+
+    # ---- loop side ----
+    def _edge(self, i, level, ticks):
+        self.blocked[i] = 1 if level == self.active_level else 0
+        # Any edge (even one that reads back the same level after a missed
+        # bounce) restarts the debounce window for that slot
+        self.edge_us[i] = ticks
+        if not self._in_pending[i]:
+            self._in_pending[i] = 1
+            self.pending[self.n_pending] = i
+            self.n_pending += 1
+
+    def _drain(self):
+        ring = self.ring
+        mask = ring.mask
+        t = ring.tail
+        head = ring.head
+        while t != head:
+            self._edge(ring.slot[t], ring.level[t], ring.ticks[t])
+            t = (t + 1) & mask
+        ring.tail = t
+
+    def update(self):
+        if self.ring.overflow:
+            self._drain()
+            self.resync()
+        else:
+            self._drain()
+
+        flags = 0
+        parking = self.parking
+        now_us = utime.ticks_us()
+        now_ms = utime.ticks_ms()
+        pending = self.pending
+        k = self.n_pending - 1
+        while k >= 0:
+            i = pending[k]
+            s = parking.slots[i]
+            blocked = self.blocked[i] == 1
+            done = blocked == s.occupied  # bounced back, nothing to commit
+            if not done:
+                elapsed = utime.ticks_diff(now_us, self.edge_us[i]) // 1000
+                at_ms = utime.ticks_add(now_ms, -elapsed)
+                # ENTRY: beam blocked long enough on an empty slot
+                if blocked and elapsed >= parking.entry_debounce_ms:
+                    if parking.mark_occupied(i, at_ms) is not None:
+                        flags |= CHANGED
+                        done = True
+                        print("Car parked in", s.name)
+                # EXIT: beam clear long enough on an occupied slot
+                elif not blocked and elapsed >= parking.exit_grace_ms:
+                    parking.mark_free(i, at_ms)
+                    flags |= CHANGED | EXIT
+                    done = True
+                    print("Car leaving", s.name)
+            if done:
+                # swap-remove keeps this O(1) per committed slot
+                self.n_pending -= 1
+                pending[k] = pending[self.n_pending]
+                self._in_pending[i] = 0
+            k -= 1
+
+        parking.expire_recent(now_ms)
+        return flags
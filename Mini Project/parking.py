@@ -0,0 +1,362 @@
+# parking.py - Slot/ticket bookkeeping for the ESP32 Smart Parking System
+#
+# Kept free of hardware imports so the same code runs on the ESP32 and on a
+# laptop (see bench_parking.py). Every query the main loop makes per tick
+# (free count, per-zone/level counts, next ticket ID) is O(1) or O(log n),
+# so a multi-level garage with hundreds of slots costs the same per tick as
+# the original 3-slot demo. Ticket records are preallocated (one per ticket
+# ID plus a short ring of closed ones) and a tick with no IR change
+# allocates nothing, so the GC never has to pause the gate servo.
+
+import utime
+import json
+from heapq import heappush, heappop
+
+ENTRY_DEBOUNCE_MS = 300
+EXIT_GRACE_MS = 1000
+FEE_PER_MIN = 0.5
+RECENT_MS = 60000
+HISTORY = 10            # closed tickets kept for the dashboard
+
+# process_ir_states() / IrSlotMonitor.update() result bits
+CHANGED = 1             # a slot changed state
+EXIT = 2                # a car left a slot (open the gate)
+
+
+# --- SLOT CONFIG ---
+def load_slot_config(path):
+    """
+    Read the slot layout from a JSON file:
+      {"slots": [{"name": "S1", "pin": 5, "zone": "A", "level": 0}, ...]}
+    Only "name" is required; zone/level default to "A"/0.
+    Returns a list of dicts, or None if the file is missing or invalid.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    slots = data.get("slots") if isinstance(data, dict) else data
+    if not slots:
+        return None
+    return [_normalize_slot(i, s) for i, s in enumerate(slots)]
+
+
+def default_slot_config(pins):
+    """Fallback layout: one slot per IR pin, all in zone A / level 0."""
+    return [_normalize_slot(i, {"pin": p}) for i, p in enumerate(pins)]
+
+
+def _normalize_slot(i, s):
+    return {
+        "name": s.get("name") or "S{}".format(i + 1),
+        "pin": s.get("pin"),
+        "zone": s.get("zone", "A"),
+        "level": s.get("level", 0),
+    }
+
+
+# --- ID ALLOCATOR ---
+class IdAllocator:
+    """Hands out the lowest free ticket ID using a min-heap (O(log n))."""
+    def __init__(self, count):
+        # range(1, n+1) is already a valid heap, no heapify needed
+        self._heap = list(range(1, count + 1))
+
+    def acquire(self):
+        return heappop(self._heap) if self._heap else None
+
+    def release(self, id_):
+        heappush(self._heap, id_)
+
+    def peek(self):
+        return self._heap[0] if self._heap else None
+
+    def __len__(self):
+        return len(self._heap)
+
+
+# --- HELPERS ---
+def cents(amount):
+    """Currency amount -> whole cents (int), rounded."""
+    return int(amount * 100 + 0.5)
+
+
+def _put(lst, i, item):
+    # lst[i] = item, appending when i == len(lst): a reused list only
+    # grows when there are more items than ever before
+    if i < len(lst):
+        lst[i] = item
+    else:
+        lst.append(item)
+
+
+def _trim(lst, n):
+    while len(lst) > n:
+        lst.pop()
+
+
+# --- RECORDS ---
+# __slots__ keeps instances compact on CPython; MicroPython ignores it,
+# but every attribute is still set in __init__ so none is added later
+class Slot:
+    __slots__ = ("name", "zone", "level", "pin", "occupied", "assigned_id", "time_in_ms", "ir_state_ms")
+
+    def __init__(self, name, zone="A", level=0, pin=None):
+        self.name = name
+        self.zone = zone
+        self.level = level
+        self.pin = pin
+        self.occupied = False
+        self.assigned_id = None
+        self.time_in_ms = None
+        self.ir_state_ms = utime.ticks_ms()
+
+
+class Ticket:
+    __slots__ = ("id", "slot", "time_in_ms", "time_out_ms", "duration_min", "fee_cents")
+
+    def __init__(self, id_, slot_name=None, time_in_ms=None):
+        self.id = id_
+        self.open(slot_name, time_in_ms)
+
+    def open(self, slot_name, time_in_ms):
+        self.slot = slot_name
+        self.time_in_ms = time_in_ms
+        self.time_out_ms = None
+        self.duration_min = None
+        self.fee_cents = None
+
+    @property
+    def fee(self):
+        """Fee in currency units (a float, made when read)."""
+        return None if self.fee_cents is None else self.fee_cents / 100
+
+    def close(self, time_out_ms, cents_per_min=cents(FEE_PER_MIN)):
+        self.time_out_ms = time_out_ms
+        # whole minutes rounded up, fee in cents: integer maths, no float per ticket
+        self.duration_min = max((utime.ticks_diff(time_out_ms, self.time_in_ms) + 59999) // 60000, 0)
+        self.fee_cents = self.duration_min * cents_per_min
+
+    def copy_from(self, t):
+        self.id = t.id
+        self.slot = t.slot
+        self.time_in_ms = t.time_in_ms
+        self.time_out_ms = t.time_out_ms
+        self.duration_min = t.duration_min
+        self.fee_cents = t.fee_cents
+
+
+# --- MANAGER ---
+class ParkingManager:
+    def __init__(self, slot_config, on_ticket_closed=None,
+                 entry_debounce_ms=ENTRY_DEBOUNCE_MS, exit_grace_ms=EXIT_GRACE_MS,
+                 fee_per_min=FEE_PER_MIN, on_ticket_opened=None):
+        self.slots = [Slot(c["name"], c["zone"], c["level"], c["pin"]) for c in slot_config]
+        self.open_tickets = {}
+        self.ids = IdAllocator(len(self.slots))
+        # one reusable Ticket per ID (IDs are 1..n, index 0 unused) and a
+        # ring of copies of the last HISTORY closed ones
+        self._tickets = [Ticket(i) for i in range(len(self.slots) + 1)]
+        self._history = [Ticket(0) for _ in range(HISTORY)]
+        self._history_pos = 0
+        self._history_len = 0
+        self.recently_occupied = {}
+        self._recent_due = None  # ticks_ms when the oldest recent entry expires
+        self.pending_entry = False  # Flag for car waiting to enter
+        self.on_ticket_opened = on_ticket_opened
+        self.on_ticket_closed = on_ticket_closed
+        self.entry_debounce_ms = entry_debounce_ms
+        self.exit_grace_ms = exit_grace_ms
+        self.fee_per_min = fee_per_min
+        self._cents_per_min = cents(fee_per_min)
+        self._status = None     # get_status() result, reused
+        self._closed = []       # closed_tickets result, reused
+
+        # Incrementally maintained indexes
+        self.free_count = len(self.slots)
+        self.slot_index = {}    # name -> idx
+        self.zone_slots = {}    # zone -> [idx, ...]
+        self.level_slots = {}   # level -> [idx, ...]
+        self.zone_free = {}     # zone -> free count
+        self.level_free = {}    # level -> free count
+        for i, s in enumerate(self.slots):
+            self.slot_index[s.name] = i
+            self.zone_slots.setdefault(s.zone, []).append(i)
+            self.level_slots.setdefault(s.level, []).append(i)
+            self.zone_free[s.zone] = self.zone_free.get(s.zone, 0) + 1
+            self.level_free[s.level] = self.level_free.get(s.level, 0) + 1
+
+    def assign_lowest_id(self):
+        return self.ids.peek()
+
+    def has_available_slot(self, zone=None):
+        """Check if there's at least one free slot (optionally in a zone)"""
+        if zone is None:
+            return self.free_count > 0
+        return self.zone_free.get(zone, 0) > 0
+
+    def free_in_zone(self, zone):
+        return self.zone_free.get(zone, 0)
+
+    def free_on_level(self, level):
+        return self.level_free.get(level, 0)
+
+    def _count(self, s, delta):
+        self.free_count += delta
+        self.zone_free[s.zone] += delta
+        self.level_free[s.level] += delta
+
+    def mark_occupied(self, idx, at_ms=None):
+        s = self.slots[idx]
+        if s.occupied: return None
+        assigned = self.ids.acquire()
+        if assigned is None: return None
+        s.assigned_id = assigned; s.occupied = True
+        s.time_in_ms = utime.ticks_ms() if at_ms is None else at_ms
+        self._count(s, -1)
+        t = self._tickets[assigned]
+        t.open(s.name, s.time_in_ms)
+        self.open_tickets[assigned] = t
+        self.recently_occupied[s.name] = s.time_in_ms
+        if self._recent_due is None:
+            self._recent_due = utime.ticks_add(s.time_in_ms, RECENT_MS)
+        if self.on_ticket_opened:
+            self.on_ticket_opened(t)
+        print("Assigned ID", assigned, "to", s.name)
+        return assigned
+
+    def mark_free(self, idx, at_ms=None):
+        s = self.slots[idx]
+        if not s.occupied: return None
+        assigned = s.assigned_id
+        t = self.open_tickets.pop(assigned, None)
+        if t:
+            t.close(utime.ticks_ms() if at_ms is None else at_ms, self._cents_per_min)
+            self._history[self._history_pos].copy_from(t)
+            self._history_pos = (self._history_pos + 1) % HISTORY
+            if self._history_len < HISTORY:
+                self._history_len += 1
+            # t is reused for the next car given this ID: callbacks must
+            # copy what they keep
+            if self.on_ticket_closed:
+                self.on_ticket_closed(t)
+        s.occupied = False; s.assigned_id = None; s.time_in_ms = None
+        self._count(s, +1)
+        self.ids.release(assigned)
+        print("Ticket closed ID", assigned, "slot", s.name)
+        return t
+
+    @property
+    def closed_tickets(self):
+        """
+        Last HISTORY closed tickets, newest first. The same list is
+        refilled on every read, so it is only valid until the next one.
+        """
+        h = self._history
+        out = self._closed
+        for k in range(self._history_len):
+            _put(out, k, h[(self._history_pos - 1 - k) % HISTORY])
+        _trim(out, self._history_len)
+        return out
+
+    def process_ir_states(self, ir_states):
+        """
+        Monitor IR sensors for vehicles in slots (polling mode, one
+        raw state per slot; see ir_sensing.py for the interrupt path).
+        Returns CHANGED | EXIT bits (0 when nothing happened)
+        - CHANGED: a slot's status changed
+        - EXIT: a car left its slot (should open gate for exit)
+        """
+        flags = 0
+        now = utime.ticks_ms()
+
+        for i, raw_state in enumerate(ir_states):
+            s = self.slots[i]
+            is_blocked = s.ir_state_ms > 0
+            elapsed = utime.ticks_diff(now, abs(s.ir_state_ms))
+
+            # Update state timestamp when IR state changes
+            if raw_state != is_blocked:
+                s.ir_state_ms = now if raw_state else -now
+
+            # ENTRY: IR blocked on empty slot (car parking)
+            if raw_state and not s.occupied and elapsed >= self.entry_debounce_ms:
+                self.mark_occupied(i)
+                flags |= CHANGED
+                s.ir_state_ms = now
+                print("Car parked in", s.name)
+
+            # EXIT: IR unblocked on occupied slot (car leaving)
+            elif not raw_state and s.occupied and elapsed >= self.exit_grace_ms:
+                self.mark_free(i)
+                flags |= CHANGED | EXIT  # EXIT triggers gate opening
+                s.ir_state_ms = -now
+                print("Car leaving", s.name)
+
+        self.expire_recent(now)
+        return flags
+
+    def expire_recent(self, now):
+        # Cleanup recently_occupied older than 60s. Every tick only compares
+        # against the oldest entry's expiry; the dict is walked (and a list
+        # of names built) once per expiry, not once per tick. No comprehension
+        # over `now`: it would make `now` a closure cell, allocated per call.
+        due = self._recent_due
+        if due is None or utime.ticks_diff(now, due) <= 0:
+            return
+        recent = self.recently_occupied
+        expired = []
+        for slot_name, ts in recent.items():
+            if utime.ticks_diff(now, ts) > RECENT_MS:
+                expired.append(slot_name)
+        for slot_name in expired:
+            del recent[slot_name]
+        due = None
+        for ts in recent.values():
+            expires = utime.ticks_add(ts, RECENT_MS)
+            if due is None or utime.ticks_diff(expires, due) < 0:
+                due = expires
+        self._recent_due = due
+
+    def get_summary(self):
+        """O(1) counters for the LCD, LEDs and entry decision."""
+        total = len(self.slots)
+        return {"total": total, "free": self.free_count, "occupied": total - self.free_count}
+
+    def get_status(self):
+        """
+        Full per-slot view for the web dashboard. The same dict (and the
+        per-slot/per-zone dicts and ticket lists in it) is updated in place
+        on every call, so it is only valid until the next one. Elapsed
+        times are integer ms.
+        """
+        status = self._status
+        if status is None:
+            status = self._status = self.get_summary()
+            status["slots"] = [{"name": s.name, "zone": s.zone, "level": s.level} for s in self.slots]
+            status["zones"] = {z: {"total": len(idx)} for z, idx in self.zone_slots.items()}
+            status["recently_occupied"] = self.recently_occupied
+            status["open_tickets"] = []
+        total = len(self.slots)
+        status["free"] = self.free_count
+        status["occupied"] = total - self.free_count
+        now = utime.ticks_ms()
+        infos = status["slots"]
+        for i in range(total):
+            s = self.slots[i]
+            info = infos[i]
+            info["occupied"] = s.occupied
+            info["id"] = s.assigned_id
+            info["elapsed_ms"] = utime.ticks_diff(now, s.time_in_ms) if s.occupied and s.time_in_ms else None
+        zones = status["zones"]
+        for z in zones:
+            zones[z]["free"] = self.zone_free[z]
+        open_tickets = status["open_tickets"]
+        k = 0
+        for id_ in self.open_tickets:
+            _put(open_tickets, k, self.open_tickets[id_])
+            k += 1
+        _trim(open_tickets, k)
+        status["recent_closed"] = self.closed_tickets
+        return status
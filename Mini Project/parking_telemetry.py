@@ -0,0 +1,190 @@
+# parking_telemetry.py - Occupancy and revenue time series for the Smart Parking System
+#
+# Counts are kept incrementally from the ParkingManager's ticket hooks
+# (a few integer adds per entry/exit, revenue in cents, nothing per tick) and closed into one
+# batch of InfluxDB line protocol every interval:
+#
+#     parking occupied=2i,free=1i,total=3i,occupancy_avg=0.583,occupied_peak=3i,
+#             entries=2i,exits=1i,revenue=6.50,revenue_total=18.00,dwell_avg_min=13.0 61234
+#     parking_zone,zone=A free=1i,total=3i 61234
+#
+# Batches are POSTed to the ingest gateway (Final Project/ingest_gateway.py)
+# with X-Device-Millis, so uptime timestamps work without NTP. poll() only
+# sends when the caller says the controller is idle (gate closed, nobody at
+# the entrance), at most once per interval, and keeps unsent intervals in a
+# small queue while the gateway is unreachable. A send is a blocking
+# urequests.post, bounded by timeout_s for the connect and again for the
+# response (urequests sets it on the socket before connecting); the host is
+# resolved once here, so no send waits on DNS.
+
+import utime
+
+INTERVAL_MS = 60000
+SEND_TIMEOUT_S = 1
+MAX_PENDING = 60        # intervals kept while the gateway is down (~15 KB)
+
+
+def _resolve(url):
+    # "http://host:port/path" -> the same URL with the host's address
+    import usocket
+    scheme, _, rest = url.partition("://")
+    hostport, slash, path = rest.partition("/")
+    host, colon, port = hostport.partition(":")
+    try:
+        addr = usocket.getaddrinfo(host, int(port or 80))[0][-1][0]
+    except (OSError, IndexError, ValueError):
+        return url                      # try again by name at send time
+    return "%s://%s%s%s%s%s" % (scheme, addr, colon, port, slash, path)
+
+
+def _tag(s):
+    return str(s).replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+
+class ParkingTelemetry:
+    def __init__(self, url=None, interval_ms=INTERVAL_MS, timeout_s=SEND_TIMEOUT_S,
+                 max_pending=MAX_PENDING, zones=True):
+        self.url = _resolve(url) if url else None   # gateway /write URL, None: keep counting only
+        self.interval_ms = interval_ms
+        self.timeout_s = timeout_s
+        self.max_pending = max_pending
+        self.zones = zones
+        self.parking = None
+        self.pending = []               # one line-protocol chunk per closed interval
+        now = utime.ticks_ms()
+        self._tick = now                # last poll(), for the uptime clock
+        self._uptime_ms = 0
+        self._interval_start = now
+        self._next_send = now
+        self._retry_ms = interval_ms
+        # current interval
+        self.occupied = 0
+        self._last_change = now
+        self._occ_ms = 0                # occupied slots x ms, for the time-weighted average
+        self._peak = 0
+        self.entries = 0
+        self.exits = 0
+        self.revenue_cents = 0
+        self._dwell_min = 0
+        # since boot
+        self.revenue_total_cents = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def attach(self, parking):
+        """Hook into the manager, keeping any callbacks it already has."""
+        self.parking = parking
+        self.occupied = self._peak = len(parking.slots) - parking.free_count
+        opened, closed = parking.on_ticket_opened, parking.on_ticket_closed
+
+        def on_opened(t):
+            self.ticket_opened(t)
+            if opened:
+                opened(t)
+
+        def on_closed(t):
+            self.ticket_closed(t)
+            if closed:
+                closed(t)
+        parking.on_ticket_opened = on_opened
+        parking.on_ticket_closed = on_closed
+        return self
+
+    # ---- event side (called from the IR path) ----
+    def _occupancy(self, at_ms, delta):
+        dt = utime.ticks_diff(at_ms, self._last_change)
+        if dt > 0:  # edge times can be a little older than the last change
+            self._occ_ms += self.occupied * dt
+            self._last_change = at_ms
+        self.occupied += delta
+        if self.occupied > self._peak:
+            self._peak = self.occupied
+
+    def ticket_opened(self, t):
+        self._occupancy(t.time_in_ms, 1)
+        self.entries += 1
+
+    def ticket_closed(self, t):
+        self._occupancy(t.time_out_ms, -1)
+        self.exits += 1
+        self.revenue_cents += t.fee_cents
+        self.revenue_total_cents += t.fee_cents
+        self._dwell_min += t.duration_min
+
+    # ---- schedule side ----
+    def poll(self, idle=True):
+        """
+        Call once per main-loop tick. Closes the interval when it is due and
+        sends queued intervals only when idle is True: the send blocks for
+        up to 2 x timeout_s, so pass False whenever gate control might need
+        the loop.
+        """
+        now = utime.ticks_ms()
+        self._uptime_ms += utime.ticks_diff(now, self._tick)
+        self._tick = now
+        if utime.ticks_diff(now, self._interval_start) >= self.interval_ms:
+            self._close(now)
+        if idle and self.pending and self.url and utime.ticks_diff(now, self._next_send) >= 0:
+            self._send(now)
+
+    def _close(self, now):
+        elapsed = utime.ticks_diff(now, self._interval_start)
+        self._occupancy(now, 0)
+        p = self.parking
+        total = len(p.slots) if p else 0
+        avg = self._occ_ms / (elapsed * total) if elapsed > 0 and total else 0.0
+        fields = "occupied={}i,free={}i,total={}i,occupancy_avg={:.3f},occupied_peak={}i," \
+                 "entries={}i,exits={}i,revenue={:.2f},revenue_total={:.2f}".format(
+                     self.occupied, total - self.occupied, total, avg, self._peak,
+                     self.entries, self.exits, self.revenue_cents / 100, self.revenue_total_cents / 100)
+        if self.exits:
+            fields += ",dwell_avg_min={:.1f}".format(self._dwell_min / self.exits)
+        lines = ["parking {} {}".format(fields, self._uptime_ms)]
+        if self.zones and p:
+            for zone, idx in p.zone_slots.items():
+                lines.append("parking_zone,zone={} free={}i,total={}i {}".format(
+                    _tag(zone), p.zone_free[zone], len(idx), self._uptime_ms))
+        self.pending.append("\n".join(lines))
+        if len(self.pending) > self.max_pending:
+            self.pending.pop(0)
+            self.dropped += 1
+        # start the next interval
+        self._interval_start = now
+        self._occ_ms = 0
+        self._peak = self.occupied
+        self.entries = self.exits = 0
+        self.revenue_cents = 0
+        self._dwell_min = 0
+
+    def _send(self, now):
+        import urequests
+        n = len(self.pending)
+        status = None
+        try:
+            r = urequests.post(self.url, data="\n".join(self.pending),
+                               headers={"X-Device-Millis": str(self._uptime_ms)},
+                               timeout=self.timeout_s)
+            status = r.status_code
+            r.close()
+        except Exception as e:
+            print("Telemetry send failed:", e)
+        if status is not None and status < 500 and status != 429:
+            # 2xx taken; other 4xx will never be taken, don't retry them
+            if status >= 300:
+                print("Telemetry rejected:", status)
+                self.dropped += n
+            else:
+                self.sent += n
+            del self.pending[:n]
+            self._retry_ms = self.interval_ms
+            self._next_send = now
+            return
+        self.failed += 1
+        self._next_send = utime.ticks_add(now, self._retry_ms)
+        self._retry_ms = min(self._retry_ms * 2, 4 * self.interval_ms)
+
+    def stats(self):
+        return {"sent": self.sent, "failed": self.failed, "dropped": self.dropped,
+                "pending": len(self.pending), "entries": self.entries, "exits": self.exits,
+                "occupied": self.occupied, "revenue_total": self.revenue_total_cents / 100}
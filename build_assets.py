@@ -0,0 +1,129 @@
+# build_assets.py - Minify and gzip the dashboards' web assets for flash
+#
+# Runs on a laptop (CPython). For every lab with a www/ folder it writes
+# <lab>/static/<name>.gz plus static/manifest.json (content type, ETag and
+# sizes), which the device serves as is with Content-Encoding: gzip:
+#     python build_assets.py            # rebuild
+#     python build_assets.py --check    # exit 1 if static/ is out of date
+#
+# Copy the static/ folder next to the lab's main script on the ESP32.
+# Output is deterministic (no timestamps in the gzip header), so rebuilding
+# unchanged sources gives byte-identical files and the same ETags.
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LABS = ("LAB2", "Mini Project")
+
+TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css",
+    ".js": "application/javascript",
+    ".json": "application/json",
+    ".svg": "image/svg+xml",
+}
+
+
+# --- minifiers (conservative: whitespace and comments only) ---
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_js(js):
+    # keep line breaks so automatic semicolon insertion still works
+    out = []
+    for line in js.splitlines():
+        line = line.strip()
+        if line and not line.startswith("//"):
+            out.append(line)
+    return "\n".join(out)
+
+
+def minify_html(html):
+    html = re.sub(r"<!--.*?-->", "", html, flags=re.S)
+    html = re.sub(r"(<style[^>]*>)(.*?)(</style>)",
+                  lambda m: m.group(1) + minify_css(m.group(2)) + m.group(3), html, flags=re.S | re.I)
+    html = re.sub(r"(<script[^>]*>)(.*?)(</script>)",
+                  lambda m: m.group(1) + minify_js(m.group(2)) + m.group(3), html, flags=re.S | re.I)
+    # outside <script>, any whitespace run renders as one space
+    parts = re.split(r"(<script[^>]*>.*?</script>)", html, flags=re.S | re.I)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", parts[i])
+    return "".join(parts).strip()
+
+
+MINIFY = {".html": minify_html, ".css": minify_css, ".js": minify_js}
+
+
+def build_lab(lab):
+    """({file name: bytes}, manifest) for everything in <lab>/static."""
+    src_dir = os.path.join(ROOT, lab, "www")
+    out = {}
+    manifest = {}
+    for name in sorted(os.listdir(src_dir)):
+        ext = os.path.splitext(name)[1]
+        with open(os.path.join(src_dir, name), "rb") as f:
+            raw = f.read()
+        if ext in MINIFY:
+            body = MINIFY[ext](raw.decode("utf-8")).encode("utf-8")
+        else:
+            body = raw
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        out[name + ".gz"] = gz
+        manifest[name] = {
+            "file": name + ".gz",
+            "type": TYPES.get(ext, "application/octet-stream"),
+            "etag": '"%s"' % hashlib.sha1(gz).hexdigest()[:12],
+            "size": len(raw),
+            "min": len(body),
+            "gz": len(gz),
+        }
+    out["manifest.json"] = (json.dumps(manifest, indent=1, sort_keys=True) + "\n").encode()
+    return out, manifest
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--check", action="store_true", help="verify static/ matches www/ without writing")
+    args = ap.parse_args()
+    stale = []
+    for lab in LABS:
+        if not os.path.isdir(os.path.join(ROOT, lab, "www")):
+            continue
+        files, manifest = build_lab(lab)
+        static = os.path.join(ROOT, lab, "static")
+        for name, data in files.items():
+            path = os.path.join(static, name)
+            try:
+                with open(path, "rb") as f:
+                    same = f.read() == data
+            except OSError:
+                same = False
+            if same:
+                continue
+            if args.check:
+                stale.append(os.path.relpath(path, ROOT))
+                continue
+            os.makedirs(static, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        for name, m in manifest.items():
+            print("[ASSET] %s/%s: %d -> %d minified -> %d gzip bytes"
+                  % (lab, name, m["size"], m["min"], m["gz"]))
+    if stale:
+        print("[ASSET] out of date, run python build_assets.py:", ", ".join(stale))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# bmp280.py - Bosch BMP280 temperature/pressure driver (MicroPython)
+#
+# Shared by LAB3 and Lab4. Oversampling, IIR filter and standby time come
+# from a named profile (datasheet section 3.8) instead of hardcoded
+# ctrl_meas/config bytes, so each deployment picks its own trade-off
+# between update rate, noise and current draw:
+#
+#     profile         mode    osrs_t/p  IIR   t_sb      rate       noise
+#     low_power       forced  x1 / x1   off   -         on demand  1.3 Pa
+#     high_rate       normal  x1 / x4   4     0.5 ms    ~72 Hz     0.3 Pa
+#     high_accuracy   normal  x2 / x16  16    0.5 ms    ~23 Hz     0.2 Pa
+#
+# Usage:
+#     bmp = BMP280(i2c)                            # low_power: sleeps between samples
+#     t, p, alt = bmp.measure()                    # C, Pa, m - one conversion, one burst
+#
+#     bmp = BMP280(i2c, profile="high_accuracy")   # free-running
+#     t, p, alt = bmp.read()                       # latest conversion
+#     bmp.configure("low_power", iir=4)            # switch, overriding one setting
+#
+# All six data bytes are fetched in one burst, which the sensor shadows
+# against the next conversion landing mid-read. After a forced conversion
+# the "measuring" bit of the status register is polled first, so a reading
+# never returns registers the conversion has not finished writing.
+#
+# comp_temp()/comp_press() are the Bosch 32/64-bit integer compensation on
+# a 12-value calibration tuple; they are plain functions so host-side code
+# can reuse them on raw samples.
+
+import utime
+import struct
+
+REG_CALIB = 0x88
+REG_ID = 0xD0
+REG_RESET = 0xE0
+REG_STATUS = 0xF3
+REG_CTRL_MEAS = 0xF4
+REG_CONFIG = 0xF5
+REG_DATA = 0xF7
+
+CHIP_ID = 0x58
+STATUS_MEASURING = 0x08
+STATUS_IM_UPDATE = 0x01
+
+MODE_SLEEP = 0
+MODE_FORCED = 1
+MODE_NORMAL = 3
+
+# setting value -> register code
+OSRS = {0: 0, 1: 1, 2: 2, 4: 3, 8: 4, 16: 5}
+IIR = {0: 0, 1: 0, 2: 1, 4: 2, 8: 3, 16: 4}
+STANDBY_MS = (0.5, 62.5, 125, 250, 500, 1000, 2000, 4000)
+
+# name -> (mode, osrs_t, osrs_p, iir, standby_ms)
+PROFILES = {
+    "low_power": (MODE_FORCED, 1, 1, 0, 1000),
+    "high_rate": (MODE_NORMAL, 1, 4, 4, 0.5),
+    "high_accuracy": (MODE_NORMAL, 2, 16, 16, 0.5),
+}
+
+SEA_LEVEL_PA = 101325
+
+
+def comp_temp(cal, adc_t):
+    """Raw temperature -> (temperature in 0.01 C, t_fine)."""
+    T1, T2, T3 = cal[0], cal[1], cal[2]
+    var1 = (((adc_t >> 3) - (T1 << 1)) * T2) >> 11
+    d = (adc_t >> 4) - T1
+    var2 = (((d * d) >> 12) * T3) >> 14
+    t_fine = var1 + var2
+    return (t_fine * 5 + 128) >> 8, t_fine
+
+
+def comp_press(cal, adc_p, t_fine):
+    """Raw pressure -> pressure in Pa as Q24.8 (divide by 256); 0 if the
+    calibration is unusable."""
+    var1 = t_fine - 128000
+    var2 = var1 * var1 * cal[8]
+    var2 = var2 + ((var1 * cal[7]) << 17)
+    var2 = var2 + (cal[6] << 35)
+    var1 = ((var1 * var1 * cal[5]) >> 8) + ((var1 * cal[4]) << 12)
+    var1 = (((1 << 47) + var1) * cal[3]) >> 33
+    if var1 == 0:
+        return 0
+    p = 1048576 - adc_p
+    p = (((p << 31) - var2) * 3125) // var1
+    var1 = (cal[11] * (p >> 13) * (p >> 13)) >> 25
+    var2 = (cal[10] * p) >> 19
+    return ((p + var1 + var2) >> 8) + (cal[9] << 4)
+
+
+def pressure_altitude(p, sea_level=SEA_LEVEL_PA):
+    """Barometric altitude in m for a pressure in Pa."""
+    return 44330 * (1 - (p / sea_level) ** (1 / 5.255))
+
+
+def t_meas_us(osrs_t, osrs_p):
+    """Maximum conversion time (datasheet 9.1)."""
+    return int(1250 + 2300 * osrs_t + (2300 * osrs_p + 575 if osrs_p else 0))
+
+
+class BMP280:
+    def __init__(self, i2c, addr=0x76, profile="low_power", **settings):
+        self.i2c = i2c
+        self.addr = addr
+        self._raw = bytearray(6)
+        self._b1 = bytearray(1)
+        chip_id = i2c.readfrom_mem(addr, REG_ID, 1)[0]
+        if chip_id != CHIP_ID:
+            raise RuntimeError("Not a BMP280, ID=%#x" % chip_id)
+        self.cal = struct.unpack("<HhhHhhhhhhhh", i2c.readfrom_mem(addr, REG_CALIB, 24))
+        self.t_fine = 0
+        self.configure(profile, **settings)
+
+    # ---- configuration ----
+    def configure(self, profile="low_power", mode=None, osrs_t=None, osrs_p=None, iir=None, standby_ms=None):
+        """Apply a profile from PROFILES, with any setting overridden."""
+        p_mode, p_t, p_p, p_iir, p_sb = PROFILES[profile]
+        self.profile = profile
+        self.mode = p_mode if mode is None else mode
+        self.osrs_t = p_t if osrs_t is None else osrs_t
+        self.osrs_p = p_p if osrs_p is None else osrs_p
+        self.iir = p_iir if iir is None else iir
+        self.standby_ms = p_sb if standby_ms is None else standby_ms
+        if self.osrs_t not in OSRS or self.osrs_p not in OSRS:
+            raise ValueError("oversampling must be one of 0, 1, 2, 4, 8, 16")
+        if self.iir not in IIR:
+            raise ValueError("iir must be one of 0, 2, 4, 8, 16")
+        if self.standby_ms not in STANDBY_MS:
+            raise ValueError("standby_ms must be one of %s" % (STANDBY_MS,))
+        self.t_meas_us = t_meas_us(self.osrs_t, self.osrs_p)
+        self._ctrl = (OSRS[self.osrs_t] << 5) | (OSRS[self.osrs_p] << 2)
+        # config is only written reliably in sleep mode (datasheet 5.4.6)
+        self._write(REG_CTRL_MEAS, self._ctrl | MODE_SLEEP)
+        self._write(REG_CONFIG, (STANDBY_MS.index(self.standby_ms) << 5) | (IIR[self.iir] << 2))
+        if self.mode == MODE_NORMAL:
+            self._write(REG_CTRL_MEAS, self._ctrl | MODE_NORMAL)
+
+    def rate_hz(self):
+        """Output data rate in normal mode (0 for forced: on demand)."""
+        if self.mode != MODE_NORMAL:
+            return 0
+        return 1000000 / (self.t_meas_us + self.standby_ms * 1000)
+
+    def _write(self, reg, value):
+        self._b1[0] = value
+        self.i2c.writeto_mem(self.addr, reg, self._b1)
+
+    # ---- sampling ----
+    def measuring(self):
+        self.i2c.readfrom_mem_into(self.addr, REG_STATUS, self._b1)
+        return bool(self._b1[0] & STATUS_MEASURING)
+
+    def _wait_ready(self):
+        t0 = utime.ticks_us()
+        while self.measuring():
+            if utime.ticks_diff(utime.ticks_us(), t0) > 2 * self.t_meas_us + 10000:
+                raise OSError("BMP280 conversion timeout")
+            utime.sleep_ms(1)
+
+    def start(self):
+        """Start one forced conversion; returns the us until it is ready."""
+        self._write(REG_CTRL_MEAS, self._ctrl | MODE_FORCED)
+        return self.t_meas_us
+
+    def read_raw(self):
+        """(adc_t, adc_p) of the last finished conversion, in one burst."""
+        if self.mode != MODE_NORMAL:
+            # in normal mode the sensor is measuring most of the time; the
+            # burst read's shadowing already keeps the sample coherent
+            self._wait_ready()
+        d = self._raw
+        self.i2c.readfrom_mem_into(self.addr, REG_DATA, d)
+        return ((d[3] << 12) | (d[4] << 4) | (d[5] >> 4),
+                (d[0] << 12) | (d[1] << 4) | (d[2] >> 4))
+
+    def read(self):
+        """(temperature C, pressure Pa, altitude m) of the last conversion,
+        all from the same sample."""
+        adc_t, adc_p = self.read_raw()
+        t, self.t_fine = comp_temp(self.cal, adc_t)
+        p = comp_press(self.cal, adc_p, self.t_fine) / 256
+        return t / 100, p, pressure_altitude(p)
+
+    def measure(self):
+        """read(), after running a fresh conversion in forced mode; the
+        sensor goes back to sleep on its own."""
+        if self.mode != MODE_NORMAL:
+            utime.sleep_us(self.start())
+        return self.read()
+
+    def measure_raw(self):
+        """read_raw() of a fresh conversion, for compensating elsewhere
+        (e.g. on the host with the calibration in self.cal)."""
+        if self.mode != MODE_NORMAL:
+            utime.sleep_us(self.start())
+        return self.read_raw()
+
+    # The properties of the old normal-mode class: each one is a fresh
+    # reading in every profile (one forced conversion in low_power), never
+    # the previous conversion or the power-on reset value
+    @property
+    def temperature(self):
+        return self.measure()[0]
+
+    @property
+    def pressure(self):
+        return self.measure()[1]
+
+    @property
+    def altitude(self):
+        return self.measure()[2]
@@ -0,0 +1,86 @@
+# deadband.py - Report-by-exception policy for periodic telemetry (MicroPython)
+#
+# Shared by LAB3 and Lab4. Sensors are still sampled on their timer, but a
+# field is only reported when it has moved by more than its deadband since
+# it was last reported, or is changing faster than its rate limit. A field
+# that has not been sent for heartbeat_ms is sent anyway, so the dashboard
+# can tell a quiet sensor from a dead one - even while other fields of the
+# same sample keep changing.
+#
+# Usage:
+#     policy = ReportPolicy({"temperature": 0.2, "pressure": 0.2},
+#                           heartbeat_ms=300000, rates={"pressure": 0.02})
+#     changed = policy.filter({"temperature": t, "pressure": p})
+#     if changed:                  # None: nothing worth sending
+#         publish(changed)         # only the fields that changed
+#     print(policy.stats())        # samples, reports, fields sent/suppressed
+#
+# Fields without a deadband are sent whenever their value differs at all.
+# Rates are in units per second, measured between consecutive samples.
+
+import utime
+
+
+class ReportPolicy:
+    def __init__(self, deadbands, heartbeat_ms=300000, rates=None):
+        self.deadbands = deadbands
+        self.rates = rates or {}
+        self.heartbeat_ms = heartbeat_ms
+        self.reported = {}           # field -> last reported value
+        self._prev = {}              # field -> value at the previous sample
+        self._prev_ms = None
+        self._sent_ms = {}           # field -> when it was last reported
+        self.samples = 0
+        self.reports = 0
+        self.heartbeats = 0
+        self.fields_seen = 0
+        self.fields_sent = 0
+
+    def filter(self, values, now_ms=None):
+        """The subset of values to report now, or None."""
+        now = utime.ticks_ms() if now_ms is None else now_ms
+        self.samples += 1
+        self.fields_seen += len(values)
+        dt_s = utime.ticks_diff(now, self._prev_ms) / 1000 if self._prev_ms is not None else 0
+        out = {}
+        heartbeat = False
+        for k, v in values.items():
+            sent = self._sent_ms.get(k)
+            if sent is None:
+                out[k] = v
+                continue
+            if utime.ticks_diff(now, sent) >= self.heartbeat_ms:
+                out[k] = v
+                heartbeat = True
+                continue
+            last = self.reported.get(k)
+            if last is None or abs(v - last) > self.deadbands.get(k, 0):
+                out[k] = v
+                continue
+            rate = self.rates.get(k)
+            prev = self._prev.get(k)
+            if rate is not None and prev is not None and dt_s > 0 and abs(v - prev) / dt_s > rate:
+                out[k] = v
+        self._prev.update(values)
+        self._prev_ms = now
+        if not out:
+            return None
+        self.reported.update(out)
+        for k in out:
+            self._sent_ms[k] = now
+        if heartbeat:
+            self.heartbeats += 1
+        self.reports += 1
+        self.fields_sent += len(out)
+        return out
+
+    def stats(self):
+        seen = self.fields_seen or 1
+        return {
+            "samples": self.samples,
+            "reports": self.reports,
+            "heartbeats": self.heartbeats,
+            "fields_sent": self.fields_sent,
+            "fields_suppressed": self.fields_seen - self.fields_sent,
+            "saved_pct": round(100 * (self.fields_seen - self.fields_sent) / seen, 1),
+        }
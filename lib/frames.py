@@ -0,0 +1,103 @@
+# frames.py - Compact binary telemetry frames for MQTT (MicroPython)
+#
+# Packs a batch of samples from SampleBuffer into one little-endian struct
+# frame instead of a JSON array. A one-sample BMP280 frame is 21 bytes
+# (the JSON row is ~80), and encoding reuses one preallocated buffer, so
+# publishing does not allocate strings on the heap every cycle.
+#
+# Layout (version 2):
+#     header   <BBHI    version, kind, sample count, base time (Unix s)
+#     [cal]    <HhhHhhhhhhhh   BMP280 calibration, raw frames only
+#     records, one per sample:
+#       KIND_SCALED  <HBhIi   dt s, field mask, temperature 0.01 C,
+#                             pressure Pa, altitude 0.1 m
+#       KIND_RAW     <HII     dt s, adc_t, adc_p
+#
+# Version 1 stored altitude as <h, which only reaches +-3276.7 m: the
+# BMP280's 300 hPa is ~9 km, and encode() raised struct.error on such a
+# reading, so the same batch was retried forever. The decoder reads both.
+#
+# The mask has bit i set when FIELDS[i] is present (report-by-exception
+# rows may carry only some fields); absent fields are written as 0.
+# Lab4/frame_decoder.py turns frames back into JSON rows / line protocol.
+#
+# Usage:
+#     enc = FrameEncoder(max_samples=20)
+#     frame, n = enc.encode(buf.peek(20))          # scaled values
+#     frame, n = enc.encode(raw_batch, cal=bmp.cal) # {"adc_t", "adc_p"} rows
+#     client.publish(TOPIC + b"/bin", frame)
+#     buf.pop(n)                                   # n <= batch length
+
+import struct
+
+VERSION = 2
+KIND_SCALED = 1
+KIND_RAW = 2
+
+HEADER = "<BBHI"
+CAL = "<HhhHhhhhhhhh"
+SCALED = "<HBhIi"
+SCALED_V1 = "<HBhIh"         # version 1 records, for decoders
+RAW = "<HII"
+HEADER_SIZE = struct.calcsize(HEADER)
+CAL_SIZE = struct.calcsize(CAL)
+SCALED_SIZE = struct.calcsize(SCALED)
+RAW_SIZE = struct.calcsize(RAW)
+
+# (field, scale): stored as round(value * scale); pressure arrives in hPa
+FIELDS = (("temperature", 100), ("pressure", 100), ("altitude", 10))
+
+MAX_DT_S = 0xFFFF
+
+
+class FrameEncoder:
+    def __init__(self, max_samples=20):
+        self.max_samples = max_samples
+        self._buf = bytearray(HEADER_SIZE + CAL_SIZE + max_samples * max(SCALED_SIZE, RAW_SIZE))
+        self._mv = memoryview(self._buf)
+        self.frames = 0
+        self.bytes = 0
+
+    def encode(self, samples, cal=None):
+        """(frame, n): a memoryview over the internal buffer (valid until
+        the next call) holding the first n samples of [(ts_ms, values)].
+        n is short of len(samples) only if they span more than MAX_DT_S or
+        a sample is older than the first (a clock step back): dt is
+        unsigned, so such a sample starts the next frame instead."""
+        buf = self._buf
+        base = samples[0][0] // 1000
+        off = HEADER_SIZE
+        if cal is not None:
+            struct.pack_into(CAL, buf, off, *cal)
+            off += CAL_SIZE
+        n = 0
+        for ts, v in samples:
+            if n == self.max_samples:
+                break
+            dt = ts // 1000 - base
+            if dt < 0 or dt > MAX_DT_S:
+                break
+            if cal is not None:
+                struct.pack_into(RAW, buf, off, dt, v["adc_t"], v["adc_p"])
+                off += RAW_SIZE
+            else:
+                mask = 0
+                t = v.get("temperature")
+                p = v.get("pressure")
+                a = v.get("altitude")
+                if t is not None:
+                    mask |= 1
+                if p is not None:
+                    mask |= 2
+                if a is not None:
+                    mask |= 4
+                struct.pack_into(SCALED, buf, off, dt, mask,
+                                 round(t * 100) if t is not None else 0,
+                                 round(p * 100) if p is not None else 0,
+                                 round(a * 10) if a is not None else 0)
+                off += SCALED_SIZE
+            n += 1
+        struct.pack_into(HEADER, buf, 0, VERSION, KIND_RAW if cal is not None else KIND_SCALED, n, base)
+        self.frames += 1
+        self.bytes += off
+        return self._mv[:off], n
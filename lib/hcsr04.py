@@ -0,0 +1,184 @@
+# hcsr04.py - Non-blocking HC-SR04 ultrasonic driver (MicroPython)
+#
+# Shared by LAB2 and the Mini Project. The echo pulse is timed with a pin
+# IRQ and ticks_us instead of busy-waiting in time_pulse_us, so a reading
+# never stalls the caller. The last few samples are kept in a small window;
+# read() returns the mean of the samples within an outlier band around the
+# window's median, plus a confidence value (0..1), so one-off spikes are
+# ignored.
+# Samples are kept as echo widths in integer microseconds, so update() and
+# detected() run without allocating (floats are heap objects on the ESP32).
+#
+# Usage:
+#     sonar = HCSR04(Pin(27, Pin.OUT), Pin(26, Pin.IN))
+#     while True:
+#         sonar.update()            # call often; fires a ping every period_ms
+#         cm, conf = sonar.read()   # cm is None until enough echoes arrive
+#
+# A loop that only needs "is something within N cm?" can set the test once
+# and call the allocation-free check every tick:
+#     sonar.set_detect(10, 0.6)
+#     if sonar.detected(): ...
+#
+# Scripts that block elsewhere (e.g. in socket.accept) can call
+# sonar.start() instead, which runs update() from a hardware timer.
+
+import utime
+from array import array
+
+US_PER_CM = 58.3          # round trip at ~343 m/s
+NO_ECHO = -1
+
+
+class HCSR04:
+    def __init__(self, trig, echo, window=5, period_ms=60, timeout_us=30000,
+                 outlier_cm=5.0, outlier_ratio=0.15, hard_irq=True):
+        self.trig = trig
+        self.echo = echo
+        self.period_us = period_ms * 1000
+        self.timeout_us = timeout_us
+        self.outlier_cm = outlier_cm
+        self.outlier_ratio = outlier_ratio
+        self._outlier_us = int(outlier_cm * US_PER_CM)
+        self._ratio_pm = int(outlier_ratio * 1000)
+        self.samples = array("l", [NO_ECHO] * window)   # echo widths in us
+        self._sorted = array("l", [0] * window)        # scratch for the median
+        self._detect_us = 0
+        self._detect_inliers = window + 1              # never, until set_detect()
+        # results of the last _filter()
+        self._inliers = 0
+        self._total_us = 0
+        self.count = 0            # samples recorded so far (saturates at window)
+        self.index = 0
+        self.misses = 0
+        # Set up front so the hard IRQ never grows the instance dict
+        self._busy = False
+        self._t_trig = utime.ticks_add(utime.ticks_us(), -self.period_us)
+        self._rise = -1
+        self._width = -1
+        self._timer = None
+        self.trig.value(0)
+        self.echo.irq(trigger=echo.IRQ_RISING | echo.IRQ_FALLING,
+                      handler=self._echo_irq, hard=hard_irq)
+
+    def _echo_irq(self, pin):
+        t = utime.ticks_us()
+        if pin.value():
+            self._rise = t
+        elif self._rise >= 0:
+            self._width = utime.ticks_diff(t, self._rise)
+            self._rise = -1
+
+    def trigger(self):
+        """Send one 10 us ping; the echo is collected by update()."""
+        self._rise = -1
+        self._width = -1
+        self.trig.value(1)
+        utime.sleep_us(10)
+        self.trig.value(0)
+        self._t_trig = utime.ticks_us()
+        self._busy = True
+
+    def update(self):
+        """Collect a finished echo and start the next ping when due. Never blocks."""
+        now = utime.ticks_us()
+        elapsed = utime.ticks_diff(now, self._t_trig)
+        if self._busy:
+            if self._width >= 0:
+                self._record(self._width)
+                self._busy = False
+            elif elapsed > self.timeout_us:
+                self._record(NO_ECHO)
+                self.misses += 1
+                self._busy = False
+        if not self._busy and elapsed >= self.period_us:
+            self.trigger()
+
+    def start(self, timer_id=0):
+        """Drive update() from a periodic machine.Timer."""
+        from machine import Timer
+        self._timer = Timer(timer_id)
+        # Poll at a quarter of the ping period so echoes are collected promptly
+        self._timer.init(period=max(self.period_us // 4000, 5), mode=Timer.PERIODIC,
+                         callback=lambda t: self.update())
+
+    def stop(self):
+        if self._timer:
+            self._timer.deinit()
+            self._timer = None
+
+    def _record(self, width_us):
+        self.samples[self.index] = width_us
+        self.index = (self.index + 1) % len(self.samples)
+        if self.count < len(self.samples):
+            self.count += 1
+
+    def read(self):
+        """
+        Returns (distance_cm, confidence).
+        distance_cm is the mean of the inliers - the valid samples within
+        the outlier band around their median - or None when fewer than half
+        the window produced an echo. confidence is the inliers' share of the
+        window.
+        """
+        if not self._filter():
+            return None, 0.0
+        return self._total_us / self._inliers / US_PER_CM, self._inliers / len(self.samples)
+
+    def set_detect(self, max_cm, min_confidence):
+        """Configure detected(): read() within max_cm at min_confidence or more."""
+        self._detect_us = int(max_cm * US_PER_CM)
+        # smallest inlier count whose share of the window reaches min_confidence
+        need = len(self.samples) * min_confidence - 1e-9
+        k = 0
+        while k < need:
+            k += 1
+        self._detect_inliers = k
+
+    def detected(self):
+        """The set_detect() test on the current window, without allocating."""
+        if not self._filter() or self._inliers < self._detect_inliers:
+            return False
+        return self._total_us <= self._detect_us * self._inliers
+
+    def _filter(self):
+        # Insertion-sorts the valid widths into the scratch array, then
+        # keeps the ones within the outlier band around their median.
+        # Integer-only; False when fewer than half the window echoed.
+        count = self.count
+        if not count:
+            return False
+        samples = self.samples
+        srt = self._sorted
+        n = 0
+        for i in range(count):
+            v = samples[i]
+            if v < 0:
+                continue
+            j = n
+            while j and srt[j - 1] > v:
+                srt[j] = srt[j - 1]
+                j -= 1
+            srt[j] = v
+            n += 1
+        if n * 2 < count:
+            return False
+        h = n // 2
+        median = srt[h] if n % 2 else (srt[h - 1] + srt[h]) // 2
+        band = median * self._ratio_pm // 1000
+        if band < self._outlier_us:     # not max(): no builtin call per ping
+            band = self._outlier_us
+        inliers = 0
+        total = 0
+        for i in range(n):
+            v = srt[i]
+            if -band <= v - median <= band:
+                inliers += 1
+                total += v
+        self._inliers = inliers
+        self._total_us = total
+        return True
+
+    def distance_cm(self):
+        """Filtered distance only (None if no reliable echo)."""
+        return self.read()[0]
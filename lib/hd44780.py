@@ -0,0 +1,406 @@
+# hd44780.py - HD44780 character LCD over a PCF8574 I2C backpack (MicroPython)
+#
+# One driver for every lab (replaces LAB2/lcd_api.py + i2c_lcd.py,
+# LAB2/machine_i2c_lcd.py and the inline LcdApi/I2cLcd of the parking
+# project):
+#
+#   - Batched writes: bytes are queued in a preallocated buffer and sent as
+#     one I2C transaction per putstr()/frame. The PCF8574 latches every byte,
+#     so the E high/low strobe is just two consecutive bytes.
+#   - Minimal timing: no sleeps after commands or characters. An ordinary
+#     instruction takes 37 us (41 us with the oscillator at its slowest).
+#     Each nibble is two bytes on the bus (E high, E low), so within one
+#     batched transaction falling edges of E are two bytes apart: 45 us at
+#     400 kHz (9 clocks of 2.5 us per byte), a margin of only 4-8 us, and
+#     180 us at the PCF8574's rated 100 kHz. Do not clock the bus faster
+#     than 400 kHz: at 1 MHz the gap is 18 us and every character after the
+#     first is written while the controller is still busy.
+#     clear()/home() take 1.52 ms: the driver records when they
+#     finish and only the next write waits, if it comes sooner. With
+#     busy_flag=True it polls BF instead of waiting the full time.
+#   - CGRAM caching: custom_char() skips glyphs already loaded and glyph()
+#     maps bitmaps onto the 8 slots, least recently used first.
+#   - LcdFramebuffer: draws into a shadow buffer and flush() sends only the
+#     changed cells, the whole frame in one transaction.
+#
+# Usage:
+#     lcd = I2cLcd(i2c, 0x27, 2, 16)
+#     lcd.putstr("Hello")
+#     fb = LcdFramebuffer(lcd)
+#     fb.write(1, "Temp: %.1f C" % t)
+#     fb.flush()
+
+import utime
+
+# Commands
+LCD_CLR         = 0x01
+LCD_HOME        = 0x02
+LCD_ENTRY_MODE  = 0x04
+LCD_ENTRY_INC   = 0x02
+LCD_ENTRY_SHIFT = 0x01
+LCD_ON_CTRL     = 0x08
+LCD_ON_DISPLAY  = 0x04
+LCD_ON_CURSOR   = 0x02
+LCD_ON_BLINK    = 0x01
+LCD_MOVE        = 0x10
+LCD_MOVE_DISP   = 0x08
+LCD_MOVE_RIGHT  = 0x04
+LCD_FUNCTION    = 0x20
+LCD_FUNCTION_8BIT = 0x10
+LCD_FUNCTION_2L = 0x08
+LCD_FUNCTION_5x10_DOTS = 0x04
+LCD_SET_CGRAM   = 0x40
+LCD_SET_DDRAM   = 0x80
+
+ROW_OFFSETS = (0x00, 0x40, 0x14, 0x54)
+
+# clear display / return home: 1.52 ms at fosc = 270 kHz, with margin
+EXEC_SLOW_US = 1600
+
+# PCF8574 bit masks (common backpack wiring: P0=RS P1=RW P2=E P3=BL P4..P7=D4..D7)
+MASK_RS = 0x01
+MASK_RW = 0x02
+MASK_E  = 0x04
+MASK_BL = 0x08
+
+
+class LcdApi:
+    """Display logic shared by HD44780 drivers; subclasses provide the hal_* hooks."""
+
+    def __init__(self, num_lines, num_columns):
+        self.num_lines = num_lines
+        self.num_columns = num_columns
+        self.cursor_x = 0
+        self.cursor_y = 0
+        self.display_ctrl = LCD_ON_CTRL | LCD_ON_DISPLAY
+        self._cgram = [None] * 8   # bitmap loaded in each CGRAM slot
+        self._glyph_lru = list(range(8))
+
+    # ---- batching (no-ops unless the driver queues writes) ----
+    def begin(self):
+        pass
+
+    def end(self):
+        pass
+
+    # ---- display control ----
+    def clear(self):
+        self.hal_write_command(LCD_CLR)
+        self.cursor_x = 0
+        self.cursor_y = 0
+
+    def home(self):
+        self.hal_write_command(LCD_HOME)
+        self.cursor_x = 0
+        self.cursor_y = 0
+
+    def _ctrl(self, flag, on):
+        self.display_ctrl = (self.display_ctrl | flag) if on else (self.display_ctrl & ~flag)
+        self.hal_write_command(self.display_ctrl)
+
+    def show_cursor(self, show=True):
+        self._ctrl(LCD_ON_CURSOR, show)
+
+    def hide_cursor(self):
+        self._ctrl(LCD_ON_CURSOR, False)
+
+    def blink_cursor(self, blink=True):
+        self._ctrl(LCD_ON_BLINK, blink)
+
+    def display_on(self, on=True):
+        self._ctrl(LCD_ON_DISPLAY, on)
+
+    def hide(self):
+        self.display_on(False)
+
+    def backlight_on(self, on=True):
+        self.hal_backlight(on)
+
+    def backlight_off(self):
+        self.hal_backlight(False)
+
+    # ---- text ----
+    def move_to(self, col, row):
+        self.cursor_x = col
+        self.cursor_y = row
+        self.hal_write_command(LCD_SET_DDRAM | ((ROW_OFFSETS[row] + col) & 0x7F))
+
+    def putchar(self, char):
+        if char == '\n':
+            self.cursor_y = (self.cursor_y + 1) % self.num_lines
+            self.move_to(0, self.cursor_y)
+            return
+        if self.cursor_x >= self.num_columns:
+            # wrap lazily, so filling a row exactly costs no extra command
+            self.move_to(0, (self.cursor_y + 1) % self.num_lines)
+        self.hal_write_data(ord(char) & 0xFF)
+        self.cursor_x += 1
+
+    def putstr(self, string):
+        self.begin()
+        try:
+            for c in string:
+                self.putchar(c)
+        finally:
+            self.end()
+
+    # ---- custom characters ----
+    def custom_char(self, location, charmap):
+        """Load an 8-row bitmap into CGRAM slot 0..7 (skipped if already there)."""
+        location &= 0x7
+        charmap = bytes(charmap)
+        if self._cgram[location] == charmap:
+            return chr(location)
+        self.begin()
+        try:
+            self.hal_write_command(LCD_SET_CGRAM | (location << 3))
+            for row in charmap:
+                self.hal_write_data(row)
+            self.move_to(self.cursor_x, self.cursor_y)
+        finally:
+            self.end()
+        self._cgram[location] = charmap
+        return chr(location)
+
+    def glyph(self, charmap):
+        """Character for a bitmap, loading it into the least recently used slot."""
+        charmap = bytes(charmap)
+        lru = self._glyph_lru
+        for slot in lru:
+            if self._cgram[slot] == charmap:
+                break
+        else:
+            slot = lru[0]
+            self.custom_char(slot, charmap)
+        lru.remove(slot)
+        lru.append(slot)
+        return chr(slot)
+
+    # ---- must be implemented by the driver ----
+    def hal_write_command(self, cmd):  # pragma: no cover
+        raise NotImplementedError
+
+    def hal_write_data(self, data):    # pragma: no cover
+        raise NotImplementedError
+
+    def hal_backlight(self, on):       # pragma: no cover
+        pass
+
+
+class I2cLcd(LcdApi):
+    """HD44780 in 4-bit mode behind a PCF8574 I2C expander."""
+
+    def __init__(self, i2c, i2c_addr, num_lines, num_columns,
+                 backlight=True, batched=True, busy_flag=False, buf_size=128):
+        self.i2c = i2c
+        self.i2c_addr = i2c_addr
+        self.backlight = MASK_BL if backlight else 0
+        self.batched = batched
+        self.busy_flag = busy_flag
+        self._buf = bytearray(buf_size)
+        self._mv = memoryview(self._buf)
+        self._n = 0
+        self._depth = 0
+        self._ready_at = utime.ticks_us()
+        self._one = bytearray(1)
+        self._rd = bytearray(3)
+        self._rd_mv = memoryview(self._rd)
+        super().__init__(num_lines, num_columns)
+        self._init_lcd()
+
+    def _init_lcd(self):
+        # Datasheet "initialising by instruction": three 8-bit function sets,
+        # then switch to 4-bit. These waits are mandatory.
+        utime.sleep_ms(40)
+        for wait_us in (4100, 100, 100):
+            self._send_init_nibble(0x30)
+            utime.sleep_us(wait_us)
+        self._send_init_nibble(0x20)
+        utime.sleep_us(100)
+        func = LCD_FUNCTION | (LCD_FUNCTION_2L if self.num_lines > 1 else 0)
+        self.begin()
+        self.hal_write_command(func)
+        self.hal_write_command(self.display_ctrl)
+        self.hal_write_command(LCD_ENTRY_MODE | LCD_ENTRY_INC)
+        self.end()
+        self.clear()
+
+    def _send_init_nibble(self, nibble):
+        b = nibble | self.backlight
+        buf = self._buf
+        buf[0] = b | MASK_E
+        buf[1] = b
+        self.i2c.writeto(self.i2c_addr, self._mv[:2])
+
+    # ---- batching ----
+    def begin(self):
+        self._depth += 1
+
+    def end(self):
+        self._depth -= 1
+        if self._depth <= 0:
+            self._depth = 0
+            self._flush()
+
+    def _queue(self, value, rs):
+        if self._n + 4 > len(self._buf):
+            self._flush()
+        ctl = rs | self.backlight
+        hi = (value & 0xF0) | ctl
+        lo = ((value << 4) & 0xF0) | ctl
+        buf = self._buf
+        n = self._n
+        buf[n] = hi | MASK_E
+        buf[n + 1] = hi
+        buf[n + 2] = lo | MASK_E
+        buf[n + 3] = lo
+        self._n = n + 4
+
+    def _flush(self, exec_us=0):
+        n = self._n
+        if not n:
+            return
+        self._wait_ready()
+        self.i2c.writeto(self.i2c_addr, self._mv[:n])
+        self._n = 0
+        if exec_us:
+            self._ready_at = utime.ticks_add(utime.ticks_us(), exec_us)
+
+    def _wait_ready(self):
+        remaining = utime.ticks_diff(self._ready_at, utime.ticks_us())
+        # No command waits longer than EXEC_SLOW_US; anything beyond that is
+        # a _ready_at from long ago that ticks_us (~18 min period) wrapped past
+        if remaining <= 0 or remaining > EXEC_SLOW_US:
+            return
+        if self.busy_flag:
+            deadline = utime.ticks_add(utime.ticks_us(), remaining + EXEC_SLOW_US)
+            while self._read_busy():
+                if utime.ticks_diff(deadline, utime.ticks_us()) <= 0:
+                    break
+        else:
+            utime.sleep_us(remaining)
+
+    def _read_busy(self):
+        # D4..D7 high (inputs on the PCF8574), RW=1, strobe E and sample D7.
+        # 4-bit reads take two strobes; the low nibble is discarded.
+        # Uses its own buffer: the write queue is pending while we poll.
+        b = 0xF0 | MASK_RW | self.backlight
+        rd = self._rd
+        rd[0] = b
+        rd[1] = b | MASK_E
+        rd[2] = b
+        self.i2c.writeto(self.i2c_addr, self._rd_mv[:2])
+        self.i2c.readfrom_into(self.i2c_addr, self._one)
+        self.i2c.writeto(self.i2c_addr, rd)   # E low, then the low-nibble strobe
+        return self._one[0] & 0x80
+
+    # ---- LcdApi hooks ----
+    def hal_write_command(self, cmd):
+        self._queue(cmd, 0)
+        if cmd in (LCD_CLR, LCD_HOME):
+            self._flush(EXEC_SLOW_US)
+        elif not self._depth or not self.batched:
+            self._flush()
+
+    def hal_write_data(self, data):
+        self._queue(data, MASK_RS)
+        if not self._depth or not self.batched:
+            self._flush()
+
+    def hal_backlight(self, on):
+        self.backlight = MASK_BL if on else 0
+        self._flush()
+        self._one[0] = self.backlight
+        self.i2c.writeto(self.i2c_addr, self._one)
+
+
+class LcdFramebuffer:
+    """
+    Shadow framebuffer: callers draw into a back buffer; flush() compares it
+    with what is on the glass and sends only cursor moves and characters for
+    cells that changed, batched into one transaction.
+    """
+
+    def __init__(self, lcd, rows=None, cols=None, clear=True):
+        self.lcd = lcd
+        self.rows = rows or lcd.num_lines
+        self.cols = cols or lcd.num_columns
+        self.back = [bytearray(b" " * self.cols) for _ in range(self.rows)]
+        self.front = [bytearray(b" " * self.cols) for _ in range(self.rows)]
+        self._stale = not clear
+        self.cells_written = 0
+        self.moves = 0
+        if clear:
+            lcd.clear()
+
+    # ---- drawing (back buffer only, no I2C) ----
+    def clear(self):
+        for row in self.back:
+            row[:] = b" " * self.cols
+
+    def write(self, row, text, col=0, pad=True):
+        """Put text at (col, row); pad=True blanks the rest of the row."""
+        if not 0 <= row < self.rows:
+            return
+        buf = self.back[row]
+        end = self.cols if pad else min(col + len(text), self.cols)
+        for i in range(col, end):
+            j = i - col
+            buf[i] = ord(text[j]) & 0xFF if j < len(text) else 0x20
+
+    def set_lines(self, *lines):
+        for r in range(self.rows):
+            self.write(r, lines[r] if r < len(lines) else "")
+
+    def text(self, row):
+        return _to_str(self.back[row], 0, self.cols)
+
+    def invalidate(self):
+        """Forget what is on screen (e.g. after another writer touched it)."""
+        self._stale = True
+
+    # ---- output ----
+    def flush(self):
+        """Send only the changed cells. Returns the number of cells written."""
+        lcd = self.lcd
+        written = 0
+        lcd.begin()
+        try:
+            for r in range(self.rows):
+                back = self.back[r]
+                front = self.front[r]
+                if self._stale:
+                    for i in range(self.cols):
+                        front[i] = back[i] ^ 0xFF   # differs from every cell
+                c = 0
+                while c < self.cols:
+                    if back[c] == front[c]:
+                        c += 1
+                        continue
+                    start = c
+                    # extend the run; a single unchanged cell is cheaper to
+                    # rewrite than a second cursor move
+                    while c < self.cols and (back[c] != front[c] or
+                                             (c + 1 < self.cols and back[c + 1] != front[c + 1])):
+                        c += 1
+                    if lcd.cursor_x != start or lcd.cursor_y != r:
+                        lcd.move_to(start, r)
+                        self.moves += 1
+                    for i in range(start, c):
+                        lcd.putchar(chr(back[i]))
+                    front[start:c] = back[start:c]
+                    written += c - start
+        finally:
+            lcd.end()
+        self._stale = False
+        self.cells_written += written
+        return written
+
+
+def _to_str(buf, start, end):
+    # HD44780 codes above 0x7F (e.g. 0xDF degree sign) are not valid UTF-8
+    chunk = bytes(buf[start:end])
+    try:
+        return chunk.decode()
+    except UnicodeError:
+        return "".join(chr(b) for b in chunk)
@@ -0,0 +1,300 @@
+# httpd.py - Small uasyncio HTTP/1.1 server with a route table (MicroPython)
+#
+# Each client connection is its own task, so one slow browser no longer
+# blocks the others or the sensor/LCD tasks running next to the server.
+# Routes are looked up in a dict built once at start-up (no if/elif chain),
+# query strings are percent-decoded into req.query, and connections are
+# kept alive between requests (HTTP/1.1 default) up to keepalive_s idle.
+#
+# Usage:
+#     app = HttpServer()
+#
+#     @app.route("/lcd_text")
+#     def lcd_text(req):
+#         show(req.query.get("msg", ""))
+#         return ""                          # 200, empty body
+#
+#     app.add("/data", lambda req: {"t": 21.5})   # dict -> JSON
+#     asyncio.create_task(app.start(port=80))
+#
+# Handlers get a Request and return a str/bytes body (text/html), a dict
+# or list (JSON), a tuple (status, body) / (status, content_type, body), or
+# a StaticFile. A handler may also be async.
+#
+# Static assets are prebuilt on the host by build_assets.py (minified and
+# gzipped, with an ETag per file) and streamed from flash through one small
+# buffer, so serving the page never builds it in RAM:
+#     assets = load_assets("static")
+#     app.add("/", lambda req: assets["index.html"])
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import json
+
+STATUS = {
+    200: "OK", 204: "No Content", 301: "Moved Permanently", 304: "Not Modified",
+    400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+def unquote(s, plus=True):
+    """Percent-decode a URL component; '+' is a space in query strings."""
+    if plus:
+        s = s.replace("+", " ")
+    if "%" not in s:
+        return s
+    parts = s.split("%")
+    out = bytearray(parts[0].encode())
+    for part in parts[1:]:
+        try:
+            out.append(int(part[:2], 16))
+            out += part[2:].encode()
+        except ValueError:
+            out += b"%" + part.encode()
+    try:
+        return out.decode()
+    except UnicodeError:
+        return "".join(chr(b) for b in out)
+
+
+def parse_qs(qs):
+    """'a=1&b=x%20y' -> {'a': '1', 'b': 'x y'} (the last value wins)."""
+    out = {}
+    for pair in qs.split("&"):
+        if not pair:
+            continue
+        k, _, v = pair.partition("=")
+        out[unquote(k)] = unquote(v)
+    return out
+
+
+class StaticFile:
+    """A prebuilt (normally gzipped) file in flash, sent as is."""
+
+    def __init__(self, path, ctype, etag=None, gzip=True, max_age=0):
+        self.path = path
+        self.ctype = ctype
+        self.etag = etag
+        self.gzip = gzip
+        self.max_age = max_age     # 0: browser revalidates with If-None-Match
+
+    def headers(self):
+        h = {"Cache-Control": "max-age=%d" % self.max_age if self.max_age else "no-cache"}
+        if self.gzip:
+            h["Content-Encoding"] = "gzip"
+        if self.etag:
+            h["ETag"] = self.etag
+        return h
+
+
+def load_assets(root, max_age=None):
+    """{name: StaticFile} from <root>/manifest.json written by build_assets.py.
+    HTML revalidates on every load (cheap 304s); other files are cached for
+    max_age seconds (default one day)."""
+    with open(root + "/manifest.json") as f:
+        manifest = json.load(f)
+    out = {}
+    for name, m in manifest.items():
+        age = max_age if max_age is not None else (0 if m["type"].startswith("text/html") else 86400)
+        out[name] = StaticFile(root + "/" + m["file"], m["type"], m["etag"],
+                               m["file"].endswith(".gz"), age)
+    return out
+
+
+class Request:
+    def __init__(self, method, target, version, headers, body=b""):
+        self.method = method
+        self.version = version
+        self.headers = headers     # lower-case names
+        self.body = body
+        path, _, qs = target.partition("?")
+        self.path = unquote(path, False)
+        self.query_string = qs
+        self.query = parse_qs(qs)
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class HttpServer:
+    def __init__(self, keepalive_s=5, max_requests=50, max_body=2048, on_request=None, chunk=512):
+        self.routes = {}            # path -> {method: handler}
+        self.prefix_routes = []     # (prefix, {method: handler}) for "/static/*"
+        self.fallback = None        # handler for unknown paths (default 404)
+        self.keepalive_s = keepalive_s
+        self.max_requests = max_requests
+        self.max_body = max_body
+        self.on_request = on_request
+        self.requests = 0
+        self.connections = 0
+        self.reused = 0             # requests served on an already open connection
+        self.errors = 0
+        self.not_modified = 0
+        # one buffer for streaming files: write() copies it into the
+        # stream, so connections can share it across awaits
+        self._buf = bytearray(chunk)
+        self._mv = memoryview(self._buf)
+
+    # ---- route table ----
+    def add(self, path, handler, methods=("GET",)):
+        if path.endswith("*"):
+            table = {}
+            self.prefix_routes.append((path[:-1], table))
+            self.prefix_routes.sort(key=lambda r: -len(r[0]))   # longest first
+        else:
+            table = self.routes.setdefault(path, {})
+        for m in methods:
+            table[m] = handler
+
+    def route(self, path, methods=("GET",)):
+        def deco(fn):
+            self.add(path, fn, methods)
+            return fn
+        return deco
+
+    def _lookup(self, path):
+        table = self.routes.get(path)
+        if table is None:
+            for prefix, t in self.prefix_routes:
+                if path.startswith(prefix):
+                    return t
+        return table
+
+    # ---- connection handling ----
+    async def start(self, host="0.0.0.0", port=80, backlog=5):
+        return await asyncio.start_server(self._serve, host, port, backlog)
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        served = 0
+        try:
+            while served < self.max_requests:
+                try:
+                    req = await asyncio.wait_for(self._read_request(reader), self.keepalive_s)
+                except asyncio.TimeoutError:
+                    break
+                if req is None:
+                    break
+                if req == 400 or req == 413:
+                    self.errors += 1
+                    await self._respond(writer, req, "text/plain", STATUS[req], False)
+                    break
+                served += 1
+                self.requests += 1
+                if served > 1:
+                    self.reused += 1
+                conn = req.headers.get("connection", "").lower()
+                keep = (conn != "close" if req.version == "HTTP/1.1" else conn == "keep-alive")
+                keep = keep and served < self.max_requests
+                status, ctype, body, extra = await self._dispatch(req)
+                await self._respond(writer, status, ctype, body, keep, extra)
+                if not keep:
+                    break
+        except Exception as e:
+            self.errors += 1
+            print("httpd error:", e)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line or line == b"\r\n":
+            return None
+        try:
+            method, target, version = line.decode().split()
+        except ValueError:
+            return 400
+        headers = {}
+        while True:
+            h = await reader.readline()
+            if not h or h == b"\r\n":
+                break
+            k, _, v = h.decode().partition(":")
+            headers[k.strip().lower()] = v.strip()
+        body = b""
+        n = int(headers.get("content-length", 0) or 0)
+        if n > self.max_body:
+            return 413
+        if n:
+            body = await reader.readexactly(n)
+        return Request(method, target, version, headers, body)
+
+    async def _dispatch(self, req):
+        if self.on_request:
+            self.on_request(req)
+        table = self._lookup(req.path)
+        handler = None
+        if table is not None:
+            handler = table.get(req.method)
+            if handler is None:
+                return 405, "text/plain", STATUS[405], None
+        elif self.fallback is not None:
+            handler = self.fallback
+        else:
+            return 404, "text/plain", STATUS[404], None
+        try:
+            res = handler(req)
+            if hasattr(res, "send"):      # async handler
+                res = await res
+        except Exception as e:
+            print("handler error:", req.path, e)
+            return 500, "text/plain", STATUS[500], None
+        if isinstance(res, StaticFile):
+            if res.etag and req.headers.get("if-none-match") == res.etag:
+                self.not_modified += 1
+                return 304, res.ctype, b"", {"ETag": res.etag}
+            return 200, res.ctype, res, res.headers()
+        return _normalize(res)
+
+    async def _respond(self, writer, status, ctype, body, keep, extra=None):
+        f = None
+        if isinstance(body, StaticFile):
+            f = open(body.path, "rb")
+            length = f.seek(0, 2)
+            f.seek(0)
+        else:
+            if isinstance(body, str):
+                body = body.encode()
+            length = len(body)
+        try:
+            head = "HTTP/1.1 %d %s\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: %s\r\n" % (
+                status, STATUS.get(status, ""), ctype, length, "keep-alive" if keep else "close")
+            if extra:
+                for k, v in extra.items():
+                    head += "%s: %s\r\n" % (k, v)
+            writer.write((head + "\r\n").encode())
+            if f is not None:
+                while True:
+                    n = f.readinto(self._buf)
+                    if not n:
+                        break
+                    writer.write(self._mv[:n])
+                    await writer.drain()
+            elif body:
+                writer.write(body)
+            await writer.drain()
+        finally:
+            if f is not None:
+                f.close()
+
+
+def _normalize(res):
+    """Handler result -> (status, content_type, body, extra_headers)."""
+    if res is None:
+        return 200, "text/plain", b"", None
+    if isinstance(res, (str, bytes)):
+        return 200, "text/html", res, None
+    if isinstance(res, (dict, list)):
+        return 200, "application/json", json.dumps(res), None
+    if len(res) == 2:
+        status, body = res
+        if isinstance(body, (dict, list)):
+            return status, "application/json", json.dumps(body), None
+        return status, "text/plain", body, None
+    if len(res) == 3:
+        return res[0], res[1], res[2], None
+    return res
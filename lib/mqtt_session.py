@@ -0,0 +1,282 @@
+# mqtt_session.py - Non-blocking MQTT session on top of umqtt.simple (MicroPython)
+#
+# Shared by LAB3 and Lab4. poll() is called from the main loop between
+# samples and never sleeps: it rejoins Wi-Fi and the broker with
+# exponential backoff (plus jitter, so a fleet does not reconnect in step),
+# leaving a Wi-Fi association that is still in progress alone,
+# sends PINGREQ when the link has been idle for half the keepalive, drops
+# the connection when the broker stops answering, reads PUBACKs and
+# resends QoS 1 messages that were not acknowledged in time. Socket I/O is
+# bounded by timeout_s instead: a connect attempt (TCP plus CONNACK, with
+# an umqtt.simple that has connect(timeout=)), the
+# rest of a packet whose first byte has arrived, and a write to a full send
+# buffer each give up after it and count as a lost connection.
+#
+# Usage:
+#     client = MQTTClient(CLIENT_ID, BROKER, keepalive=30)
+#     mqtt = MqttSession(client, wlan, SSID, PASSWORD, window=8)
+#     while True:
+#         mqtt.poll()
+#         if mqtt.publish(TOPIC, payload, qos=1):   # False: offline / window full
+#             buf.pop(n)                            # the session resends until PUBACK
+#         ...
+#         print(mqtt.stats())                       # uptime, reconnects, ack latency
+#
+# QoS 1 publishes are written without waiting for the PUBACK (umqtt's own
+# qos=1 blocks for a full round trip); up to `window` can be in flight.
+# Unacknowledged messages survive a reconnect and are resent with DUP set.
+# Messages for subscriptions are acknowledged as their QoS requires: PUBACK
+# at QoS 1; PUBREC, then PUBCOMP on the broker's PUBREL at QoS 2, where
+# only the first copy of a packet id reaches the callback.
+
+import utime
+import random
+import struct
+import network
+
+
+class MqttSession:
+    def __init__(self, client, wlan=None, ssid=None, password=None, keepalive_s=None,
+                 window=8, ack_timeout_ms=5000, backoff_ms=1000, max_backoff_ms=60000,
+                 on_connect=None, timeout_s=2):
+        self.client = client
+        self.wlan = wlan
+        self.ssid = ssid
+        self.password = password
+        ka = keepalive_s if keepalive_s is not None else (client.keepalive or 60)
+        self.keepalive_ms = ka * 1000
+        self.window = window
+        self.ack_timeout_ms = ack_timeout_ms
+        self.timeout_s = timeout_s
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.on_connect = on_connect
+        self.connected = False
+        self.inflight = {}           # pid -> [topic, msg, sent_ms, first_ms]
+        self._pid = 0
+        self._delay = backoff_ms
+        self._next_try = utime.ticks_ms()
+        self._last_tx = self._last_rx = self._up_since = 0
+        self._ping_ms = None         # PINGREQ outstanding since
+        self._hdr = bytearray(5)
+        self._qos2_rx = set()        # ids of QoS 2 messages received, awaiting PUBREL
+        # stats
+        self.connects = 0
+        self.disconnects = 0
+        self.failed = 0
+        self.published = 0
+        self.acked = 0
+        self.retransmits = 0
+        self.pings = 0
+        self._uptime_ms = 0
+        self._lat_n = self._lat_sum = self._lat_max = 0
+
+    # ---- connection ----
+    def _backoff(self, now, reason):
+        jitter = (random.getrandbits(8) * self._delay) >> 10   # up to +25%
+        self._next_try = utime.ticks_add(now, self._delay + jitter)
+        print("MQTT %s, retry in %d ms" % (reason, self._delay + jitter))
+        self._delay = min(self._delay * 2, self.max_backoff_ms)
+
+    def _connect(self, now):
+        if self.wlan is not None and not self.wlan.isconnected():
+            self.failed += 1
+            # connect() again while associating would abort and restart it
+            if self.ssid and self.wlan.status() != network.STAT_CONNECTING:
+                try:
+                    self.wlan.connect(self.ssid, self.password)   # returns at once
+                except OSError:
+                    pass
+            self._backoff(now, "waiting for Wi-Fi")
+            return
+        try:
+            try:
+                self.client.connect(timeout=self.timeout_s)
+            except TypeError:       # umqtt.simple before connect(timeout=)
+                self.client.connect()
+                self.client.sock.settimeout(self.timeout_s)
+        except OSError as e:
+            self.failed += 1
+            self._backoff(now, "connect failed (%s)" % e)
+            return
+        now = utime.ticks_ms()
+        self.connected = True
+        self.connects += 1
+        self._delay = self.backoff_ms
+        self._last_tx = self._last_rx = self._up_since = now
+        self._ping_ms = None
+        self._qos2_rx.clear()        # clean session: the broker starts over too
+        print("MQTT connected")
+        if self.on_connect:
+            self.on_connect(self)
+        # resend what the previous connection never acknowledged
+        try:
+            for pid, m in self.inflight.items():
+                self._write(m[0], m[1], pid, True)
+                m[2] = now
+                self.retransmits += 1
+        except OSError as e:
+            self._drop(e)
+
+    def _drop(self, reason):
+        if self.connected:
+            self.connected = False
+            self.disconnects += 1
+            self._uptime_ms += utime.ticks_diff(utime.ticks_ms(), self._up_since)
+        try:
+            self.client.close()
+        except Exception:
+            pass
+        self._backoff(utime.ticks_ms(), "connection lost (%s)" % reason)
+
+    # ---- packets ----
+    def _write(self, topic, msg, pid, dup=False):
+        """PUBLISH at QoS 1, without waiting for the PUBACK."""
+        sock = self.client.sock
+        hdr = self._hdr
+        hdr[0] = 0x3A if dup else 0x32
+        sz = 2 + len(topic) + 2 + len(msg)
+        i = 1
+        while sz > 0x7F:
+            hdr[i] = (sz & 0x7F) | 0x80
+            sz >>= 7
+            i += 1
+        hdr[i] = sz
+        sock.write(hdr, i + 1)
+        struct.pack_into("!H", hdr, 0, len(topic))
+        sock.write(hdr, 2)
+        sock.write(topic)
+        struct.pack_into("!H", hdr, 0, pid)
+        sock.write(hdr, 2)
+        sock.write(msg)
+        self._last_tx = utime.ticks_ms()
+
+    def _read_len(self, sock):
+        n, shift = 0, 0
+        while True:
+            b = sock.read(1)[0]
+            n |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80:
+                return n
+
+    def _read(self, now):
+        sock = self.client.sock
+        while True:
+            sock.setblocking(False)
+            res = sock.read(1)
+            sock.settimeout(self.timeout_s)     # the rest of the packet, or OSError
+            if res is None:
+                return
+            if res == b"":
+                raise OSError(-1)
+            self._last_rx = now
+            self._ping_ms = None            # any packet shows the link is alive
+            op = res[0]
+            n = self._read_len(sock)
+            body = sock.read(n) if n else b""
+            if op == 0x40:                  # PUBACK
+                m = self.inflight.pop(struct.unpack("!H", body)[0], None)
+                if m is not None:
+                    self.acked += 1
+                    lat = utime.ticks_diff(now, m[3])
+                    self._lat_n += 1
+                    self._lat_sum += lat
+                    self._lat_max = max(self._lat_max, lat)
+            elif op & 0xF0 == 0x30:         # PUBLISH for a subscription
+                tlen = struct.unpack_from("!H", body)[0]
+                pos = 2 + tlen
+                qos = (op >> 1) & 3
+                if qos:
+                    pid = body[pos:pos + 2]
+                    pos += 2
+                if qos == 1:
+                    sock.write(b"\x40\x02" + pid)     # PUBACK
+                elif qos == 2:
+                    sock.write(b"\x50\x02" + pid)     # PUBREC; a resend before PUBREL is a duplicate
+                    if pid in self._qos2_rx:
+                        continue
+                    self._qos2_rx.add(pid)
+                if self.client.cb:
+                    self.client.cb(body[2:2 + tlen], body[pos:])
+            elif op == 0x62:                # PUBREL for a QoS 2 PUBLISH
+                self._qos2_rx.discard(body[:2])
+                sock.write(b"\x70\x02" + body[:2])    # PUBCOMP
+
+    # ---- main loop API ----
+    def poll(self):
+        """Do whatever the session needs now; returns True while connected."""
+        now = utime.ticks_ms()
+        if not self.connected:
+            if utime.ticks_diff(now, self._next_try) >= 0:
+                self._connect(now)
+            return self.connected
+        try:
+            if self.wlan is not None and not self.wlan.isconnected():
+                raise OSError("Wi-Fi down")
+            self._read(now)
+            if self._ping_ms is not None and utime.ticks_diff(now, self._ping_ms) > self.keepalive_ms // 2:
+                raise OSError("no PINGRESP")
+            # the broker only counts what we send towards the keepalive
+            if self._ping_ms is None and utime.ticks_diff(now, self._last_tx) >= self.keepalive_ms // 2:
+                self.client.ping()
+                self.pings += 1
+                self._ping_ms = self._last_tx = now
+            for pid, m in self.inflight.items():
+                if utime.ticks_diff(now, m[2]) >= self.ack_timeout_ms:
+                    self._write(m[0], m[1], pid, True)
+                    m[2] = now
+                    self.retransmits += 1
+        except OSError as e:
+            self._drop(e)
+        return self.connected
+
+    def can_publish(self, qos=0):
+        return self.connected and (qos == 0 or len(self.inflight) < self.window)
+
+    def publish(self, topic, msg, qos=0):
+        """Send msg; False if offline (or, at QoS 1, the window is full) -
+        the caller keeps it and tries again later."""
+        if not self.can_publish(qos):
+            return False
+        try:
+            if qos:
+                self._pid = self._pid % 0xFFFF + 1
+                while self._pid in self.inflight:
+                    self._pid = self._pid % 0xFFFF + 1
+                # kept for resending: frames are views of a reused buffer
+                msg = msg.encode() if isinstance(msg, str) else bytes(msg)
+                now = utime.ticks_ms()
+                self.inflight[self._pid] = [topic, msg, now, now]
+                self._write(topic, msg, self._pid)
+            else:
+                self.client.publish(topic, msg)
+                self._last_tx = utime.ticks_ms()
+        except OSError as e:
+            self._drop(e)
+            return qos == 1                 # QoS 1: kept in flight, resent on reconnect
+        self.published += 1
+        return True
+
+    def uptime_ms(self):
+        up = self._uptime_ms
+        if self.connected:
+            up += utime.ticks_diff(utime.ticks_ms(), self._up_since)
+        return up
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "uptime_s": self.uptime_ms() // 1000,
+            "session_s": utime.ticks_diff(utime.ticks_ms(), self._up_since) // 1000 if self.connected else 0,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "failed": self.failed,
+            "published": self.published,
+            "acked": self.acked,
+            "inflight": len(self.inflight),
+            "retransmits": self.retransmits,
+            "pings": self.pings,
+            "ack_ms_avg": self._lat_sum // self._lat_n if self._lat_n else None,
+            "ack_ms_max": self._lat_max if self._lat_n else None,
+        }
@@ -0,0 +1,160 @@
+# perf.py - Per-section timing for MicroPython main loops
+#
+# Wraps named sections of a loop with ticks_us timing and keeps, per
+# section, a ring of the last `size` durations (min/avg/max/p99 over that
+# window) plus lifetime count and worst case. With track_mem, gc.mem_free()
+# is read around each section as well, so a section that allocates shows
+# up as bytes per call (samples where a collection ran in between are
+# skipped). Reading mem_free walks the heap, so leave it off when the
+# timings themselves matter.
+#
+# Usage:
+#     prof = Profiler()
+#     P_SERVO = prof.section("update_servo")
+#     read_sensor = prof.wrap(read_sensor)      # or time a whole function
+#     while True:
+#         with P_SERVO:
+#             update_servo()
+#         ...
+#         prof.poll_print(10000)                # table on the console every 10 s
+#     # prof.report() -> list of dicts, e.g. for a /debug/perf endpoint
+#
+# Entering and leaving a section allocates nothing (wrap() passes *args,
+# which does); sections are not re-entrant. Profiler(enabled=False) hands
+# out a shared no-op section, so the instrumentation can stay in place.
+
+import gc
+import utime
+from array import array
+
+
+class Section:
+    def __init__(self, name, size=64, track_mem=False):
+        self.name = name
+        self.track_mem = track_mem
+        self.ring = array("L", [0] * size)
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        self.n = 0              # lifetime calls
+        self.pos = 0
+        self.worst_us = 0
+        self.mem_n = 0          # calls with a usable mem_free delta
+        self.mem_sum = 0
+        self.mem_max = 0
+        self._t0 = 0
+        self._free0 = 0
+
+    def __enter__(self):
+        if self.track_mem:
+            self._free0 = gc.mem_free()
+        self._t0 = utime.ticks_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.add(utime.ticks_diff(utime.ticks_us(), self._t0))
+        if self.track_mem:
+            used = self._free0 - gc.mem_free()
+            if used >= 0:   # negative: the GC ran inside the section
+                self.mem_n += 1
+                self.mem_sum += used
+                if used > self.mem_max:
+                    self.mem_max = used
+        return False
+
+    def add(self, us):
+        self.ring[self.pos] = us
+        self.pos = (self.pos + 1) % self.size
+        self.n += 1
+        if us > self.worst_us:
+            self.worst_us = us
+
+    def stats(self):
+        k = min(self.n, self.size)
+        s = {"name": self.name, "calls": self.n, "worst_us": self.worst_us}
+        if k:
+            window = sorted(self.ring[:k])   # until the ring wraps, k == pos
+            s["min_us"] = window[0]
+            s["avg_us"] = sum(window) // k
+            s["max_us"] = window[-1]
+            s["p99_us"] = window[min(k * 99 // 100, k - 1)]
+        if self.mem_n:
+            s["alloc_avg"] = self.mem_sum // self.mem_n
+            s["alloc_max"] = self.mem_max
+        return s
+
+
+class _Off:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, us):
+        pass
+
+
+_OFF = _Off()
+
+
+class Profiler:
+    def __init__(self, size=64, track_mem=False, enabled=True):
+        self.size = size
+        self.track_mem = track_mem
+        self.enabled = enabled
+        self.sections = []
+        self._by_name = {}
+        self._last_print = utime.ticks_ms()
+
+    def section(self, name):
+        if not self.enabled:
+            return _OFF
+        s = self._by_name.get(name)
+        if s is None:
+            s = self._by_name[name] = Section(name, self.size, self.track_mem)
+            self.sections.append(s)
+        return s
+
+    def wrap(self, fn, name=None):
+        """Returns fn timed as section `name` (default fn.__name__)."""
+        if not self.enabled:
+            return fn
+        sec = self.section(name or fn.__name__)
+
+        def timed(*args, **kw):
+            with sec:
+                return fn(*args, **kw)
+        return timed
+
+    def reset(self):
+        for s in self.sections:
+            s.reset()
+
+    def report(self):
+        return [s.stats() for s in self.sections]
+
+    def lines(self):
+        """Fixed-width table, one line per section."""
+        yield "{:<20}{:>8}{:>8}{:>8}{:>8}{:>8}{:>9}{:>8}".format(
+            "section", "calls", "min", "avg", "p99", "max", "worst", "alloc")
+        for s in self.report():
+            if "min_us" not in s:
+                continue
+            yield "{:<20}{:>8}{:>8}{:>8}{:>8}{:>8}{:>9}{:>8}".format(
+                s["name"][:19], s["calls"], s["min_us"], s["avg_us"], s["p99_us"], s["max_us"],
+                s["worst_us"], s.get("alloc_avg", "-"))
+
+    def print_report(self):
+        for line in self.lines():
+            print(line)
+
+    def poll_print(self, every_ms):
+        """print_report() at most once per every_ms; True when it printed."""
+        now = utime.ticks_ms()
+        if not self.enabled or utime.ticks_diff(now, self._last_print) < every_ms:
+            return False
+        self._last_print = now
+        self.print_report()
+        return True
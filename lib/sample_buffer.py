@@ -0,0 +1,142 @@
+# sample_buffer.py - Bounded buffer of timestamped samples for MQTT uplinks
+#
+# Shared by LAB3 and Lab4. Sampling appends here on its own timer whether
+# or not the broker is reachable; publishing drains the oldest samples in
+# batches once it is. A failed publish leaves the batch in place, so an
+# outage costs no readings until the buffer is full.
+#
+# Usage:
+#     buf = SampleBuffer(120, path="spool.jsonl")   # 120 in RAM + overflow on flash
+#     buf.append({"temperature": 21.5, "pressure": 1008.2})
+#     ...
+#     batch = buf.peek(20)                    # [(ts_ms, values), ...] oldest first
+#     client.publish(TOPIC, thingsboard_batch(batch))
+#     buf.pop(len(batch))                     # only after the publish went out
+#
+# Without path, the oldest RAM sample is dropped when the ring is full.
+# With path, it is appended to that file as one JSON line instead (up to
+# max_file lines, which also survive a reboot), and peek() serves the file
+# before RAM so batches stay in time order. Published lines are not cut out
+# of the file: a byte offset in "path.pos" marks where the unpublished ones
+# start, so a batch costs one seek and n lines of RAM and flash, not the
+# whole spool; the file is emptied once it has been read to the end.
+
+import utime
+import json
+
+# MicroPython on the ESP32 counts seconds from 2000-01-01
+EPOCH_OFFSET = 946684800 if utime.gmtime(0)[0] == 2000 else 0
+
+
+def now_ms():
+    """Wall-clock Unix time in ms (needs the RTC set, e.g. by ntptime)."""
+    return (utime.time() + EPOCH_OFFSET) * 1000
+
+
+def thingsboard_batch(samples):
+    """ThingsBoard telemetry array: [{"ts": ms, "values": {...}}, ...]."""
+    return json.dumps([{"ts": ts, "values": v} for ts, v in samples])
+
+
+def json_batch(samples):
+    """Flat JSON array for Node-RED: [{"ts": ms, "temperature": ...}, ...]."""
+    out = []
+    for ts, v in samples:
+        row = {"ts": ts}
+        row.update(v)
+        out.append(row)
+    return json.dumps(out)
+
+
+class SampleBuffer:
+    def __init__(self, capacity=120, path=None, max_file=1000):
+        self.capacity = capacity
+        self._ring = [None] * capacity
+        self._head = 0               # index of the oldest sample
+        self.count = 0               # samples in RAM
+        self.path = path
+        self.max_file = max_file
+        self.file_count = 0          # samples spilled to flash, not yet published
+        self._pos = 0                # byte offset of the first of them
+        self.appended = 0
+        self.published = 0
+        self.dropped = 0
+        if path:
+            try:
+                with open(path + ".pos") as f:
+                    self._pos = int(f.read())
+            except (OSError, ValueError):
+                pass
+            try:
+                with open(path, "rb") as f:
+                    f.seek(self._pos)
+                    for _ in f:
+                        self.file_count += 1
+            except OSError:
+                self._pos = 0
+
+    def __len__(self):
+        return self.count + self.file_count
+
+    def append(self, values, ts=None):
+        """Buffer one sample; ts defaults to now_ms()."""
+        self.appended += 1
+        if self.count == self.capacity:
+            self._spill(self._ring[self._head])
+            self._head = (self._head + 1) % self.capacity
+            self.count -= 1
+        self._ring[(self._head + self.count) % self.capacity] = (now_ms() if ts is None else ts, values)
+        self.count += 1
+
+    def _spill(self, sample):
+        if not self.path or self.file_count >= self.max_file:
+            self.dropped += 1
+            return
+        try:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(sample) + "\n")
+            self.file_count += 1
+        except OSError as e:
+            print("spool write failed:", e)
+            self.dropped += 1
+
+    def peek(self, n):
+        """Up to n of the oldest samples, without removing them."""
+        if self.file_count:
+            out = []
+            with open(self.path, "rb") as f:
+                f.seek(self._pos)
+                for line in f:
+                    ts, values = json.loads(line)
+                    out.append((ts, values))
+                    if len(out) == n:
+                        break
+            return out
+        n = min(n, self.count)
+        return [self._ring[(self._head + i) % self.capacity] for i in range(n)]
+
+    def pop(self, n):
+        """Remove the n oldest samples (after peek(n) was published)."""
+        self.published += n
+        if self.file_count:
+            # only the offset moves; this runs while catching up after an
+            # outage
+            n = min(n, self.file_count)
+            pos = self._pos
+            with open(self.path, "rb") as f:
+                f.seek(pos)
+                for _ in range(n):
+                    pos += len(f.readline())
+            self.file_count -= n
+            if not self.file_count:
+                pos = 0
+                open(self.path, "w").close()     # read to the end: start over
+            self._pos = pos
+            with open(self.path + ".pos", "w") as f:
+                f.write(str(pos))
+            return
+        n = min(n, self.count)
+        for _ in range(n):
+            self._ring[self._head] = None
+            self._head = (self._head + 1) % self.capacity
+        self.count -= n
@@ -0,0 +1,91 @@
+# sampler.py - Periodic sensor sampling into a cached snapshot (MicroPython)
+#
+# Each sensor is read at its own rate and the last good value is kept with
+# the ticks_ms it was taken at. Request handlers read the snapshot instead
+# of the sensors, so a page load never waits on a slow driver (a DHT22
+# measure() blocks for ~25 ms and the sensor only refreshes every 2 s).
+#
+# Usage:
+#     sampler = Sampler()
+#     sampler.add("temperature", read_temperature, 2000)
+#     sampler.add("distance", sonar.distance_cm, 200)
+#     while True:
+#         sampler.poll()                         # reads whatever is due
+#         s.settimeout(sampler.due_in_ms() / 1000)
+#         ...
+#         t = sampler.get("temperature")         # None if never read / too old
+#
+# A read function returning None (or raising) counts as an error and the
+# previous value is kept until it is older than max_age_ms.
+
+import utime
+
+
+class Sampler:
+    def __init__(self):
+        self._sources = []   # [name, read, period_ms, next_ms, max_age_ms]
+        self.values = {}
+        self.stamps = {}     # name -> ticks_ms of the last good read
+        self.errors = {}
+        self.reads = 0
+
+    def add(self, name, read, period_ms, max_age_ms=None):
+        """Sample read() every period_ms; values older than max_age_ms
+        (default 3 periods) are reported as None."""
+        now = utime.ticks_ms()
+        self._sources.append([name, read, period_ms, now,
+                              max_age_ms if max_age_ms is not None else 3 * period_ms])
+        self.values[name] = None
+        self.errors[name] = 0
+
+    def poll(self):
+        """Read every source that is due. Returns the names that were read."""
+        now = utime.ticks_ms()
+        done = []
+        for src in self._sources:
+            if utime.ticks_diff(now, src[3]) < 0:
+                continue
+            name = src[0]
+            try:
+                value = src[1]()
+            except Exception:
+                value = None
+            self.reads += 1
+            if value is None:
+                self.errors[name] += 1
+            else:
+                self.values[name] = value
+                self.stamps[name] = utime.ticks_ms()
+            # next slot on the original grid, skipping any that were missed
+            src[3] = utime.ticks_add(src[3], src[2])
+            if utime.ticks_diff(src[3], now) <= 0:
+                src[3] = utime.ticks_add(now, src[2])
+            done.append(name)
+        return done
+
+    def due_in_ms(self):
+        """Milliseconds until the next source is due (0 if one already is)."""
+        now = utime.ticks_ms()
+        wait = None
+        for src in self._sources:
+            d = utime.ticks_diff(src[3], now)
+            if wait is None or d < wait:
+                wait = d
+        return max(wait, 0) if wait is not None else 1000
+
+    def age_ms(self, name):
+        t = self.stamps.get(name)
+        return None if t is None else utime.ticks_diff(utime.ticks_ms(), t)
+
+    def get(self, name):
+        age = self.age_ms(name)
+        if age is None:
+            return None
+        for src in self._sources:
+            if src[0] == name and age > src[4]:
+                return None
+        return self.values[name]
+
+    def snapshot(self):
+        """{name: (value or None, age_ms or None)} for every source."""
+        return {src[0]: (self.get(src[0]), self.age_ms(src[0])) for src in self._sources}
@@ -0,0 +1,14 @@
+"""Host-side simulation harness for the MicroPython lab scripts.
+
+Provides fake ``machine``, ``network``, ``utime``, ``urequests``,
+``umqtt.simple``, ``dht`` and ``socket`` modules backed by a virtual board
+with scriptable sensors, a virtual clock and captured HTTP/MQTT traffic,
+so the device scripts run unmodified and faster than real time.
+"""
+
+from .board import Board, Broker
+from .clock import Clock, SimulationEnd
+from .runtime import Runtime, RunResult, run_script
+from . import devices
+
+__all__ = ["Board", "Broker", "Clock", "SimulationEnd", "Runtime", "RunResult", "run_script", "devices"]
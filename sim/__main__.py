@@ -0,0 +1,56 @@
+"""Run a device script on the default virtual board.
+
+    python -m sim "Mini Project/car_parking_project.py" --seconds 120 \
+        --request /@5000 --ir 5:2000:1 --ir 5:90000:0 --distance 8
+"""
+
+import argparse
+
+from . import Board, run_script, devices
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("script")
+    ap.add_argument("--seconds", type=float, default=60)
+    ap.add_argument("--request", action="append", default=[], metavar="PATH@MS",
+                    help="inbound HTTP GET to schedule, e.g. /data@1500")
+    ap.add_argument("--ir", action="append", default=[], metavar="PIN:MS:BLOCKED",
+                    help="IR sensor change, e.g. 5:2000:1")
+    ap.add_argument("--distance", type=float, default=100.0, help="ultrasonic distance in cm")
+    ap.add_argument("--broker-outage", action="append", default=[], metavar="START_MS:END_MS")
+    ap.add_argument("--quiet", action="store_true", help="do not echo the script's prints")
+    args = ap.parse_args()
+
+    board = Board()
+    board.add(devices.Pcf8574Lcd(0x27))
+    board.add(devices.Bmp280(0x76))
+    board.add(devices.Dht(4))
+    board.add(devices.Ultrasonic(trig=27, echo=26, distance_cm=args.distance))
+    timelines = {}
+    for spec in args.ir:
+        pin, t_ms, blocked = spec.split(":")
+        timelines.setdefault(int(pin), []).append((float(t_ms), blocked == "1"))
+    for pin in (5, 19, 17):
+        board.add(devices.IrSensor(pin, timelines.pop(pin, ())))
+    for pin, timeline in timelines.items():
+        board.add(devices.IrSensor(pin, timeline))
+    for spec in args.request:
+        path, _, at = spec.partition("@")
+        board.http_request(path, at_ms=float(at) if at else None)
+    for spec in args.broker_outage:
+        a, b = spec.split(":")
+        board.broker.outages.append((float(a), float(b)))
+
+    result = run_script(args.script, board, seconds=args.seconds, echo=not args.quiet)
+    print("-" * 60)
+    print(result.summary())
+    lcd = board.device(devices.Pcf8574Lcd)
+    if lcd and lcd.chars:
+        print("LCD: |%s|" % "|\n     |".join(lcd.lines()))
+    if result.error is not None:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
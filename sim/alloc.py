@@ -0,0 +1,157 @@
+"""Counts the heap allocations device code makes, the way MicroPython would.
+
+gc.mem_alloc() (fake/ugc.py) can only estimate garbage from tracemalloc's
+peak, which also holds what the fake modules allocate (C on the board)
+and every int CPython boxes above 256 (small ints on the board, never on
+the heap). AllocCounter counts objects instead, and only those created
+while a frame of device code - a file the Runtime loaded - is running:
+
+- opcodes that build an object: tuple/list/dict/set/slice/string
+  displays, f-string parts, closures and true division (a float);
+- every other GC-tracked object (generators, bound methods, dict views,
+  exceptions and their tracebacks, instances, lists returned by C
+  functions ...) through a gc callback: with the gen-0 threshold at 1 and
+  a few objects held, each new one starts a collection;
+- exceptions a fake module raises into device code (OSError from a socket
+  timeout), once each;
+- except the iterator of a ``for`` loop and the bound ``__exit__`` of a
+  ``with`` block, which MicroPython keeps on the C stack, and the frame
+  objects tracing itself needs.
+
+Not seen: strings and floats made by C functions (str(), .format(), float
+multiplication), and lists/tuples/dicts - a C function's result, a *args
+tuple, a **kwargs dict - when CPython hands them out from a free list the
+simulator just refilled. Counted although
+MicroPython doesn't allocate: the argument tuple CPython < 3.13 builds for
+min() and max().
+
+    counter = AllocCounter(runtime.device_files)
+    n = counter.count(loop_once)      # allocations during one call
+    counter.sites                     # {"parking.py:212": 3, ...}
+"""
+
+import dis
+import gc
+import os
+import sys
+
+PRIME = 64      # held objects: frees in between can't drain the gen-0 count
+
+
+def _ops(*names):
+    return set(dis.opmap[n] for n in names if n in dis.opmap)
+
+
+_OP = dis.opmap.get
+_BUILD = _ops(*(
+    "BUILD_LIST", "BUILD_MAP", "BUILD_SET", "BUILD_CONST_KEY_MAP", "BUILD_STRING",
+    "BUILD_SLICE", "BINARY_SLICE", "FORMAT_VALUE", "FORMAT_SIMPLE", "FORMAT_WITH_SPEC",
+    "MAKE_FUNCTION"))
+_BUILD_TUPLE = _OP("BUILD_TUPLE")
+_BINARY_OP = _OP("BINARY_OP")
+_DIVIDE = set(i for i, (name, _) in enumerate(getattr(dis, "_nb_ops", ()))
+              if name in ("NB_TRUE_DIVIDE", "NB_INPLACE_TRUE_DIVIDE"))
+_ON_STACK = _ops("GET_ITER", "BEFORE_WITH", "SETUP_WITH")
+_RESUME = _OP("RESUME")
+_RAISE = _ops("RAISE_VARARGS", "RERAISE")
+_FOR_ITER = _OP("FOR_ITER")
+
+
+class _Token:
+    pass
+
+
+class AllocCounter:
+    def __init__(self, files):
+        self.files = set(files)
+        self.total = 0
+        self.sites = {}
+        self._held = []
+        self._exceptions = []
+
+    def reset(self):
+        self.total = 0
+        self.sites = {}
+
+    def _hit(self, frame):
+        self.total += 1
+        key = "%s:%d" % (os.path.basename(frame.f_code.co_filename), frame.f_lineno)
+        self.sites[key] = self.sites.get(key, 0) + 1
+
+    def _opcode(self, frame):
+        code = frame.f_code.co_code
+        i = frame.f_lasti
+        op = code[i]
+        if op in _BUILD or op == _BUILD_TUPLE and code[i + 1] \
+                or op == _BINARY_OP and code[i + 1] in _DIVIDE:
+            self._hit(frame)
+
+    def _trace(self, frame, event, arg):
+        if frame.f_code.co_filename not in self.files:
+            return None
+        frame.f_trace_opcodes = True
+        return self._local
+
+    def _exception(self, frame, exc):
+        # Counted once, where it first reaches device code, unless device
+        # code raised it (the instance was counted when it was made) or it
+        # is a for loop's StopIteration (MicroPython's iterators return a
+        # sentinel instead)
+        for seen in self._exceptions:
+            if seen is exc:
+                return
+        self._exceptions.append(exc)
+        op = frame.f_code.co_code[frame.f_lasti]
+        if op not in _RAISE and op != _FOR_ITER:
+            self._hit(frame)
+
+    def _local(self, frame, event, arg):
+        if event == "opcode":
+            self._opcode(frame)
+        elif event == "exception":
+            self._exception(frame, arg[1])
+        return self._local
+
+    def _prime(self):
+        del self._held[:]
+        for _ in range(PRIME):
+            self._held.append(_Token())
+
+    def _collecting(self, phase, info):
+        if phase != "start":
+            self._prime()
+            return
+        frame = sys._getframe(1)
+        if frame.f_code.co_filename not in self.files or frame.f_lasti < 0:
+            return
+        op = frame.f_code.co_code[frame.f_lasti]
+        if op == _RESUME:
+            return      # the frame object tracing made for this call
+        # built by an opcode (counted by the tracer) or on the board's stack
+        if op in _BUILD or op == _BUILD_TUPLE or op in _ON_STACK \
+                or op == _BINARY_OP and frame.f_code.co_code[frame.f_lasti + 1] in _DIVIDE:
+            return
+        self._hit(frame)
+
+    def count(self, fn, *args):
+        """Calls fn(*args) and returns the allocations device code made in it."""
+        gc.collect()    # also empties CPython's free lists
+        threshold = gc.get_threshold()
+        enabled = gc.isenabled()
+        before = self.total
+        gc.callbacks.append(self._collecting)
+        gc.enable()
+        gc.set_threshold(1)
+        self._prime()
+        sys.settrace(self._trace)
+        try:
+            fn(*args)
+        finally:
+            sys.settrace(None)
+            gc.set_threshold(*threshold)
+            gc.callbacks.remove(self._collecting)
+            if not enabled:
+                gc.disable()
+            del self._held[:]
+            del self._exceptions[:]
+        return self.total - before
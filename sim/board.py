@@ -0,0 +1,179 @@
+"""Board: the virtual hardware and network a script runs against."""
+
+import time as _host_time
+
+from .clock import Clock
+from . import devices
+
+
+class PinState:
+    def __init__(self, num):
+        self.num = num
+        self.level = 0
+        self.mode = None
+        self.irq_handler = None
+        self.irq_trigger = 0
+        self.irq_pin = None
+        self.listeners = []
+
+
+class Broker:
+    """In-memory MQTT broker stand-in.
+
+    ``outages`` is a list of (start_ms, end_ms) windows during which
+    connects and publishes fail with OSError. During a ``silent`` window the
+    TCP connection stays up but the broker neither processes nor answers
+    anything sent over ``client.sock`` (a half-open link or a stuck broker),
+    and a CONNECT gets no CONNACK.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.outages = []
+        self.silent = []
+        self.up = True
+        self.publishes = []      # (t_ms, client_id, topic, payload, qos)
+        self.connects = 0
+        self.pings = 0
+        self.qos1_acked = 0  # QoS 1 publishes PUBACKed over client.sock
+        self.subscriptions = {}  # client -> [topic, ...]
+        self.inbox = {}          # client -> [(topic, msg), ...]
+
+    def available(self):
+        if not self.up:
+            return False
+        t_ms = self.board.clock.now_us // 1000
+        return not any(a <= t_ms < b for a, b in self.outages)
+
+    def is_silent(self):
+        t_ms = self.board.clock.now_us // 1000
+        return any(a <= t_ms < b for a, b in self.silent)
+
+    def deliver(self, topic, payload):
+        """Queue a message for every client subscribed to ``topic``."""
+        for client, topics in self.subscriptions.items():
+            if any(_topic_match(f, topic) for f in topics):
+                self.inbox.setdefault(client, []).append((topic, payload))
+
+
+def _topic_match(flt, topic):
+    f = flt.split(b"/") if isinstance(flt, bytes) else flt.split("/")
+    t = topic.split(b"/") if isinstance(topic, bytes) else topic.split("/")
+    for i, part in enumerate(f):
+        if part in ("#", b"#"):
+            return True
+        if i >= len(t) or (part not in ("+", b"+") and part != t[i]):
+            return False
+    return len(f) == len(t)
+
+
+def _request_bytes(method, path, headers, body):
+    lines = ["%s %s HTTP/1.1" % (method, path), "Host: esp32"]
+    for k, v in (headers or {}).items():
+        lines.append("%s: %s" % (k, v))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+class Board:
+    """Virtual ESP32 plus the outside world it talks to.
+
+    Configure it before running a script::
+
+        board = Board()
+        board.add(devices.IrSensor(5, [(2000, True), (65000, False)]))
+        board.http_request("/data", at_ms=1500)
+        result = run_script("Mini Project/car_parking_project.py", board, seconds=120)
+    """
+
+    def __init__(self, wifi_delay_ms=500, epoch=1735689600):
+        self.clock = Clock()
+        self.pins = {}
+        self.devices = []
+        self.i2c_devices = {}
+        self.dht = {}
+        self.pwm = {}
+        self.epoch = epoch
+        self.wifi_delay_ms = wifi_delay_ms
+        self.wifi_up = True
+        self.log = []
+        # outbound HTTP (urequests) and its scripted responder
+        self.http_out = []
+        self.http_responder = lambda req: (200, "{}")
+        # inbound HTTP to the script's listening socket
+        self.http_in = []          # pending connections, ready to accept
+        self.http_responses = []   # (t_ms, request, response bytes)
+        self.broker = Broker(self)
+
+    # ---- wiring ----
+    def pin(self, num):
+        st = self.pins.get(num)
+        if st is None:
+            st = self.pins[num] = PinState(num)
+        return st
+
+    def add(self, device):
+        self.devices.append(device)
+        device.attach(self)
+        return device
+
+    def add_defaults(self):
+        """Peripherals the lab scripts expect at their usual pins/addresses."""
+        self.add(devices.Pcf8574Lcd(0x27))
+        self.add(devices.Bmp280(0x76))
+        self.add(devices.Dht(4))
+        self.add(devices.Ultrasonic(trig=27, echo=26, distance_cm=100.0))
+        for p in (5, 19, 17):
+            self.add(devices.IrSensor(p))
+        return self
+
+    def device(self, cls):
+        for d in self.devices:
+            if isinstance(d, cls):
+                return d
+        return None
+
+    # ---- pin level changes ----
+    def drive(self, num, level):
+        """Set an input pin from the outside world, firing any IRQ."""
+        st = self.pin(num)
+        old, st.level = st.level, level
+        if old == level or not st.irq_handler:
+            return
+        edge = 0x01 if level else 0x02  # machine.Pin.IRQ_RISING / IRQ_FALLING
+        if st.irq_trigger & edge:
+            st.irq_handler(st.irq_pin)
+
+    def on_output(self, num, fn):
+        self.pin(num).listeners.append(fn)
+
+    def output(self, num, level):
+        """Called by the fake machine.Pin when the script writes a pin."""
+        st = self.pin(num)
+        old, st.level = st.level, level
+        for fn in st.listeners:
+            fn(old, level)
+
+    # ---- network scripting ----
+    def http_request(self, path, at_ms=None, method="GET", body=b"", port=80, headers=None, then=()):
+        """Schedule an inbound request to the script's web server; paths in
+        `then` are sent as further GETs on the same (keep-alive) connection."""
+        raw = _request_bytes(method, path, headers, body)
+        for p in then:
+            raw += _request_bytes("GET", p, headers, b"")
+        conn = {"port": port, "request": raw, "path": path}
+        if at_ms is None:
+            self.http_in.append(conn)
+        else:
+            self.clock.schedule(int(at_ms * 1000), lambda: self.http_in.append(conn))
+        return conn
+
+    # ---- helpers ----
+    @property
+    def now_ms(self):
+        return self.clock.now_us // 1000
+
+    def emit(self, text):
+        self.log.append((self.now_ms, text))
+
+    def wall_clock(self):
+        return _host_time.perf_counter()
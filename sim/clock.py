@@ -0,0 +1,78 @@
+"""Virtual clock and event queue driving a simulated board."""
+
+import heapq
+
+
+class SimulationEnd(BaseException):
+    """Raised inside the script when virtual time runs out.
+
+    Derives from BaseException so the scripts' ``except Exception`` retry
+    loops do not swallow it.
+    """
+
+
+class Clock:
+    """Microsecond virtual clock with a time-ordered event queue.
+
+    Time only moves when the script sleeps or blocks on I/O; scheduled
+    events (pin edges, timer callbacks, inbound requests) fire in order
+    while it moves.
+    """
+
+    def __init__(self, deadline_us=None):
+        self.now_us = 0
+        self.deadline_us = deadline_us
+        self._events = []
+        self._seq = 0
+
+    def schedule(self, at_us, fn):
+        """Run ``fn()`` once the clock reaches ``at_us``. Returns a handle."""
+        self._seq += 1
+        entry = [max(at_us, self.now_us), self._seq, fn]
+        heapq.heappush(self._events, entry)
+        return entry
+
+    def call_later(self, delay_us, fn):
+        return self.schedule(self.now_us + delay_us, fn)
+
+    @staticmethod
+    def cancel(entry):
+        entry[2] = None
+
+    def next_event_us(self):
+        while self._events and self._events[0][2] is None:
+            heapq.heappop(self._events)
+        return self._events[0][0] if self._events else None
+
+    def _check_deadline(self):
+        if self.deadline_us is not None and self.now_us >= self.deadline_us:
+            raise SimulationEnd()
+
+    def advance(self, us):
+        """Move time forward by ``us``, firing every event that falls due."""
+        self.run_until(None, self.now_us + max(int(us), 0))
+
+    def run_until(self, pred, limit_us=None):
+        """Fire events in order until ``pred()`` is true or ``limit_us`` is hit.
+
+        Returns True if the predicate was satisfied. With no limit the
+        clock runs to the deadline and raises SimulationEnd there.
+        """
+        if limit_us is None:
+            limit_us = self.deadline_us
+        if self.deadline_us is not None and (limit_us is None or limit_us > self.deadline_us):
+            limit_us = self.deadline_us
+        while True:
+            if pred is not None and pred():
+                return True
+            nxt = self.next_event_us()
+            if nxt is None or (limit_us is not None and nxt > limit_us):
+                break
+            _, _, fn = heapq.heappop(self._events)
+            self.now_us = nxt
+            fn()
+        if limit_us is None:
+            raise RuntimeError("blocking wait with no events and no deadline")
+        self.now_us = max(self.now_us, limit_us)
+        self._check_deadline()
+        return pred is not None and pred()
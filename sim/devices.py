@@ -0,0 +1,360 @@
+"""Scriptable virtual peripherals.
+
+Sensor values can be plain numbers or callables taking the virtual time in
+seconds, e.g. ``lambda t: 20 + t / 60`` for a slow temperature ramp.
+"""
+
+import struct
+
+
+def value_at(spec, t_s):
+    return spec(t_s) if callable(spec) else spec
+
+
+# ---------------------------------------------------------------- GPIO sensors
+class IrSensor:
+    """Active-low IR slot sensor; ``timeline`` is [(t_ms, blocked), ...]."""
+
+    def __init__(self, pin, timeline=(), active_level=0):
+        self.pin = pin
+        self.timeline = list(timeline)
+        self.active_level = active_level
+
+    def attach(self, board):
+        board.drive(self.pin, 1 - self.active_level)
+        for t_ms, blocked in self.timeline:
+            self.schedule(board, t_ms, blocked)
+
+    def schedule(self, board, t_ms, blocked):
+        level = self.active_level if blocked else 1 - self.active_level
+        board.clock.schedule(int(t_ms * 1000), lambda: board.drive(self.pin, level))
+
+
+class Ultrasonic:
+    """HC-SR04: answers each trigger pulse with an echo of the right width.
+
+    ``distance_cm`` is a number, a callable of time, or None for no echo.
+    """
+
+    US_PER_CM = 58.3
+    ECHO_DELAY_US = 450
+    MAX_CM = 400
+
+    def __init__(self, trig, echo, distance_cm=100.0):
+        self.trig = trig
+        self.echo = echo
+        self.distance_cm = distance_cm
+        self.pings = 0
+
+    def attach(self, board):
+        self.board = board
+        board.drive(self.echo, 0)
+        board.on_output(self.trig, self._on_trig)
+
+    def _on_trig(self, old, new):
+        if not (old == 1 and new == 0):
+            return
+        self.pings += 1
+        board = self.board
+        d = value_at(self.distance_cm, board.clock.now_us / 1e6)
+        if d is None or d > self.MAX_CM:
+            return
+        width = int(d * self.US_PER_CM)
+        board.clock.call_later(self.ECHO_DELAY_US, lambda: board.drive(self.echo, 1))
+        board.clock.call_later(self.ECHO_DELAY_US + width, lambda: board.drive(self.echo, 0))
+
+
+class Dht:
+    """DHT11/DHT22 on a GPIO; read through the fake ``dht`` module."""
+
+    MEASURE_US = 25000  # blocking single-wire transfer
+
+    def __init__(self, pin, temperature=25.0, humidity=50.0, fail_rate=0.0):
+        self.pin = pin
+        self.temperature = temperature
+        self.humidity = humidity
+        self.fail_rate = fail_rate
+        self.reads = 0
+
+    def attach(self, board):
+        board.dht[self.pin] = self
+
+
+# ----------------------------------------------------------------- I2C devices
+class I2cDevice:
+    """Register-mapped I2C target. Subclasses override the hooks they need."""
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.transactions = 0
+        self.bytes_written = 0
+        # set by the fake I2C before each write: when the first data byte
+        # lands and how long each byte takes on the bus
+        self.bus_start_us = 0
+        self.byte_us = 0
+
+    def attach(self, board):
+        board.i2c_devices[self.addr] = self
+
+    def write(self, data):
+        self.transactions += 1
+        self.bytes_written += len(data)
+
+    def read(self, n):
+        self.transactions += 1
+        return bytes(n)
+
+    def read_mem(self, reg, n):
+        self.transactions += 1
+        return bytes(n)
+
+    def write_mem(self, reg, data):
+        self.transactions += 1
+        self.bytes_written += len(data)
+
+
+class Bmp280(I2cDevice):
+    """BMP280 with the datasheet's sample calibration.
+
+    Raw ADC values are found by inverting the Bosch integer compensation,
+    so a driver reading this device gets back the scripted values.
+
+    Power modes follow the datasheet: in normal mode (ctrl_meas mode 11)
+    the sensor alternates t_meas of "measuring" with the config standby
+    time, and every data read sees a fresh conversion; writing forced mode (01)
+    starts one conversion that sets the "measuring" bit of 0xF3 for the
+    oversampling-dependent t_meas, latches the result and drops back to
+    sleep; in sleep mode reads return the last latched data.
+    """
+
+    OSRS = (0, 1, 2, 4, 8, 16, 16, 16)
+    STANDBY_US = (500, 62500, 125000, 250000, 500000, 1000000, 2000000, 4000000)
+
+    CALIB = (27504, 26435, -1000, 36477, -10685, 3024, 2855, 140, -7, 15500, -14600, 6000)
+
+    def __init__(self, addr=0x76, temperature=25.0, pressure=101325.0):
+        super().__init__(addr)
+        self.temperature = temperature
+        self.pressure = pressure
+        self.regs = bytearray(256)
+        self.regs[0xD0] = 0x58
+        self.regs[0x88:0x88 + 24] = struct.pack("<HhhHhhhhhhhh", *self.CALIB)
+        self.raw_reads = 0
+        self.conversions = 0
+        self.busy_until_us = 0
+        self.normal_since_us = None
+        self.busy_reads = 0
+        self.board = None
+
+    # Bosch reference integer compensation (same as the drivers use)
+    def _comp_temp(self, adc_t):
+        T1, T2, T3 = self.CALIB[:3]
+        var1 = (((adc_t >> 3) - (T1 << 1)) * T2) >> 11
+        var2 = (((((adc_t >> 4) - T1) * ((adc_t >> 4) - T1)) >> 12) * T3) >> 14
+        t_fine = var1 + var2
+        return (t_fine * 5 + 128) >> 8, t_fine
+
+    def _comp_press(self, adc_p, t_fine):
+        P1, P2, P3, P4, P5, P6, P7, P8, P9 = self.CALIB[3:]
+        var1 = t_fine - 128000
+        var2 = var1 * var1 * P6
+        var2 = var2 + ((var1 * P5) << 17)
+        var2 = var2 + (P4 << 35)
+        var1 = ((var1 * var1 * P3) >> 8) + ((var1 * P2) << 12)
+        var1 = (((1 << 47) + var1) * P1) >> 33
+        if var1 == 0:
+            return 0
+        p = 1048576 - adc_p
+        p = (((p << 31) - var2) * 3125) // var1
+        var1 = (P9 * (p >> 13) * (p >> 13)) >> 25
+        var2 = (P8 * p) >> 19
+        return ((p + var1 + var2) >> 8) + (P7 << 4)
+
+    @staticmethod
+    def _search(fn, target, increasing):
+        lo, hi = 0, (1 << 20) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            v = fn(mid)
+            if (v < target) if increasing else (v > target):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def raw(self, t_s):
+        temp_c = value_at(self.temperature, t_s)
+        press_pa = value_at(self.pressure, t_s)
+        adc_t = self._search(lambda a: self._comp_temp(a)[0], round(temp_c * 100), True)
+        t_fine = self._comp_temp(adc_t)[1]
+        # pressure falls as adc_p rises
+        adc_p = self._search(lambda a: self._comp_press(a, t_fine), round(press_pa * 256), False)
+        return adc_t, adc_p
+
+    def t_meas_us(self):
+        """Maximum conversion time for the current oversampling (datasheet 9.1)."""
+        ctrl = self.regs[0xF4]
+        osrs_t = self.OSRS[ctrl >> 5]
+        osrs_p = self.OSRS[(ctrl >> 2) & 0x7]
+        return int(1250 + 2300 * osrs_t + (2300 * osrs_p + 575 if osrs_p else 0))
+
+    def _latch(self):
+        self.conversions += 1
+        adc_t, adc_p = self.raw(self.board.clock.now_us / 1e6)
+        self.regs[0xF7:0xFD] = bytes((
+            adc_p >> 12, (adc_p >> 4) & 0xFF, (adc_p & 0xF) << 4,
+            adc_t >> 12, (adc_t >> 4) & 0xFF, (adc_t & 0xF) << 4,
+        ))
+
+    def _forced_done(self):
+        self._latch()
+        self.regs[0xF4] &= 0xFC   # back to sleep
+
+    def read_mem(self, reg, n):
+        self.transactions += 1
+        now = self.board.clock.now_us
+        busy = now < self.busy_until_us
+        if self.normal_since_us is not None:
+            t_meas = self.t_meas_us()
+            busy = (now - self.normal_since_us) % (t_meas + self.STANDBY_US[self.regs[0xF5] >> 5]) < t_meas
+        self.regs[0xF3] = 0x08 if busy else 0x00
+        if reg == 0xF3 and busy:
+            self.busy_reads += 1
+        if reg <= 0xF7 < reg + n:
+            self.raw_reads += 1
+            if self.regs[0xF4] & 0x03 == 0x03:
+                self._latch()
+        return bytes(self.regs[reg:reg + n])
+
+    def write_mem(self, reg, data):
+        super().write_mem(reg, data)
+        self.regs[reg:reg + len(data)] = data
+        if reg <= 0xF4 < reg + len(data):
+            mode = self.regs[0xF4] & 0x03
+            if mode != 0x03:
+                self.normal_since_us = None
+            elif self.normal_since_us is None:
+                self.normal_since_us = self.board.clock.now_us
+        if reg <= 0xF4 < reg + len(data) and self.regs[0xF4] & 0x03 in (0x01, 0x02):
+            clock = self.board.clock
+            self.busy_until_us = clock.now_us + self.t_meas_us()
+            clock.schedule(self.busy_until_us, self._forced_done)
+
+    def attach(self, board):
+        self.board = board
+        super().attach(board)
+
+
+class Pcf8574Lcd(I2cDevice):
+    """HD44780 behind a PCF8574 backpack, decoded back into text.
+
+    Nibbles are latched on the falling edge of E (bit 2), RS is bit 0, RW
+    is bit 1 and D4..D7 are bits 4..7, matching the common backpack wiring.
+    Each instruction keeps the controller busy for its datasheet execution
+    time; a nibble latched before that counts as a timing violation, and a
+    busy-flag read returns BF in bit 7 while it lasts.
+    """
+
+    EXEC_US = 37
+    EXEC_SLOW_US = 1520  # clear display / return home
+
+    ROW_OFFSETS = (0x00, 0x40, 0x14, 0x54)
+
+    def __init__(self, addr=0x27, rows=2, cols=16):
+        super().__init__(addr)
+        self.rows = rows
+        self.cols = cols
+        self.ddram = bytearray(b" " * 0x80)
+        self.cgram = bytearray(64)
+        self.addr_counter = 0
+        self.cgram_mode = False
+        self.four_bit = False
+        self.pending = None
+        self.last = 0
+        self.commands = 0
+        self.chars = 0
+        self.busy_until_us = 0
+        self.violations = 0
+        self.busy_reads = 0
+        self.read_pending = False
+        self.clock = None
+        self._at_us = 0
+
+    def attach(self, board):
+        super().attach(board)
+        self.clock = board.clock
+
+    def _now(self):
+        return self.clock.now_us if self.clock else 0
+
+    def write(self, data):
+        super().write(data)
+        for k, b in enumerate(data):
+            if self.last & 0x04 and not b & 0x04:
+                self._at_us = self.bus_start_us + (k + 1) * self.byte_us
+                self._latch(self.last)
+            self.last = b
+
+    def read(self, n):
+        self.transactions += 1
+        self.busy_reads += 1
+        # D7 carries BF during the first strobe of a 4-bit read
+        bf = 0x80 if self._now() < self.busy_until_us else 0
+        return bytes([bf | (self.last & 0x0F)]) + bytes(n - 1)
+
+    def _latch(self, b):
+        if b & 0x02:
+            # read cycle (RW=1): two strobes per byte, nothing is stored
+            self.read_pending = not self.read_pending
+            return
+        nibble = b >> 4
+        rs = b & 0x01
+        if not self.four_bit:
+            # 8-bit init phase: only the function-set high nibble matters
+            if nibble == 0x2:
+                self.four_bit = True
+            return
+        if self.pending is None:
+            self.pending = nibble
+            return
+        value = (self.pending << 4) | nibble
+        self.pending = None
+        now = self._at_us or self._now()
+        if now < self.busy_until_us:
+            self.violations += 1
+        slow = not rs and value in (0x01, 0x02, 0x03)
+        self.busy_until_us = now + (self.EXEC_SLOW_US if slow else self.EXEC_US)
+        if rs:
+            self._data(value)
+        else:
+            self._command(value)
+
+    def _command(self, cmd):
+        self.commands += 1
+        if cmd == 0x01:
+            self.ddram[:] = b" " * 0x80
+            self.addr_counter = 0
+            self.cgram_mode = False
+        elif cmd & 0xFE == 0x02:
+            self.addr_counter = 0
+            self.cgram_mode = False
+        elif cmd & 0x80:
+            self.addr_counter = cmd & 0x7F
+            self.cgram_mode = False
+        elif cmd & 0x40:
+            self.addr_counter = cmd & 0x3F
+            self.cgram_mode = True
+
+    def _data(self, value):
+        self.chars += 1
+        if self.cgram_mode:
+            self.cgram[self.addr_counter & 0x3F] = value
+            self.addr_counter = (self.addr_counter + 1) & 0x3F
+        else:
+            self.ddram[self.addr_counter & 0x7F] = value
+            self.addr_counter = (self.addr_counter + 1) & 0x7F
+
+    def lines(self):
+        """Visible text, one string per row."""
+        return [self.ddram[o:o + self.cols].decode("latin-1")
+                for o in self.ROW_OFFSETS[:self.rows]]
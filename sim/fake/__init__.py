@@ -0,0 +1,5 @@
+"""Stand-ins for the MicroPython modules the lab scripts import.
+
+Each file is executed fresh for every simulated run with a module-level
+``BOARD`` bound to that run's :class:`sim.board.Board`; see ``sim.runtime``.
+"""
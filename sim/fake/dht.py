@@ -0,0 +1,42 @@
+"""dht.DHT11 / DHT22 reading the board's virtual Dht sensors."""
+
+import random as _random
+
+from sim.devices import value_at
+
+BOARD = None
+
+
+class _DHTBase:
+    def __init__(self, pin):
+        self._sensor = BOARD.dht.get(pin.id)
+        self._t = None
+        self._h = None
+
+    def measure(self):
+        s = self._sensor
+        if s is None:
+            raise OSError(116)  # ETIMEDOUT, nothing on the wire
+        BOARD.clock.advance(s.MEASURE_US)
+        s.reads += 1
+        if s.fail_rate and _random.random() < s.fail_rate:
+            raise OSError(116)
+        t_s = BOARD.clock.now_us / 1e6
+        self._t = value_at(s.temperature, t_s)
+        self._h = value_at(s.humidity, t_s)
+
+
+class DHT11(_DHTBase):
+    def temperature(self):
+        return int(self._t)
+
+    def humidity(self):
+        return int(self._h)
+
+
+class DHT22(_DHTBase):
+    def temperature(self):
+        return round(self._t, 1)
+
+    def humidity(self):
+        return round(self._h, 1)
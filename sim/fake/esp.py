@@ -0,0 +1,11 @@
+"""esp: only the calls the lab scripts make."""
+
+BOARD = None
+
+
+def osdebug(level, *args):
+    pass
+
+
+def flash_size():
+    return 4 * 1024 * 1024
@@ -0,0 +1,211 @@
+"""machine: Pin, PWM, I2C, Timer and time_pulse_us on the virtual board."""
+
+BOARD = None
+
+
+def _pin_num(p):
+    return p.id if isinstance(p, Pin) else p
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._st = BOARD.pin(id)
+        if mode != -1:
+            self._st.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self._st.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v is None:
+            return self._st.level
+        BOARD.output(self.id, 1 if v else 0)
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_RISING | IRQ_FALLING, hard=False):
+        self._st.irq_handler = handler
+        self._st.irq_trigger = trigger
+        self._st.irq_pin = self
+
+    def __repr__(self):
+        return "Pin(%d)" % self.id
+
+
+class PWM:
+    def __init__(self, pin, freq=None, duty=None, duty_u16=None):
+        self.pin = _pin_num(pin)
+        self._freq = freq or 5000
+        self._duty = duty or 0
+        self.history = []
+        BOARD.pwm[self.pin] = self
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        self._freq = f
+
+    def duty(self, d=None):
+        if d is None:
+            return self._duty
+        self._duty = int(d)
+        self.history.append((BOARD.now_ms, self._duty))
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty * 64
+        self.duty(d // 64)
+
+    def deinit(self):
+        pass
+
+
+class I2C:
+    def __init__(self, id=0, scl=None, sda=None, freq=400000):
+        self.freq = freq
+        self.transactions = 0
+
+    def _dev(self, addr):
+        dev = BOARD.i2c_devices.get(addr)
+        if dev is None:
+            raise OSError(19)  # ENODEV, as MicroPython reports a NACK
+        self.transactions += 1
+        return dev
+
+    def _bus(self, nbytes):
+        # start + address + ~9 bits per byte at the bus frequency
+        BOARD.clock.advance((nbytes + 1) * 9 * 1000000 // self.freq + 1)
+
+    def scan(self):
+        return sorted(BOARD.i2c_devices)
+
+    def writeto(self, addr, buf, stop=True):
+        dev = self._dev(addr)
+        # byte k of the payload is on the pins after k+2 byte times
+        dev.byte_us = 9 * 1000000 / self.freq
+        dev.bus_start_us = BOARD.clock.now_us + dev.byte_us
+        self._bus(len(buf))
+        dev.write(bytes(buf))
+        return len(buf)
+
+    def readfrom(self, addr, n, stop=True):
+        dev = self._dev(addr)
+        self._bus(n)
+        return dev.read(n)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        buf[:] = self.readfrom(addr, len(buf), stop)
+
+    def readfrom_mem(self, addr, memaddr, n, addrsize=8):
+        dev = self._dev(addr)
+        self._bus(n + 1)
+        return dev.read_mem(memaddr, n)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        buf[:] = self.readfrom_mem(addr, memaddr, len(buf))
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        dev = self._dev(addr)
+        self._bus(len(buf) + 1)
+        dev.write_mem(memaddr, bytes(buf))
+
+
+SoftI2C = I2C
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._entry = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, callback=None, freq=None):
+        self.deinit()
+        if freq:
+            period = 1000 // freq
+        self._period_us = max(int(period), 1) * 1000
+        self._mode = mode
+        self._cb = callback
+        self._arm()
+
+    def _arm(self):
+        self._entry = BOARD.clock.call_later(self._period_us, self._fire)
+
+    def _fire(self):
+        if self._mode == Timer.PERIODIC:
+            self._arm()
+        else:
+            self._entry = None
+        if self._cb:
+            self._cb(self)
+
+    def deinit(self):
+        if self._entry is not None:
+            BOARD.clock.cancel(self._entry)
+            self._entry = None
+
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        pass
+
+    def feed(self):
+        pass
+
+
+def time_pulse_us(pin, pulse_level, timeout_us=1000000):
+    st = pin._st
+    clock = BOARD.clock
+    if not clock.run_until(lambda: st.level == pulse_level, clock.now_us + timeout_us):
+        return -2
+    start = clock.now_us
+    if not clock.run_until(lambda: st.level != pulse_level, start + timeout_us):
+        return -1
+    return clock.now_us - start
+
+
+def freq(hz=None):
+    return 240000000
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+def unique_id():
+    return b"\x24\x0a\xc4\x00\x00\x06"
+
+
+def idle():
+    BOARD.clock.advance(1000)
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
@@ -0,0 +1,38 @@
+"""micropython builtins module."""
+
+BOARD = None
+
+
+def const(x):
+    return x
+
+
+def native(f):
+    return f
+
+
+viper = native
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(func, arg):
+    BOARD.clock.call_later(0, lambda: func(arg))
+
+
+def opt_level(level=None):
+    return 0
+
+
+def mem_info(verbose=False):
+    print("stack: 0 out of 15360")
+
+
+def heap_lock():
+    return 0
+
+
+def heap_unlock():
+    return 0
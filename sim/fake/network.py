@@ -0,0 +1,47 @@
+"""network.WLAN that associates after ``BOARD.wifi_delay_ms``."""
+
+BOARD = None
+
+STA_IF = 0
+AP_IF = 1
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self._active = False
+        self._connected_at = None
+        self.ssid = None
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = bool(is_active)
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        self.ssid = ssid
+        self._connected_at = BOARD.clock.now_us + BOARD.wifi_delay_ms * 1000
+
+    def disconnect(self):
+        self._connected_at = None
+
+    def isconnected(self):
+        return (BOARD.wifi_up and self._connected_at is not None
+                and BOARD.clock.now_us >= self._connected_at)
+
+    def status(self, param=None):
+        if param == "rssi":
+            return -55
+        if self.isconnected():
+            return STAT_GOT_IP
+        return STAT_CONNECTING if self._connected_at is not None else STAT_IDLE
+
+    def ifconfig(self, config=None):
+        return ("192.168.4.2", "255.255.255.0", "192.168.4.1", "8.8.8.8")
+
+    def config(self, *args, **kwargs):
+        if args == ("mac",):
+            return b"\x24\x0a\xc4\x00\x00\x06"
+        return None
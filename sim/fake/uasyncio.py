@@ -0,0 +1,391 @@
+"""uasyncio / asyncio on the virtual clock.
+
+A small single-threaded scheduler in the shape of MicroPython's: tasks are
+coroutines, sleeps are timers on the board clock, and when nothing is
+runnable the clock is advanced to the next timer or until a waiting task's
+condition (e.g. an inbound connection) becomes true. ``start_server`` serves
+the board's scripted HTTP connections as streams.
+"""
+
+import heapq as _heapq
+import sys as _sys
+
+BOARD = None
+
+
+class CancelledError(BaseException):
+    pass
+
+
+class TimeoutError(Exception):
+    pass
+
+
+# ---- awaitables understood by the loop ----
+class _Sleep:
+    def __init__(self, us):
+        self.us = max(int(us), 0)
+
+    def __await__(self):
+        yield ("sleep", self.us)
+
+
+class _Wait:
+    """Suspend until ``pred()`` is true (checked whenever time moves), or
+    until the clock reaches ``until_us`` if given."""
+
+    def __init__(self, pred, until_us=None):
+        self.pred = pred
+        self.until_us = until_us
+
+    def __await__(self):
+        if not self.pred():
+            yield ("wait", self.pred, self.until_us)
+
+
+class _Yield:
+    def __await__(self):
+        yield None
+
+
+class Task:
+    def __init__(self, coro):
+        self.coro = coro
+        self.done_flag = False
+        self.result = None
+        self.exc = None
+        self.waiters = []
+        self._entry = None     # timer or wait registration while suspended
+
+    def done(self):
+        return self.done_flag
+
+    def cancel(self):
+        if self.done_flag:
+            return False
+        _loop._throw(self, CancelledError())
+        return True
+
+    def __await__(self):
+        while not self.done_flag:
+            yield ("join", self)
+        if self.exc is not None:
+            raise self.exc
+        return self.result
+
+
+class Loop:
+    def __init__(self):
+        self.ready = []        # [(task, exc)]
+        self.timers = []       # [wake_us, seq, task]
+        self.waiting = []      # [pred, task, until_us]
+        self._seq = 0
+
+    # ---- task state ----
+    def create_task(self, coro):
+        task = Task(coro)
+        self.ready.append((task, None))
+        return task
+
+    def _unregister(self, task):
+        entry, task._entry = task._entry, None
+        if entry is None:
+            return
+        if entry[0] == "timer":
+            entry[1][2] = None
+        else:
+            self.waiting.remove(entry[1])
+
+    def _throw(self, task, exc):
+        self._unregister(task)
+        self.ready = [(t, e) for t, e in self.ready if t is not task]
+        self.ready.append((task, exc))
+
+    def _finish(self, task, result=None, exc=None):
+        task.done_flag = True
+        task.result = result
+        task.exc = exc
+        waiters, task.waiters = task.waiters, []
+        for w in waiters:
+            self.ready.append((w, None))
+        if exc is not None and not isinstance(exc, CancelledError) and not waiters:
+            print("Task exception wasn't retrieved:", repr(exc), file=_sys.stderr)
+
+    def _step(self, task, exc):
+        try:
+            cmd = task.coro.throw(exc) if exc is not None else task.coro.send(None)
+        except StopIteration as e:
+            self._finish(task, e.value)
+            return
+        except CancelledError as e:
+            self._finish(task, exc=e)
+            return
+        except Exception as e:
+            self._finish(task, exc=e)
+            return
+        if cmd is None:
+            self.ready.append((task, None))
+        elif cmd[0] == "sleep":
+            self._seq += 1
+            entry = [BOARD.clock.now_us + cmd[1], self._seq, task]
+            _heapq.heappush(self.timers, entry)
+            task._entry = ("timer", entry)
+        elif cmd[0] == "wait":
+            entry = [cmd[1], task, cmd[2]]
+            self.waiting.append(entry)
+            task._entry = ("wait", entry)
+        elif cmd[0] == "join":
+            target = cmd[1]
+            if target.done_flag:
+                self.ready.append((task, None))
+            else:
+                target.waiters.append(task)
+
+    # ---- driving ----
+    def _wake(self):
+        now = BOARD.clock.now_us
+        while self.timers and (self.timers[0][2] is None or self.timers[0][0] <= now):
+            _, _, task = _heapq.heappop(self.timers)
+            if task is not None:
+                task._entry = None
+                self.ready.append((task, None))
+        for entry in list(self.waiting):
+            if entry[0]() or (entry[2] is not None and entry[2] <= now):
+                self.waiting.remove(entry)
+                entry[1]._entry = None
+                self.ready.append((entry[1], None))
+
+    def _any_waiting(self):
+        return any(entry[0]() for entry in self.waiting)
+
+    def run_until(self, stop):
+        clock = BOARD.clock
+        while not stop():
+            if self.ready:
+                batch, self.ready = self.ready, []
+                for task, exc in batch:
+                    if not task.done_flag:
+                        self._step(task, exc)
+                continue
+            self._wake()
+            if self.ready:
+                continue
+            while self.timers and self.timers[0][2] is None:
+                _heapq.heappop(self.timers)
+            limits = [e[2] for e in self.waiting if e[2] is not None]
+            if self.timers:
+                limits.append(self.timers[0][0])
+            limit = min(limits) if limits else None
+            if limit is None and not self.waiting:
+                return
+            clock.run_until(self._any_waiting, limit)
+            self._wake()
+
+    def run_until_complete(self, aw):
+        task = aw if isinstance(aw, Task) else self.create_task(aw)
+        self.run_until(task.done)
+        if task.exc is not None:
+            raise task.exc
+        return task.result
+
+    def run_forever(self):
+        self.run_until(lambda: False)
+
+    def close(self):
+        pass
+
+
+_loop = Loop()
+
+
+def get_event_loop():
+    return _loop
+
+
+new_event_loop = get_event_loop
+
+
+def create_task(coro):
+    return _loop.create_task(coro)
+
+
+def run(coro):
+    return _loop.run_until_complete(coro)
+
+
+def sleep(t):
+    return _Sleep(t * 1000000)
+
+
+def sleep_ms(t):
+    return _Sleep(t * 1000)
+
+
+def current_task():
+    return None
+
+
+async def wait_for(aw, timeout):
+    task = aw if isinstance(aw, Task) else create_task(aw)
+    if timeout is None:
+        return await task
+    deadline = BOARD.clock.now_us + int(timeout * 1000000)
+    await _Wait(lambda: task.done_flag, deadline)
+    if not task.done_flag:
+        task.cancel()
+        raise TimeoutError()
+    return await task
+
+
+def wait_for_ms(aw, timeout):
+    return wait_for(aw, timeout / 1000)
+
+
+async def gather(*aws, return_exceptions=False):
+    tasks = [a if isinstance(a, Task) else create_task(a) for a in aws]
+    out = []
+    for t in tasks:
+        try:
+            out.append(await t)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            out.append(e)
+    return out
+
+
+class Event:
+    def __init__(self):
+        self.state = False
+
+    def set(self):
+        self.state = True
+
+    def clear(self):
+        self.state = False
+
+    def is_set(self):
+        return self.state
+
+    async def wait(self):
+        await _Wait(lambda: self.state)
+        return True
+
+
+class Lock:
+    def __init__(self):
+        self.state = False
+
+    def locked(self):
+        return self.state
+
+    async def acquire(self):
+        await _Wait(lambda: not self.state)
+        self.state = True
+        return True
+
+    def release(self):
+        self.state = False
+
+    async def __aenter__(self):
+        return await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+# ---- streams over the board's scripted connections ----
+class Stream:
+    """Both ends of one accepted connection (MicroPython uses one class)."""
+
+    def __init__(self, conn, peer):
+        self.conn = conn
+        self.peer = peer
+        self._rx = conn["request"]
+        self._tx = bytearray()
+        self.closed = False
+
+    def get_extra_info(self, name):
+        return self.peer if name == "peername" else None
+
+    async def readline(self):
+        i = self._rx.find(b"\n")
+        end = len(self._rx) if i < 0 else i + 1
+        data, self._rx = self._rx[:end], self._rx[end:]
+        await _Yield()
+        return data
+
+    async def read(self, n=-1):
+        if n < 0:
+            n = len(self._rx)
+        data, self._rx = self._rx[:n], self._rx[n:]
+        await _Yield()
+        return data
+
+    async def readexactly(self, n):
+        data = await self.read(n)
+        if len(data) < n:
+            raise EOFError()
+        return data
+
+    def write(self, data):
+        # bytes-like only, as asyncio's StreamWriter and MicroPython's
+        # out_buf concatenation require
+        if isinstance(data, str):
+            raise TypeError("a bytes-like object is required, not 'str'")
+        self._tx += data
+
+    async def drain(self):
+        await _Yield()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        c = self.conn
+        c["response"] = bytes(self._tx)
+        c["closed_ms"] = BOARD.now_ms
+        BOARD.http_responses.append((BOARD.now_ms, c["path"], c["response"]))
+
+    async def wait_closed(self):
+        await _Yield()
+
+    aclose = wait_closed
+
+
+StreamReader = StreamWriter = Stream
+
+
+class Server:
+    def __init__(self, port):
+        self.port = port
+        self.task = None
+
+    def _ready(self):
+        return any(c["port"] == self.port for c in BOARD.http_in)
+
+    async def _accept(self, cb):
+        n = 0
+        while True:
+            await _Wait(self._ready)
+            for i, c in enumerate(BOARD.http_in):
+                if c["port"] == self.port:
+                    del BOARD.http_in[i]
+                    c["accepted_ms"] = BOARD.now_ms
+                    s = Stream(c, ("192.168.4.10", 50000 + n))
+                    n += 1
+                    create_task(cb(s, s))
+                    break
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def wait_closed(self):
+        await _Yield()
+
+
+async def start_server(cb, host, port, backlog=5):
+    srv = Server(port)
+    srv.task = create_task(srv._accept(cb))
+    return srv
@@ -0,0 +1,65 @@
+"""gc with MicroPython's mem_alloc/mem_free.
+
+When tracemalloc is tracing, mem_alloc() behaves like MicroPython's: it is
+the live size plus the garbage left behind since the last collect(), so a
+loop that allocates makes it grow even though CPython frees the objects at
+once. Garbage is estimated from tracemalloc's peak between calls (several
+short-lived objects freed in turn count once). Sizes are counted from
+the first call made while tracing, so mem_free() starts near HEAP_SIZE
+however much the host process already uses, and the garbage is dropped
+when the heap would overflow, as an automatic collection would. Without
+tracing both are constant.
+"""
+
+import gc as _gc
+import tracemalloc as _tm
+
+BOARD = None
+
+HEAP_SIZE = 110 * 1024
+
+_garbage = 0
+_base = None
+
+
+def collect():
+    global _garbage
+    _gc.collect()
+    _garbage = 0
+    if _tm.is_tracing():
+        _tm.reset_peak()
+
+
+def enable():
+    _gc.enable()
+
+
+def disable():
+    _gc.disable()
+
+
+def isenabled():
+    return _gc.isenabled()
+
+
+def mem_alloc():
+    global _garbage, _base
+    if not _tm.is_tracing():
+        return 0
+    current, peak = _tm.get_traced_memory()
+    if _base is None:
+        _base = current
+    _garbage += peak - current
+    _tm.reset_peak()
+    live = max(current - _base, 0)
+    if live + _garbage > HEAP_SIZE:
+        _garbage = 0    # the heap filled up: MicroPython would collect here
+    return live + _garbage
+
+
+def mem_free():
+    return max(HEAP_SIZE - mem_alloc(), 0)
+
+
+def threshold(amount=None):
+    return -1
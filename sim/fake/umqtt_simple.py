@@ -0,0 +1,240 @@
+"""umqtt.simple.MQTTClient talking to the board's in-memory broker.
+
+``publish``/``subscribe`` go straight to the broker. ``client.sock`` is
+also a byte stream like the real one: MQTT packets written to it (PUBLISH
+at QoS 0/1, PINGREQ, PUBACK) reach the broker, and PUBACK, PINGRESP and
+subscribed PUBLISH packets come back after ``RTT_US``. A broker outage
+resets the connection, and replies still in flight are lost with it; while
+the broker is silent, packets vanish and nothing comes back. Reads honour
+the socket timeout (OSError ETIMEDOUT), and so does connect(timeout=).
+"""
+
+import struct as _struct
+
+BOARD = None
+
+RTT_US = 15000
+
+
+def _packet(first, body):
+    n = len(body)
+    hdr = bytearray((first,))
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        hdr.append(b | (0x80 if n else 0))
+        if not n:
+            return bytes(hdr) + body
+
+
+class _Sock:
+    def __init__(self, client):
+        self.client = client
+        self.tx = bytearray()
+        self.rx = bytearray()
+        self.timeout = None     # None: blocking, 0: non-blocking, else seconds
+        self.dead = False
+
+    def setblocking(self, flag):
+        self.timeout = None if flag else 0
+
+    def settimeout(self, t):
+        self.timeout = t
+
+    def _check(self):
+        if not self.dead and not BOARD.broker.available():
+            self.dead = True
+        if self.dead:
+            self.client.connected = False
+            raise OSError(104)  # ECONNRESET
+
+    def _reply(self, pkt):
+        if BOARD.broker.is_silent():
+            return
+
+        def arrive():
+            if not self.dead and BOARD.broker.available():
+                self.rx += pkt
+            else:
+                self.dead = True
+        BOARD.clock.call_later(RTT_US, arrive)
+
+    def write(self, data, n=None):
+        self._check()
+        data = bytes(memoryview(data)[:n] if n is not None else data)
+        self.tx += data
+        self._parse()
+        return len(data)
+
+    def _parse(self):
+        broker = BOARD.broker
+        while len(self.tx) >= 2:
+            n, shift, i = 0, 0, 1
+            while True:
+                if i >= len(self.tx):
+                    return
+                b = self.tx[i]
+                n |= (b & 0x7F) << shift
+                shift += 7
+                i += 1
+                if not b & 0x80:
+                    break
+            if len(self.tx) < i + n:
+                return
+            op, body = self.tx[0], bytes(self.tx[i:i + n])
+            del self.tx[:i + n]
+            if broker.is_silent():
+                continue
+            if op & 0xF0 == 0x30:
+                qos = (op >> 1) & 3
+                tlen = _struct.unpack_from("!H", body)[0]
+                topic, pos = body[2:2 + tlen], 2 + tlen
+                if qos:
+                    pid, pos = body[pos:pos + 2], pos + 2
+                    broker.qos1_acked += 1
+                    self._reply(b"\x40\x02" + pid)
+                msg = body[pos:]
+                broker.publishes.append((BOARD.now_ms, self.client.client_id, topic, msg, qos))
+                broker.deliver(topic, msg)
+            elif op == 0xC0:
+                broker.pings += 1
+                self._reply(b"\xd0\x00")
+            elif op == 0x40:
+                pass  # PUBACK for a QoS 1 message we delivered
+
+    def _fill(self):
+        inbox = BOARD.broker.inbox.get(self.client.client_id)
+        while inbox:
+            topic, msg = inbox.pop(0)
+            self.rx += _packet(0x30, _struct.pack("!H", len(topic)) + topic + msg)
+
+    def _ready(self):
+        self._fill()
+        return bool(self.rx) or self.dead
+
+    def read(self, n):
+        self._fill()
+        if not self.rx:
+            self._check()
+            if self.timeout == 0:
+                return None
+            clock = BOARD.clock
+            if self.timeout is None:
+                clock.run_until(self._ready)
+            elif not clock.run_until(self._ready, clock.now_us + int(self.timeout * 1000000)):
+                raise OSError(110)  # ETIMEDOUT
+            self._check()
+        data = bytes(self.rx[:n])
+        del self.rx[:n]
+        return data
+
+    def close(self):
+        self.dead = True
+
+
+class MQTTException(Exception):
+    pass
+
+
+class MQTTClient:
+    def __init__(self, client_id, server, port=0, user=None, password=None,
+                 keepalive=0, ssl=False, ssl_params={}):
+        self.client_id = client_id
+        self.server = server
+        self.port = port
+        self.user = user
+        self.keepalive = keepalive
+        self.cb = None
+        self.pid = 0
+        self.connected = False
+        self.sock = None
+
+    def _broker(self):
+        broker = BOARD.broker
+        BOARD.clock.advance(RTT_US)
+        if not broker.available():
+            self.connected = False
+            raise OSError(113)  # EHOSTUNREACH
+        return broker
+
+    def set_callback(self, f):
+        self.cb = f
+
+    def set_last_will(self, topic, msg, retain=False, qos=0):
+        pass
+
+    def connect(self, clean_session=True, timeout=None):
+        broker = self._broker()
+        if broker.is_silent():
+            # no CONNACK: blocks until the timeout (or the silence) ends
+            clock = BOARD.clock
+            end = None if timeout is None else clock.now_us + int(timeout * 1000000)
+            if not clock.run_until(lambda: not broker.is_silent(), end):
+                raise OSError(110)  # ETIMEDOUT
+        broker.connects += 1
+        self.connected = True
+        self.sock = _Sock(self)
+        self.sock.settimeout(timeout)
+        return 0
+
+    def _require(self):
+        if not self.connected:
+            raise OSError(128)  # ENOTCONN
+
+    def disconnect(self):
+        self.close()
+
+    def close(self):
+        self.connected = False
+        if self.sock is not None:
+            self.sock.close()
+
+    def ping(self):
+        self._require()
+        self.sock.write(b"\xc0\0")
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        self._require()
+        broker = self._broker()
+        if isinstance(msg, str):
+            msg = msg.encode()
+        broker.publishes.append((BOARD.now_ms, self.client_id, topic, bytes(msg), qos))
+        broker.deliver(topic, bytes(msg))
+        if qos == 1:
+            self.pid += 1
+            return self.pid
+
+    def subscribe(self, topic, qos=0):
+        self._require()
+        self._broker().subscriptions.setdefault(self.client_id, []).append(topic)
+
+    def check_msg(self):
+        self._require()
+        self.sock.setblocking(False)
+        return self.wait_msg()
+
+    def wait_msg(self):
+        self._require()
+        res = self.sock.read(1)
+        self.sock.setblocking(True)
+        if res is None:
+            return None
+        if res == b"\xd0":  # PINGRESP
+            self.sock.read(1)
+            return None
+        op = res[0]
+        if op & 0xF0 != 0x30:
+            return op
+        sz, shift = 0, 0
+        while True:
+            b = self.sock.read(1)[0]
+            sz |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80:
+                break
+        tlen = _struct.unpack("!H", self.sock.read(2))[0]
+        topic = self.sock.read(tlen)
+        msg = self.sock.read(sz - 2 - tlen)
+        if self.cb:
+            self.cb(topic, msg)
+        return op
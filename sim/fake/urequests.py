@@ -0,0 +1,56 @@
+"""urequests capturing every outbound call into ``BOARD.http_out``.
+
+``BOARD.http_responder(request_dict)`` returns (status, body) and may raise
+OSError to simulate a network failure.
+"""
+
+import json as _json
+
+BOARD = None
+
+LATENCY_US = 20000
+
+
+class Response:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content if isinstance(content, bytes) else str(content).encode()
+        self.reason = b"OK" if status_code < 400 else b"ERR"
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+def request(method, url, data=None, json=None, headers=None, timeout=None, **kwargs):
+    if json is not None:
+        data = _json.dumps(json)
+    req = {"t_ms": BOARD.now_ms, "method": method, "url": url, "data": data,
+           "json": json, "headers": headers or {}}
+    BOARD.http_out.append(req)
+    BOARD.clock.advance(LATENCY_US)
+    status, body = BOARD.http_responder(req)
+    req["status"] = status
+    return Response(status, body)
+
+
+def get(url, **kw):
+    return request("GET", url, **kw)
+
+
+def post(url, **kw):
+    return request("POST", url, **kw)
+
+
+def put(url, **kw):
+    return request("PUT", url, **kw)
+
+
+def delete(url, **kw):
+    return request("DELETE", url, **kw)
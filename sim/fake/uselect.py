@@ -0,0 +1,77 @@
+"""select / uselect: poll() over the fake listening sockets.
+
+A socket is readable when a scripted inbound request is waiting for its
+port; a timeout lets the virtual clock run until one is, like accept().
+"""
+
+BOARD = None
+
+POLLIN = 0x0001
+POLLOUT = 0x0004
+POLLERR = 0x0008
+POLLHUP = 0x0010
+
+
+class _Poll:
+    def __init__(self):
+        self._objs = {}
+        self._it = ()
+        self._pos = 0
+
+    def register(self, obj, eventmask=POLLIN | POLLOUT):
+        self._objs[id(obj)] = (obj, eventmask)
+
+    def modify(self, obj, eventmask):
+        self._objs[id(obj)] = (obj, eventmask)
+
+    def unregister(self, obj):
+        self._objs.pop(id(obj), None)
+
+    def _any(self):
+        for obj, mask in self._objs.values():
+            if mask & POLLIN and obj._ready() or mask & POLLOUT and obj._conn is not None:
+                return True
+        return False
+
+    def _ready(self):
+        out = []
+        for obj, mask in self._objs.values():
+            ev = 0
+            if mask & POLLIN and obj._ready():
+                ev |= POLLIN
+            if mask & POLLOUT and obj._conn is not None:
+                ev |= POLLOUT
+            if ev:
+                out.append((obj, ev))
+        return out
+
+    def _wait(self, timeout):
+        clock = BOARD.clock
+        if timeout is None or timeout < 0:
+            clock.run_until(self._any)
+        elif timeout and not self._any():
+            clock.run_until(self._any, clock.now_us + int(timeout * 1000))
+
+    def poll(self, timeout=-1):
+        self._wait(timeout)
+        return self._ready()
+
+    def ipoll(self, timeout=-1, flags=0):
+        # like MicroPython, returns the poll object itself as the iterator
+        self._wait(timeout)
+        self._it = self._ready() if self._any() else ()
+        self._pos = 0
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pos >= len(self._it):
+            raise StopIteration
+        self._pos += 1
+        return self._it[self._pos - 1]
+
+
+def poll():
+    return _Poll()
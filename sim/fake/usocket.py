@@ -0,0 +1,97 @@
+"""socket / usocket serving the board's scripted inbound HTTP requests."""
+
+BOARD = None
+
+AF_INET = 2
+SOCK_STREAM = 1
+SOCK_DGRAM = 2
+SOL_SOCKET = 1
+SO_REUSEADDR = 4
+IPPROTO_TCP = 6
+
+EAGAIN = 11
+ETIMEDOUT = 110
+
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+    return [(AF_INET, SOCK_STREAM, IPPROTO_TCP, "", (host, port))]
+
+
+class socket:
+    def __init__(self, af=AF_INET, type=SOCK_STREAM, proto=0, _conn=None):
+        self.port = None
+        self.timeout = None
+        self._conn = _conn
+        self._rx = _conn["request"] if _conn else b""
+        self._tx = bytearray()
+        self.closed = False
+
+    # ---- server side ----
+    def setsockopt(self, level, opt, value):
+        pass
+
+    def bind(self, addr):
+        self.port = addr[1]
+
+    def listen(self, backlog=0):
+        pass
+
+    def settimeout(self, t):
+        self.timeout = t
+
+    def setblocking(self, flag):
+        self.timeout = None if flag else 0
+
+    def _ready(self):
+        return any(c["port"] == self.port for c in BOARD.http_in)
+
+    def accept(self):
+        clock = BOARD.clock
+        if self.timeout is None:
+            clock.run_until(self._ready)
+        elif not self._ready():
+            if self.timeout == 0 or not clock.run_until(self._ready, clock.now_us + int(self.timeout * 1000000)):
+                raise OSError(EAGAIN if self.timeout == 0 else ETIMEDOUT)
+        for i, c in enumerate(BOARD.http_in):
+            if c["port"] == self.port:
+                del BOARD.http_in[i]
+                c["accepted_ms"] = BOARD.now_ms
+                return socket(_conn=c), ("192.168.4.10", 50000 + i)
+
+    # ---- connection side ----
+    def recv(self, n):
+        data, self._rx = self._rx[:n], self._rx[n:]
+        return data
+
+    read = recv
+
+    def readline(self):
+        i = self._rx.find(b"\n")
+        end = len(self._rx) if i < 0 else i + 1
+        data, self._rx = self._rx[:end], self._rx[end:]
+        return data
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self._tx += data
+        return len(data)
+
+    def sendall(self, data):
+        self.send(data)
+
+    write = send
+
+    def makefile(self, mode="rb", buffering=0):
+        return self
+
+    def connect(self, addr):
+        raise OSError(113)  # outbound sockets are not simulated; use urequests
+
+    def close(self):
+        if self._conn is not None and not self.closed:
+            c = self._conn
+            c["response"] = bytes(self._tx)
+            c["closed_ms"] = BOARD.now_ms
+            BOARD.http_responses.append((BOARD.now_ms, c["path"], c["response"]))
+        self.closed = True
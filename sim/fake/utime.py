@@ -0,0 +1,62 @@
+"""utime / time on the virtual clock (ESP32 ticks wrap at 2**30)."""
+
+import time as _t
+
+BOARD = None
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+_HALF = TICKS_PERIOD // 2
+
+
+def ticks_us():
+    return BOARD.clock.now_us & TICKS_MAX
+
+
+def ticks_ms():
+    return (BOARD.clock.now_us // 1000) & TICKS_MAX
+
+
+def ticks_cpu():
+    return ticks_us()
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + _HALF) & TICKS_MAX) - _HALF
+
+
+def sleep(seconds):
+    BOARD.clock.advance(seconds * 1000000)
+
+
+def sleep_ms(ms):
+    BOARD.clock.advance(ms * 1000)
+
+
+def sleep_us(us):
+    BOARD.clock.advance(us)
+
+
+def time():
+    return BOARD.epoch + BOARD.clock.now_us // 1000000
+
+
+def time_ns():
+    return (BOARD.epoch * 1000000 + BOARD.clock.now_us) * 1000
+
+
+def localtime(secs=None):
+    t = _t.gmtime(time() if secs is None else secs)
+    return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec, t.tm_wday, t.tm_yday)
+
+
+gmtime = localtime
+
+
+def mktime(tup):
+    import calendar
+    return calendar.timegm(tuple(tup[:6]) + (0, 0, 0))
@@ -0,0 +1,213 @@
+"""Loads MicroPython scripts on CPython against a virtual board.
+
+Scripts are executed with their own ``__builtins__`` whose ``__import__``
+maps MicroPython module names to the fakes in ``sim/fake`` and loads
+sibling modules (and the shared ``lib/`` folder) through the same hook.
+Nothing is added to ``sys.modules``, so several boards can run side by
+side in one process.
+"""
+
+import builtins
+import importlib.util
+import os
+import time
+import types
+
+from .board import Board
+from .clock import SimulationEnd
+
+FAKE_DIR = os.path.join(os.path.dirname(__file__), "fake")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIB_DIR = os.path.join(REPO_ROOT, "lib")
+
+# MicroPython import name -> file in sim/fake
+FAKE_MODULES = {
+    "machine": "machine",
+    "network": "network",
+    "utime": "utime",
+    "time": "utime",
+    "urequests": "urequests",
+    "requests": "urequests",
+    "umqtt.simple": "umqtt_simple",
+    "dht": "dht",
+    "esp": "esp",
+    "micropython": "micropython",
+    "gc": "ugc",
+    "socket": "usocket",
+    "usocket": "usocket",
+    "select": "uselect",
+    "uselect": "uselect",
+    "uasyncio": "uasyncio",
+    "asyncio": "uasyncio",
+}
+
+# u-prefixed aliases that are plain CPython modules
+ALIASES = {
+    "ujson": "json",
+    "ustruct": "struct",
+    "ure": "re",
+    "uheapq": "heapq",
+    "uarray": "array",
+    "ubinascii": "binascii",
+    "uhashlib": "hashlib",
+    "uerrno": "errno",
+    "ucollections": "collections",
+    "uzlib": "zlib",
+    "uos": "os",
+    "uio": "io",
+}
+
+
+class Runtime:
+    """One simulated device: a board, its fake modules and loaded scripts."""
+
+    def __init__(self, board=None, paths=(), echo=False, fs_root=None):
+        self.board = board if board is not None else Board().add_defaults()
+        self.paths = [os.path.abspath(p) for p in paths] + [LIB_DIR]
+        # relative open() paths resolve here, like the device's flash root
+        self.fs_root = os.path.abspath(fs_root) if fs_root else self.paths[0]
+        self.echo = echo
+        self.modules = {}
+        self.device_files = set()   # scripts and modules run as device code
+        self.builtins = dict(builtins.__dict__)
+        self.builtins["__import__"] = self._import
+        self.builtins["print"] = self._print
+        self.builtins["open"] = self._open
+
+    def _open(self, file, *args, **kwargs):
+        if isinstance(file, str) and not os.path.isabs(file):
+            file = os.path.join(self.fs_root, file)
+        return builtins.open(file, *args, **kwargs)
+
+    # ---- print capture ----
+    def _print(self, *args, sep=" ", end="\n", file=None, flush=False):
+        if file is not None:
+            return builtins.print(*args, sep=sep, end=end, file=file, flush=flush)
+        text = sep.join(str(a) for a in args)
+        self.board.emit(text)
+        if self.echo:
+            builtins.print("[%10.3fs] %s" % (self.board.clock.now_us / 1e6, text))
+
+    # ---- import hook ----
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0:
+            mod = self._lookup(name)
+            if mod is not None:
+                if not fromlist and "." in name:
+                    return self._lookup(name.split(".")[0])
+                return mod
+            if name in ALIASES:
+                name = ALIASES[name]
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    def _lookup(self, name):
+        if name in self.modules:
+            return self.modules[name]
+        if name in FAKE_MODULES:
+            return self._load_fake(name)
+        if name == "umqtt":
+            pkg = types.ModuleType("umqtt")
+            self.modules["umqtt"] = pkg
+            pkg.simple = self._load_fake("umqtt.simple")
+            return pkg
+        for d in self.paths:
+            path = os.path.join(d, name + ".py")
+            if os.path.exists(path):
+                return self.load_file(path, name)
+        return None
+
+    def _load_fake(self, name):
+        fname = FAKE_MODULES[name]
+        # time and utime share one module object
+        for alias, f in FAKE_MODULES.items():
+            if f == fname and alias in self.modules:
+                self.modules[name] = self.modules[alias]
+                return self.modules[name]
+        spec = importlib.util.spec_from_file_location("sim.fake." + fname, os.path.join(FAKE_DIR, fname + ".py"))
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        mod.BOARD = self.board
+        mod.__name__ = name
+        self.modules[name] = mod
+        return mod
+
+    def load_file(self, path, name=None):
+        """Execute a device-side source file as a module on this board."""
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        mod = types.ModuleType(name)
+        mod.__file__ = path
+        mod.__builtins__ = self.builtins
+        self.modules[name] = mod
+        self.device_files.add(path)
+        with open(path, encoding="utf-8") as f:
+            code = compile(f.read(), path, "exec")
+        exec(code, mod.__dict__)
+        return mod
+
+    def import_module(self, name):
+        """Import a device module (e.g. ``parking``) without a script around it."""
+        mod = self._lookup(name)
+        if mod is None:
+            raise ImportError(name)
+        return mod
+
+    def run(self, path, seconds=60):
+        """Run a device script until ``seconds`` of virtual time have passed.
+
+        The script's infinite loop is ended by SimulationEnd at the deadline.
+        Any other exception stops the run and is stored on the result.
+        """
+        path = os.path.abspath(path)
+        clock = self.board.clock
+        clock.deadline_us = clock.now_us + int(seconds * 1000000)
+        ns = types.ModuleType("__main__")
+        ns.__file__ = path
+        ns.__builtins__ = self.builtins
+        self.device_files.add(path)
+        error = None
+        t0 = time.perf_counter()
+        try:
+            with open(path, encoding="utf-8") as f:
+                code = compile(f.read(), path, "exec")
+            exec(code, ns.__dict__)
+        except SimulationEnd:
+            pass
+        except Exception as e:  # surfaced on the result for the caller to assert on
+            error = e
+        return RunResult(self, ns, time.perf_counter() - t0, error)
+
+
+class RunResult:
+    def __init__(self, runtime, namespace, wall_s, error):
+        self.runtime = runtime
+        self.board = runtime.board
+        self.namespace = namespace
+        self.wall_s = wall_s
+        self.error = error
+        self.virtual_s = runtime.board.clock.now_us / 1e6
+
+    @property
+    def speedup(self):
+        return self.virtual_s / self.wall_s if self.wall_s else float("inf")
+
+    @property
+    def log(self):
+        return self.board.log
+
+    def summary(self):
+        b = self.board
+        lines = [
+            "virtual %.1fs in %.3fs wall (%.0fx real time)" % (self.virtual_s, self.wall_s, self.speedup),
+            "log lines: %d, outbound HTTP: %d, MQTT publishes: %d, inbound HTTP served: %d"
+            % (len(b.log), len(b.http_out), len(b.broker.publishes), len(b.http_responses)),
+        ]
+        if self.error is not None:
+            lines.append("stopped by %s: %s" % (type(self.error).__name__, self.error))
+        return "\n".join(lines)
+
+
+def run_script(path, board=None, seconds=60, echo=False, paths=(), fs_root=None):
+    """Run ``path`` on ``board`` (default peripherals if None); see Runtime.run."""
+    rt = Runtime(board, paths=(os.path.dirname(os.path.abspath(path)),) + tuple(paths),
+                 echo=echo, fs_root=fs_root)
+    return rt.run(path, seconds)